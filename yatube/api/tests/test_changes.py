@@ -0,0 +1,107 @@
+import time
+from http import HTTPStatus
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.testing import run_on_commit
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class ChangesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='LiveAuthor')
+        cls.reader = User.objects.create(username='LiveReader')
+        cls.group = Group.objects.create(
+            title='Live group', slug='live_group', description='Live group',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('api:changes')
+
+    def poll(self, feed, since=None, status=HTTPStatus.OK):
+        params = {'feed': feed}
+        if since is not None:
+            params['since'] = since
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status)
+        return response.json() if status == HTTPStatus.OK else None
+
+    def test_new_posts_reach_every_feed_without_queries(self):
+        feeds = [
+            'index', f'group:{self.group.slug}',
+            f'author:{self.author.username}',
+        ]
+        tokens = {feed: self.poll(feed)['since'] for feed in feeds}
+        with self.assertNumQueries(0):
+            for feed in feeds:
+                self.poll(feed, tokens[feed], HTTPStatus.NOT_MODIFIED)
+        with run_on_commit():
+            first = Post.objects.create(author=self.author, text='Первый')
+            second = Post.objects.create(
+                author=self.author, text='Второй', group=self.group
+            )
+        expected = {
+            'index': [second.id, first.id],
+            f'group:{self.group.slug}': [second.id],
+            f'author:{self.author.username}': [second.id, first.id],
+        }
+        for feed in feeds:
+            with self.subTest(feed=feed), self.assertNumQueries(0):
+                data = self.poll(feed, tokens[feed])
+                self.assertEqual(data['results'], expected[feed])
+                self.assertFalse(data['reset'])
+                self.poll(feed, data['since'], HTTPStatus.NOT_MODIFIED)
+
+    def test_follow_feed_is_polled_by_signed_name(self):
+        self.poll('follow', status=HTTPStatus.FORBIDDEN)
+        self.client.force_login(self.reader)
+        data = self.poll('follow')
+        self.client.logout()
+        with run_on_commit():
+            post = Post.objects.create(author=self.author, text='Пост')
+        with self.assertNumQueries(0):
+            changed = self.poll(data['feed'], data['since'])
+        self.assertEqual(changed['results'], [post.id])
+        self.poll('follow:1', status=HTTPStatus.BAD_REQUEST)
+
+    @override_settings(SESSION_COOKIE_AGE=60)
+    def test_expired_follow_name_is_rejected(self):
+        self.client.force_login(self.reader)
+        feed = self.poll('follow')['feed']
+        self.client.logout()
+        self.poll(feed)
+        later = time.time() + 120
+        with mock.patch('django.core.signing.time.time', return_value=later):
+            response = self.client.get(self.url, {'feed': feed})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn('устарела', response.json()['detail'])
+
+    @override_settings(LIVE_FEED_BACKLOG=2)
+    def test_stale_tokens_get_reset(self):
+        since = self.poll('index')['since']
+        with run_on_commit():
+            for number in range(3):
+                Post.objects.create(author=self.author, text=f'Пост {number}')
+        self.assertTrue(self.poll('index', since)['reset'])
+        cache.clear()
+        data = self.poll('index', since)
+        self.assertTrue(data['reset'])
+        self.assertNotEqual(data['since'], since)
+
+    def test_bad_feed_or_token(self):
+        for params in ({'feed': 'unknown'}, {'since': 'abc'}):
+            with self.subTest(params=params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(
+                    response.status_code, HTTPStatus.BAD_REQUEST
+                )
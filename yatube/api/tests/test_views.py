@@ -0,0 +1,122 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ApiFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='ApiAuthor')
+        cls.group = Group.objects.create(
+            title='Api group', slug='api_group', description='Api group',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.user, text=f'Пост {number}', group=cls.group
+            )
+            for number in range(5)
+        ]
+        cls.post = cls.posts[-1]
+        Comment.objects.create(post=cls.post, author=cls.user, text='Ком')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds_return_compact_json(self):
+        urls = [
+            reverse('api:index'),
+            reverse('api:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('api:profile_posts', kwargs={'username': self.user}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                data = self.client.get(url).json()
+                self.assertEqual(len(data['results']), 5)
+                self.assertEqual(data['results'][0]['id'], self.post.id)
+                self.assertEqual(
+                    data['results'][0]['author'], self.user.username
+                )
+                self.assertEqual(
+                    data['results'][0]['group'], self.group.slug
+                )
+                self.assertIsNone(data['next_cursor'])
+
+    def test_keyset_cursor_walks_the_feed(self):
+        url = reverse('api:index')
+        first = self.client.get(url, {'limit': 3}).json()
+        self.assertEqual(len(first['results']), 3)
+        second = self.client.get(
+            url, {'limit': 3, 'cursor': first['next_cursor']}
+        ).json()
+        ids = [row['id'] for row in first['results'] + second['results']]
+        self.assertEqual(ids, [post.id for post in reversed(self.posts)])
+        self.assertIsNone(second['next_cursor'])
+
+    def test_bad_cursor(self):
+        response = self.client.get(reverse('api:index'), {'cursor': '!!'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_detail_and_comments(self):
+        detail = self.client.get(
+            reverse('api:post_detail', kwargs={'post_id': self.post.id})
+        ).json()
+        self.assertEqual(detail['text'], self.post.text)
+        comments = self.client.get(
+            reverse('api:comments', kwargs={'post_id': self.post.id})
+        ).json()
+        self.assertEqual(comments['results'][0]['text'], 'Ком')
+        response = self.client.get(
+            reverse('api:post_detail', kwargs={'post_id': 0})
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_not_modified_without_queries(self):
+        url = reverse('api:group_posts', kwargs={'slug': self.group.slug})
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('"'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.assertEqual(len(queries), 0)
+
+    def test_etag_changes_on_updates(self):
+        urls = {
+            reverse('api:index'): lambda: Post.objects.create(
+                author=self.user, text='Новый'
+            ),
+            reverse(
+                'api:comments', kwargs={'post_id': self.post.id}
+            ): lambda: Comment.objects.create(
+                post=self.post, author=self.user, text='Новый'
+            ),
+            reverse(
+                'api:group_posts', kwargs={'slug': self.group.slug}
+            ): lambda: Group.objects.filter(pk=self.group.pk).first().save(),
+        }
+        for url, change in urls.items():
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                change()
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertNotEqual(response['ETag'], etag)
+
+    def test_post_moved_between_groups_bumps_old_group(self):
+        url = reverse('api:group_posts', kwargs={'slug': self.group.slug})
+        etag = self.client.get(url)['ETag']
+        post = Post.objects.get(pk=self.posts[0].pk)
+        post.group = None
+        post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(len(response.json()['results']), 4)
@@ -0,0 +1,211 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponseNotModified, JsonResponse
+from django.views.decorators.http import require_safe
+
+from posts import live, sharding, versions
+from posts.models import Comment, Group, Post, User
+from posts.pagination import keyset_page
+
+POST_FIELDS = (
+    'id', 'text', 'created', 'image', 'author__username', 'group__slug',
+)
+COMMENT_FIELDS = ('id', 'text', 'created', 'author__username')
+# На шардах нет таблиц default: вместо JOIN берутся id, а имена авторов
+# и slug групп подставляет join_default().
+SHARD_FIELDS = {'author__username': 'author_id', 'group__slug': 'group_id'}
+
+
+def conditional(keys):
+    """Условный GET по меткам версий: 304 отдается без запросов к БД."""
+    def decorator(view):
+        return require_safe(versions.conditional(keys)(view))
+    return decorator
+
+
+def index_keys(request):
+    return [versions.INDEX, versions.USERS]
+
+
+def group_keys(request, slug):
+    return [versions.group_key(slug), versions.USERS]
+
+
+def profile_keys(request, username):
+    return [versions.author_key(username)]
+
+
+def post_keys(request, post_id):
+    return [versions.post_key(post_id), versions.USERS]
+
+
+def page_size(request):
+    try:
+        size = int(request.GET.get('limit', settings.PAGE_COUNT))
+    except ValueError:
+        size = settings.PAGE_COUNT
+    return min(max(size, 1), settings.API_PAGE_MAX)
+
+
+def serialize_post(row):
+    image = row['image']
+    return {
+        'id': row['id'],
+        'text': row['text'],
+        'created': row['created'],
+        'image': settings.MEDIA_URL + image if image else None,
+        'author': row['author__username'],
+        'group': row['group__slug'],
+    }
+
+
+def serialize_comment(row):
+    return {
+        'id': row['id'],
+        'text': row['text'],
+        'created': row['created'],
+        'author': row['author__username'],
+    }
+
+
+def api_response(data, status=200):
+    return JsonResponse(
+        data,
+        status=status,
+        encoder=DjangoJSONEncoder,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')},
+    )
+
+
+def not_found():
+    return api_response({'detail': 'Не найдено.'}, status=404)
+
+
+def values(queryset, fields, aliases=None):
+    """values() ленты; с шардами - ScatterGather без JOIN с default."""
+    if not sharding.enabled():
+        return queryset.values(*fields)
+    queryset = queryset.values(
+        *(SHARD_FIELDS.get(field, field) for field in fields)
+    )
+    return sharding.ScatterGather([
+        queryset.using(alias) for alias in aliases or sharding.shards()
+    ])
+
+
+def join_default(rows):
+    """Подставляет в строки с шардов username автора и slug группы."""
+    if not sharding.enabled():
+        return rows
+    usernames = dict(User.objects.filter(
+        id__in={row['author_id'] for row in rows}
+    ).values_list('id', 'username'))
+    slugs = dict(Group.objects.filter(
+        id__in={row.get('group_id') for row in rows} - {None}
+    ).values_list('id', 'slug'))
+    for row in rows:
+        row['author__username'] = usernames.get(row.pop('author_id'))
+        if 'group_id' in row:
+            row['group__slug'] = slugs.get(row.pop('group_id'))
+    return rows
+
+
+def feed_response(request, queryset, fields, serialize, aliases=None):
+    try:
+        rows, next_cursor = keyset_page(
+            values(queryset, fields, aliases),
+            request.GET.get('cursor'),
+            page_size(request),
+        )
+    except ValueError as error:
+        return api_response({'detail': str(error)}, status=400)
+    return api_response({
+        'results': [serialize(row) for row in join_default(rows)],
+        'next_cursor': next_cursor,
+    })
+
+
+@conditional(index_keys)
+def index(request):
+    return feed_response(
+        request, Post.objects.all(), POST_FIELDS, serialize_post
+    )
+
+
+@conditional(group_keys)
+def group_posts(request, slug):
+    group_id = Group.objects.filter(
+        slug=slug
+    ).values_list('id', flat=True).first()
+    if group_id is None:
+        return not_found()
+    return feed_response(
+        request, Post.objects.filter(group_id=group_id), POST_FIELDS,
+        serialize_post,
+    )
+
+
+@conditional(profile_keys)
+def profile_posts(request, username):
+    author_id = User.objects.filter(
+        username=username
+    ).values_list('id', flat=True).first()
+    if author_id is None:
+        return not_found()
+    return feed_response(
+        request, Post.objects.filter(author_id=author_id), POST_FIELDS,
+        serialize_post, [sharding.shard_for_author(author_id)],
+    )
+
+
+@conditional(post_keys)
+def post_detail(request, post_id):
+    rows = list(values(
+        Post.objects.filter(id=post_id), POST_FIELDS,
+        [sharding.shard_for_post(post_id)],
+    )[:1])
+    if not rows:
+        return not_found()
+    return api_response(serialize_post(join_default(rows)[0]))
+
+
+@conditional(post_keys)
+def comments(request, post_id):
+    if not sharding.for_post(
+        Post.objects.filter(id=post_id), post_id
+    ).exists():
+        return not_found()
+    return feed_response(
+        request, Comment.objects.filter(post_id=post_id), COMMENT_FIELDS,
+        serialize_comment, [sharding.shard_for_post(post_id)],
+    )
+
+
+@require_safe
+def changes(request):
+    """Опрос ленты: id постов после токена since, 304 - ничего нового.
+
+    Ответ берется из журнала ленты в кэше, без запросов к БД. Лента
+    подписок опрашивается по подписанному имени из первого ответа на
+    feed=follow, поэтому и сессия дальше не читается.
+    """
+    name = request.GET.get('feed', live.INDEX)
+    if name == live.FOLLOW:
+        if not request.user.is_authenticated:
+            return api_response(
+                {'detail': 'Нужна авторизация.'}, status=403
+            )
+        name = live.sign_follow(request.user.pk)
+    since = request.GET.get('since')
+    try:
+        token, ids = live.changes(live.resolve(name), since)
+    except ValueError as error:
+        return api_response({'detail': str(error)}, status=400)
+    if ids == [] and since is not None:
+        return HttpResponseNotModified()
+    return api_response({
+        'feed': name,
+        'since': token,
+        'results': ids or [],
+        'reset': ids is None,
+    })
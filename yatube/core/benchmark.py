@@ -0,0 +1,40 @@
+import math
+from collections import Counter
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values, percent):
+    """Percentile with linear interpolation between closest ranks."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * percent / 100
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(timings, queries=None, statuses=None):
+    """Сводка по серии замеров: timings в секундах, queries - число SQL."""
+    summary = {'requests': len(timings)}
+    for percent in PERCENTILES:
+        summary[f'p{percent}_ms'] = round(
+            percentile(timings, percent) * 1000, 3
+        )
+    summary['mean_ms'] = round(
+        sum(timings) / len(timings) * 1000 if timings else 0.0, 3
+    )
+    summary['max_ms'] = round(max(timings, default=0.0) * 1000, 3)
+    if queries is not None:
+        summary['queries'] = {
+            'p50': percentile(queries, 50),
+            'max': max(queries, default=0),
+            'total': sum(queries),
+        }
+    if statuses is not None:
+        summary['statuses'] = {
+            str(status): count
+            for status, count in sorted(Counter(statuses).items())
+        }
+    return summary
@@ -0,0 +1,67 @@
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends import locmem, memcached
+
+from . import timing
+from .metrics import get_registry
+
+_missing = object()
+
+
+class InstrumentedCacheMixin:
+    """Считает попадания и промахи кеша для текущего запроса."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version)
+        if value is _missing:
+            record(0, 1)
+            return default
+        record(1, 0)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        values = super().get_many(keys, version)
+        record(len(values), len(set(keys)) - len(values))
+        return values
+
+
+def record(hits, misses):
+    timing.record_cache(hits, misses)
+    registry = get_registry()
+    if hits:
+        registry.inc('yatube_cache_requests_total', ('hit',), hits)
+    if misses:
+        registry.inc('yatube_cache_requests_total', ('miss',), misses)
+
+
+class LocMemCache(InstrumentedCacheMixin, locmem.LocMemCache):
+    # get_many у LocMemCache реализован через get и уже посчитан в нем.
+    get_many = locmem.LocMemCache.get_many
+
+
+class MemcachedCache(InstrumentedCacheMixin, memcached.MemcachedCache):
+    pass
+
+
+@contextmanager
+def lock(name):
+    """Мьютекс на cache.add для чтения-изменения-записи ключей кэша.
+
+    С общим бэкендом (memcached) он общий для всех процессов. Ключ живет
+    CACHE_LOCK_TIMEOUT секунд: упавший владелец не держит его вечно, а
+    владелец, не успевший за это время, чужую блокировку не снимает.
+    """
+    key = f'lock:{name}'
+    timeout = settings.CACHE_LOCK_TIMEOUT
+    while not cache.add(key, 1, timeout):
+        time.sleep(0.001)
+    acquired = time.monotonic()
+    try:
+        yield
+    finally:
+        if time.monotonic() - acquired < timeout:
+            cache.delete(key)
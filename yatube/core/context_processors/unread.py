@@ -0,0 +1,14 @@
+from django.utils.functional import SimpleLazyObject
+
+from posts.unread import unread_count
+
+
+def unread(request):
+    # Лениво: ни пользователь, ни кэш не читаются, пока счетчик не выведен,
+    # поэтому страницы без фрагмента follow_tab не зависят от сессии.
+    def count():
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            return 0
+        return unread_count(user)
+    return {'unread_count': SimpleLazyObject(count)}
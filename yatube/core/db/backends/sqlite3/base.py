@@ -0,0 +1,110 @@
+import random
+import time
+
+from django.db.backends.sqlite3 import base
+
+Database = base.Database
+
+# Прагмы, которые выставляются на каждом новом соединении. Переопределяются
+# через OPTIONS['pragmas'] в DATABASES.
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -20000,
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+
+LOCK_RETRIES = 5
+
+LOCK_BACKOFF = 0.05
+
+
+def apply_pragmas(connection, pragmas):
+    for name, value in pragmas.items():
+        connection.execute(f'PRAGMA {name} = {value}')
+
+
+# "table is locked" - SQLITE_LOCKED при общем кэше (in-memory база
+# тестов): busy_timeout на него не действует, ждать приходится самим.
+LOCK_MESSAGES = (
+    'database is locked', 'database is busy', 'database table is locked',
+)
+
+
+def is_locked(error):
+    message = str(error)
+    return any(text in message for text in LOCK_MESSAGES)
+
+
+def retry_locked(call, connection, retries, backoff):
+    """Повторяет call при блокировке базы с экспоненциальной паузой.
+
+    Внутри транзакции повтор бессмыслен: SQLite уже откатил оператор,
+    а взятые блокировки держит, поэтому ошибка пробрасывается сразу.
+    """
+    attempt = 0
+    while True:
+        try:
+            return call()
+        except Database.OperationalError as error:
+            if (not is_locked(error) or connection.in_transaction
+                    or attempt >= retries):
+                raise
+            time.sleep(backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+            attempt += 1
+
+
+class SQLiteCursorWrapper(base.SQLiteCursorWrapper):
+    retries = LOCK_RETRIES
+    backoff = LOCK_BACKOFF
+
+    def execute(self, query, params=None):
+        return retry_locked(
+            lambda: super(SQLiteCursorWrapper, self).execute(query, params),
+            self.connection, self.retries, self.backoff,
+        )
+
+    def executemany(self, query, param_list):
+        param_list = list(param_list)
+        return retry_locked(
+            lambda: super(SQLiteCursorWrapper, self).executemany(
+                query, param_list
+            ),
+            self.connection, self.retries, self.backoff,
+        )
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite с WAL, прагмами, BEGIN IMMEDIATE и повтором при блокировке.
+
+    Дополнительные ключи OPTIONS: pragmas, transaction_mode
+    (DEFERRED/IMMEDIATE/EXCLUSIVE), lock_retries, lock_backoff.
+    """
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        self.pragmas = {**PRAGMAS, **kwargs.pop('pragmas', {})}
+        self.transaction_mode = kwargs.pop('transaction_mode', 'IMMEDIATE')
+        self.lock_retries = kwargs.pop('lock_retries', LOCK_RETRIES)
+        self.lock_backoff = kwargs.pop('lock_backoff', LOCK_BACKOFF)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        apply_pragmas(connection, self.pragmas)
+        return connection
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=SQLiteCursorWrapper)
+        cursor.retries = self.lock_retries
+        cursor.backoff = self.lock_backoff
+        return cursor
+
+    def _start_transaction_under_autocommit(self):
+        # Отложенная транзакция берет блокировку записи только на первом
+        # INSERT/UPDATE, и тогда busy_timeout не помогает: SQLite сразу
+        # отвечает "database is locked". BEGIN IMMEDIATE ждет блокировку
+        # в начале транзакции, где курсор может безопасно его повторить.
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')
@@ -0,0 +1,137 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import (
+    DEFAULT_DB_ALIAS, close_old_connections, connections, transaction,
+)
+
+_local = threading.local()
+
+STOP = object()
+
+
+class WriteQueue:
+    """Очередь коротких транзакций с одним потоком-писателем.
+
+    Писатель забирает накопившиеся за время предыдущего коммита задачи
+    пачкой до batch_size (и ждет следующие не дольше wait секунд) и
+    выполняет их в одной транзакции: один COMMIT и одна блокировка записи
+    на всю пачку. Каждая задача идет в своей точке сохранения, так что
+    ошибка одной не откатывает остальные. Результат или исключение
+    возвращается через Future. Очередь пишет в одну базу using: у
+    каждого шарда свой писатель.
+    """
+
+    def __init__(self, batch_size=32, wait=0, atomic=transaction.atomic,
+                 cleanup=close_old_connections, using=DEFAULT_DB_ALIAS):
+        self.batch_size = batch_size
+        self.wait = wait
+        self.atomic = atomic
+        self.cleanup = cleanup
+        self.using = using
+        self.jobs = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.loop, name='write-queue', daemon=True
+                )
+                self.thread.start()
+
+    def stop(self):
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread is not None:
+            self.jobs.put(STOP)
+            thread.join()
+
+    def submit(self, func, *args, **kwargs):
+        future = Future()
+        self.start()
+        self.jobs.put((future, func, args, kwargs))
+        return future
+
+    def next_batch(self):
+        batch = [self.jobs.get()]
+        deadline = time.monotonic() + self.wait
+        while len(batch) < self.batch_size and batch[-1] is not STOP:
+            try:
+                batch.append(self.jobs.get(
+                    timeout=max(deadline - time.monotonic(), 0)
+                ))
+            except queue.Empty:
+                break
+        return batch
+
+    def commit(self, batch):
+        results = []
+        try:
+            with self.atomic(using=self.using):
+                for future, func, args, kwargs in batch:
+                    try:
+                        with self.atomic(using=self.using):
+                            results.append(
+                                (future, func(*args, **kwargs), None)
+                            )
+                    except Exception as error:
+                        results.append((future, None, error))
+        except Exception as error:
+            for future, *_ in batch:
+                future.set_exception(error)
+            return
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def loop(self):
+        _local.writer = True
+        while True:
+            batch = self.next_batch()
+            stop = batch[-1] is STOP
+            if stop:
+                batch.pop()
+            if batch:
+                self.commit(batch)
+            if self.cleanup is not None:
+                self.cleanup()
+            if stop:
+                return
+
+
+_queues = {}
+_queue_lock = threading.Lock()
+
+
+def get_queue(using=DEFAULT_DB_ALIAS):
+    with _queue_lock:
+        if using not in _queues:
+            _queues[using] = WriteQueue(
+                settings.WRITE_QUEUE_BATCH_SIZE,
+                settings.WRITE_QUEUE_WAIT_MS / 1000,
+                using=using,
+            )
+        return _queues[using]
+
+
+def run(func, *args, using=DEFAULT_DB_ALIAS, **kwargs):
+    """Выполняет запись в базу using через ее писателя и ждет результат.
+
+    using - алиас, куда пишет func (router.db_for_write). Без
+    WRITE_QUEUE_ENABLED, в самом писателе и внутри уже открытой
+    транзакции на этой базе (задача должна видеть ее изменения) вызов
+    идет напрямую.
+    """
+    if (not settings.WRITE_QUEUE_ENABLED
+            or getattr(_local, 'writer', False)
+            or connections[using].in_atomic_block):
+        return func(*args, **kwargs)
+    future = get_queue(using).submit(func, *args, **kwargs)
+    return future.result(settings.WRITE_QUEUE_TIMEOUT)
@@ -0,0 +1,98 @@
+import inspect
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from django.urls import reverse
+from django.utils.html import escape
+
+# Персональные куски страниц (шапка, кнопки, форма комментария) в тело
+# не попадают: вместо них шаблон ставит <esi:include>. Тело одинаково для
+# всех и кэшируется целиком, а дырки заполняет EsiMiddleware на каждый
+# запрос - или прокси с поддержкой ESI через /fragments/<name>/.
+FRAGMENTS = {}
+
+INCLUDE_RE = re.compile(rb'<esi:include src="([^"]+)"\s*/>')
+
+SURROGATE_CAPABILITY = 'ESI/1.0'
+
+
+def register(name):
+    """Регистрирует фрагмент: func(request, **params) -> str."""
+    def decorator(func):
+        FRAGMENTS[name] = func
+        return func
+    return decorator
+
+
+def include(name, **params):
+    params = {
+        key: value for key, value in params.items()
+        if value not in (None, False, '')
+    }
+    src = reverse('fragment', args=(name,))
+    if params:
+        src += '?' + urlencode(params)
+    return f'<esi:include src="{escape(src)}" />'
+
+
+def accepts(name, params):
+    """Есть ли фрагмент name и подходят ли ему параметры запроса."""
+    if name not in FRAGMENTS:
+        return False
+    try:
+        inspect.signature(FRAGMENTS[name]).bind(None, **params)
+    except TypeError:
+        return False
+    return True
+
+
+def render(request, name, params):
+    if name not in FRAGMENTS:
+        raise KeyError(name)
+    return FRAGMENTS[name](request, **params)
+
+
+def render_src(request, src):
+    parts = urlsplit(src.replace('&amp;', '&'))
+    name = parts.path.rstrip('/').rsplit('/', 1)[-1]
+    return render(request, name, dict(parse_qsl(parts.query)))
+
+
+def edge_processes(request):
+    return SURROGATE_CAPABILITY in request.META.get(
+        'HTTP_SURROGATE_CAPABILITY', ''
+    )
+
+
+class EsiMiddleware:
+    """Заполняет <esi:include> в HTML-ответах, в том числе из кэша.
+
+    Если прокси объявил Surrogate-Capability: ESI/1.0, теги остаются ему,
+    а ответ помечается Surrogate-Control. Стоит последним в MIDDLEWARE:
+    сессия и CSRF, задетые фрагментами, попадают в Vary и куки.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (response.streaming
+                or not response.get('Content-Type', '').startswith(
+                    'text/html')
+                or b'<esi:include' not in response.content):
+            return response
+        if edge_processes(request):
+            response['Surrogate-Control'] = (
+                f'content="{SURROGATE_CAPABILITY}"'
+            )
+            return response
+        response.content = INCLUDE_RE.sub(
+            lambda match: render_src(
+                request, match.group(1).decode()
+            ).encode(),
+            response.content,
+        )
+        if response.has_header('Content-Length'):
+            response['Content-Length'] = str(len(response.content))
+        return response
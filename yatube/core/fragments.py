@@ -0,0 +1,10 @@
+from django.template.loader import render_to_string
+
+from . import esi
+
+
+@esi.register('header')
+def header(request, view_name=''):
+    return render_to_string(
+        'includes/header_user.html', {'view_name': view_name}, request
+    )
@@ -0,0 +1,243 @@
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.benchmark import summarize
+from core.db.backends.sqlite3.base import PRAGMAS, apply_pragmas
+from core.db.writer import WriteQueue
+
+SCHEMA = '''
+CREATE TABLE comment (
+    id INTEGER PRIMARY KEY,
+    post_id INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX comment_post_created ON comment (post_id, created);
+'''
+
+# baseline - настройки Django по умолчанию: журнал DELETE, новое
+# соединение на каждую операцию, отложенные транзакции. queued - tuned
+# плюс запись через core.db.writer.WriteQueue с групповым коммитом.
+PROFILES = {
+    'baseline': {'pragmas': {}, 'persistent': False, 'begin': 'BEGIN'},
+    'tuned': {
+        'pragmas': PRAGMAS, 'persistent': True, 'begin': 'BEGIN IMMEDIATE',
+    },
+    'queued': {
+        'pragmas': PRAGMAS, 'persistent': True, 'begin': 'BEGIN IMMEDIATE',
+        'queue': True,
+    },
+}
+
+
+def prepare(path, posts, rows):
+    connection = sqlite3.connect(path)
+    connection.executescript(SCHEMA)
+    connection.executemany(
+        'INSERT INTO comment (post_id, text, created) VALUES (?, ?, ?)',
+        [(random.randrange(posts), 'x' * 100, time.time())
+         for _ in range(rows)],
+    )
+    connection.commit()
+    connection.close()
+
+
+def connect(path, profile):
+    connection = sqlite3.connect(
+        path, timeout=5, isolation_level=None, check_same_thread=False
+    )
+    apply_pragmas(connection, profile['pragmas'])
+    return connection
+
+
+def sqlite_atomic(connection, begin):
+    """Аналог transaction.atomic для соединения sqlite3.
+
+    using принимается ради совместимости с WriteQueue и игнорируется:
+    соединение одно.
+    """
+    levels = []
+
+    @contextmanager
+    def atomic(using=None):
+        level = len(levels)
+        levels.append(level)
+        if level:
+            start, commit = f'SAVEPOINT s{level}', f'RELEASE s{level}'
+            rollback = f'ROLLBACK TO s{level}; RELEASE s{level}'
+        else:
+            start, commit, rollback = begin, 'COMMIT', 'ROLLBACK'
+        connection.execute(start)
+        try:
+            yield
+        except BaseException:
+            connection.executescript(rollback)
+            raise
+        else:
+            connection.execute(commit)
+        finally:
+            levels.pop()
+
+    return atomic
+
+
+def read_comments(connection, post_id):
+    connection.execute(
+        'SELECT id, text FROM comment WHERE post_id = ? '
+        'ORDER BY created DESC LIMIT 20', (post_id,)
+    ).fetchall()
+
+
+def add_comment(connection, post_id):
+    # Как add_comment: чтение и запись в одной транзакции.
+    connection.execute(
+        'SELECT COUNT(*) FROM comment WHERE post_id = ?', (post_id,)
+    ).fetchone()
+    connection.execute(
+        'INSERT INTO comment (post_id, text, created) VALUES (?, ?, ?)',
+        (post_id, 'x' * 100, time.time()),
+    )
+
+
+def operation(connection, profile, posts, write_ratio, write_queue=None):
+    post_id = random.randrange(posts)
+    if random.random() >= write_ratio:
+        read_comments(connection, post_id)
+    elif write_queue is not None:
+        write_queue.submit(
+            add_comment, write_queue.connection, post_id
+        ).result()
+    else:
+        with sqlite_atomic(connection, profile['begin'])():
+            add_comment(connection, post_id)
+
+
+def run_profile(path, profile, threads, duration, posts, write_ratio,
+                batch_size=32, queue_wait=0):
+    timings = []
+    errors = []
+    lock = threading.Lock()
+    write_queue = None
+    if profile.get('queue'):
+        writer_connection = connect(path, profile)
+        write_queue = WriteQueue(
+            batch_size, queue_wait,
+            atomic=sqlite_atomic(writer_connection, profile['begin']),
+            cleanup=None,
+        )
+        write_queue.connection = writer_connection
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        connection = connect(path, profile) if profile['persistent'] else None
+        local_timings, local_errors = [], []
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            current = connection or connect(path, profile)
+            try:
+                operation(
+                    current, profile, posts, write_ratio, write_queue
+                )
+                local_timings.append(time.perf_counter() - started)
+            except Exception as error:
+                # Любая ошибка операции - в отчет, иначе поток молча
+                # умирает и профиль выглядит просто медленным.
+                local_errors.append(f'{type(error).__name__}: {error}')
+            finally:
+                if connection is None:
+                    current.close()
+        if connection is not None:
+            connection.close()
+        with lock:
+            timings.extend(local_timings)
+            errors.extend(local_errors)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    if write_queue is not None:
+        write_queue.stop()
+        write_queue.connection.close()
+    summary = summarize(timings)
+    summary['throughput_ops'] = round(len(timings) / elapsed, 1)
+    summary['errors'] = len(errors)
+    summary['error_samples'] = sorted(set(errors))[:3]
+    return summary
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность SQLite с настройками Django по '
+        'умолчанию, с core.db.backends.sqlite3 и с очередью писателя '
+        'на смешанной нагрузке чтение/запись из нескольких потоков.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=5.0)
+        parser.add_argument('--write-ratio', type=float, default=0.2)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--rows', type=int, default=50000)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--synchronous', default=PRAGMAS['synchronous'],
+            help='PRAGMA synchronous для tuned и queued; FULL показывает '
+                 'выигрыш группового коммита на дисках с дорогим fsync.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=settings.WRITE_QUEUE_BATCH_SIZE,
+        )
+        parser.add_argument(
+            '--queue-wait-ms', type=float,
+            default=settings.WRITE_QUEUE_WAIT_MS,
+        )
+        parser.add_argument('--output', help='Файл для JSON-отчета.')
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for name, profile in PROFILES.items():
+                if profile['pragmas']:
+                    profile = {**profile, 'pragmas': {
+                        **profile['pragmas'],
+                        'synchronous': options['synchronous'],
+                    }}
+                path = os.path.join(directory, f'{name}.sqlite3')
+                prepare(path, options['posts'], options['rows'])
+                results[name] = run_profile(
+                    path, profile, options['threads'], options['duration'],
+                    options['posts'], options['write_ratio'],
+                    options['batch_size'], options['queue_wait_ms'] / 1000,
+                )
+                self.stdout.write(
+                    f'{name}: {results[name]["throughput_ops"]} оп/с, '
+                    f'p95 {results[name]["p95_ms"]} мс, '
+                    f'ошибок {results[name]["errors"]}'
+                )
+        report = {
+            'meta': {
+                key: options[key] for key in (
+                    'threads', 'duration', 'write_ratio', 'posts', 'rows',
+                    'seed', 'synchronous', 'batch_size', 'queue_wait_ms',
+                )
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
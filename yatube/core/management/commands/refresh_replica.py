@@ -0,0 +1,62 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+
+def copy_database(source, target):
+    """Снимок SQLite через online backup API прямо в файл реплики.
+
+    Копирование идет транзакцией в самой реплике, поэтому ее соединения
+    (в том числе в режиме WAL) видят либо старый снимок, либо новый.
+    Подмена файла через os.replace оставляла бы им старые -wal/-shm.
+    """
+    source_connection = sqlite3.connect(source)
+    target_connection = sqlite3.connect(target)
+    try:
+        source_connection.backup(target_connection)
+    finally:
+        target_connection.close()
+        source_connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует SQLite-базу primary в файл реплики; с --interval '
+        'повторяет копирование, пока команду не остановят.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--alias', help='Алиас реплики из DATABASE_REPLICAS.',
+        )
+        parser.add_argument('--source', help='Файл primary.')
+        parser.add_argument('--target', help='Файл реплики.')
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Период обновления в секундах; 0 - обновить один раз.',
+        )
+
+    def handle(self, *args, **options):
+        source = (
+            options['source']
+            or settings.DATABASES[DEFAULT_DB_ALIAS]['NAME']
+        )
+        target = options['target']
+        if not target:
+            alias = options['alias'] or next(
+                iter(settings.DATABASE_REPLICAS), None
+            )
+            if alias not in settings.DATABASES:
+                raise CommandError('Реплика не настроена: задайте --target.')
+            target = settings.DATABASES[alias]['NAME']
+        while True:
+            started = time.perf_counter()
+            copy_database(source, target)
+            elapsed = (time.perf_counter() - started) * 1000
+            self.stdout.write(f'{source} -> {target}: {elapsed:.0f} мс')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,81 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.replay import (HttpTransport, InProcessTransport, LocalServer,
+                         Replayer, parse_log)
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Проигрывает access-лог (Common/Combined Log Format) против '
+        'приложения и считает пропускную способность, перцентили задержки '
+        'по URL-шаблонам и долю ошибок.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('logfile')
+        parser.add_argument(
+            '--mode', choices=('inprocess', 'wsgi', 'http'),
+            default='inprocess',
+            help='inprocess - django.test.Client, wsgi - локальный '
+                 'WSGI-сервер, http - внешний адрес из --url.',
+        )
+        parser.add_argument('--url', help='Базовый адрес для режима http.')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument(
+            '--speedup', type=float, default=1.0,
+            help='Во сколько раз ускорить лог; 0 - без пауз.',
+        )
+        parser.add_argument(
+            '--user-prefix', default='bench_user_',
+            help='Префикс имен засеянных пользователей для авторизации.',
+        )
+        parser.add_argument(
+            '--users', type=int, default=100,
+            help='Сколько засеянных пользователей задействовать.',
+        )
+        parser.add_argument('--limit', type=int, help='Сколько строк взять.')
+        parser.add_argument('--output', help='Файл для JSON-отчета.')
+
+    def handle(self, *args, **options):
+        if options['mode'] == 'http' and not options['url']:
+            raise CommandError('Для режима http нужен --url.')
+        users = User.objects.filter(
+            username__startswith=options['user_prefix']
+        ).order_by('pk')[:options['users']]
+        with open(options['logfile'], encoding='utf-8') as logfile:
+            entries = list(parse_log(logfile))
+        if options['limit']:
+            entries = entries[:options['limit']]
+        if not entries:
+            raise CommandError('В логе не найдено ни одного запроса.')
+
+        if options['mode'] == 'wsgi':
+            with LocalServer() as server:
+                report = self.replay(HttpTransport(server.url), users,
+                                     entries, options)
+        elif options['mode'] == 'http':
+            report = self.replay(HttpTransport(options['url']), users,
+                                 entries, options)
+        else:
+            report = self.replay(InProcessTransport(), users, entries,
+                                 options)
+
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+        self.stdout.write(output)
+
+    def replay(self, transport, users, entries, options):
+        replayer = Replayer(
+            transport,
+            users=users,
+            concurrency=options['concurrency'],
+            speedup=options['speedup'],
+        )
+        return replayer.run(entries)
@@ -0,0 +1,45 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.slow_queries import aggregate
+
+
+class Command(BaseCommand):
+    help = (
+        'Отчет по медленным запросам: топ fingerprint\'ов по суммарному '
+        'времени с планом выполнения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file', default=settings.SLOW_QUERY_LOG_FILE,
+            help='JSON-лог медленных запросов (SLOW_QUERY_LOG_FILE).',
+        )
+        parser.add_argument('--top', type=int, default=10)
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        if not options['file']:
+            raise CommandError('Не задан файл лога медленных запросов.')
+        try:
+            with open(options['file'], encoding='utf-8') as log:
+                entries = [json.loads(line) for line in log if line.strip()]
+        except FileNotFoundError:
+            raise CommandError(f'Файл {options["file"]} не найден.')
+        report = aggregate(entries, options['top'])
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+            return
+        for number, group in enumerate(report, start=1):
+            self.stdout.write(
+                f'{number}. {group["fingerprint"]}: {group["count"]} раз, '
+                f'всего {group["total_ms"]} мс, в среднем {group["mean_ms"]} '
+                f'мс, максимум {group["max_ms"]} мс, '
+                f'наборов параметров {group["distinct_params"]}'
+            )
+            self.stdout.write(f'   views: {", ".join(group["views"]) or "-"}')
+            self.stdout.write(f'   {group["sql"]}')
+            for row in group['plan']:
+                self.stdout.write(f'   plan: {row}')
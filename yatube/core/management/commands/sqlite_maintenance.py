@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Обслуживание SQLite: ANALYZE, PRAGMA optimize, инкрементальный '
+        'VACUUM и checkpoint WAL. Запускать по расписанию (cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--vacuum-pages', type=int, default=1000,
+            help='Сколько свободных страниц вернуть за запуск; 0 - все.',
+        )
+        parser.add_argument(
+            '--enable-incremental-vacuum', action='store_true',
+            help='Включить auto_vacuum=INCREMENTAL (полный VACUUM, '
+                 'выполняется один раз и блокирует базу).',
+        )
+        parser.add_argument(
+            '--skip-analyze', action='store_true',
+            help='Только optimize, без полного ANALYZE.',
+        )
+
+    def pragma(self, cursor, statement):
+        cursor.execute(f'PRAGMA {statement}')
+        return cursor.fetchall()
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда работает только с SQLite.')
+        with connection.cursor() as cursor:
+            if options['enable_incremental_vacuum']:
+                self.pragma(cursor, 'auto_vacuum = INCREMENTAL')
+                cursor.execute('VACUUM')
+                self.stdout.write('auto_vacuum = INCREMENTAL, VACUUM')
+            if not options['skip_analyze']:
+                cursor.execute('ANALYZE')
+                self.stdout.write('ANALYZE')
+            self.pragma(cursor, 'optimize')
+            self.stdout.write('PRAGMA optimize')
+            (auto_vacuum,), = self.pragma(cursor, 'auto_vacuum')
+            (free_pages,), = self.pragma(cursor, 'freelist_count')
+            # 2 - INCREMENTAL; в остальных режимах incremental_vacuum
+            # ничего не делает.
+            if auto_vacuum == 2 and free_pages:
+                pages = options['vacuum_pages'] or free_pages
+                self.pragma(cursor, f'incremental_vacuum({pages})')
+                self.stdout.write(
+                    f'incremental_vacuum: {min(pages, free_pages)} '
+                    f'из {free_pages} свободных страниц'
+                )
+            (journal_mode,), = self.pragma(cursor, 'journal_mode')
+            if journal_mode != 'wal':
+                return
+            busy, log, checkpointed = self.pragma(
+                cursor, 'wal_checkpoint(TRUNCATE)'
+            )[0]
+            self.stdout.write(
+                f'wal_checkpoint: {checkpointed} из {log} страниц'
+                + (' (база занята)' if busy else '')
+            )
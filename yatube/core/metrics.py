@@ -0,0 +1,261 @@
+import atexit
+import bisect
+import glob
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# name: (type, help, label names)
+METRICS = {
+    'yatube_request_duration_seconds': (
+        'histogram', 'Request latency by resolved view name.', ('view',),
+    ),
+    'yatube_responses_total': (
+        'counter', 'Responses by view name and status code.',
+        ('view', 'status'),
+    ),
+    'yatube_db_queries_total': (
+        'counter', 'SQL queries executed by view name.', ('view',),
+    ),
+    'yatube_cache_requests_total': (
+        'counter', 'Cache lookups by result (hit or miss).', ('result',),
+    ),
+    'yatube_thumbnail_generation_seconds': (
+        'histogram', 'Time spent generating thumbnails.', (),
+    ),
+}
+
+
+class Registry:
+    """Метрики процесса с периодическим сбросом в общий каталог.
+
+    Запись метрики - обновление словаря под блокировкой. Раз в
+    METRICS_FLUSH_INTERVAL секунд процесс атомарно переписывает свой файл
+    в METRICS_DIR, а /metrics суммирует файлы живых воркеров; свой файл
+    процесс удаляет при выходе.
+    """
+
+    def __init__(self, directory=None, flush_interval=1.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.filename = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.filename = os.path.join(
+                directory, f'{os.getpid()}-{uuid.uuid4().hex[:8]}.json'
+            )
+            atexit.register(self.close)
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.last_flush = time.monotonic()
+
+    def inc(self, name, labels=(), value=1):
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, labels=()):
+        key = (name, labels)
+        index = bisect.bisect_left(DEFAULT_BUCKETS, value)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [
+                    [0] * (len(DEFAULT_BUCKETS) + 1), 0.0
+                ]
+            histogram[0][index] += 1
+            histogram[1] += value
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'counters': [
+                    [name, list(labels), value]
+                    for (name, labels), value in self.counters.items()
+                ],
+                'histograms': [
+                    [name, list(labels), list(buckets), total]
+                    for (name, labels), (buckets, total)
+                    in self.histograms.items()
+                ],
+            }
+
+    def maybe_flush(self):
+        if (self.filename
+                and time.monotonic() - self.last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        if not self.filename:
+            return
+        self.last_flush = time.monotonic()
+        descriptor, path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(descriptor, 'w') as file:
+            json.dump(self.snapshot(), file)
+        os.replace(path, self.filename)
+
+    def close(self):
+        if self.filename:
+            remove(self.filename)
+
+    def collect(self):
+        """Суммирует метрики всех процессов, включая текущий."""
+        snapshots = []
+        if self.filename:
+            self.flush()
+            for path in glob.glob(os.path.join(self.directory, '*.json')):
+                if not process_alive(file_pid(path)):
+                    remove(path)
+                    continue
+                try:
+                    with open(path) as file:
+                        snapshots.append(json.load(file))
+                except (OSError, ValueError):
+                    continue
+        else:
+            snapshots.append(self.snapshot())
+        counters = {}
+        histograms = {}
+        for snapshot in snapshots:
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(labels))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, buckets, total in snapshot['histograms']:
+                key = (name, tuple(labels))
+                merged = histograms.setdefault(
+                    key, [[0] * len(buckets), 0.0]
+                )
+                for index, count in enumerate(buckets):
+                    merged[0][index] += count
+                merged[1] += total
+        return counters, histograms
+
+    def render(self):
+        counters, histograms = self.collect()
+        lines = []
+        for name, (kind, help_text, label_names) in METRICS.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            if kind == 'counter':
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(
+                            f'{name}{format_labels(label_names, labels)} '
+                            f'{format_value(value)}'
+                        )
+                continue
+            for (metric, labels), (buckets, total) in sorted(
+                    histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                bounds = DEFAULT_BUCKETS + (math.inf,)
+                for bound, count in zip(bounds, buckets):
+                    cumulative += count
+                    le = '+Inf' if bound == math.inf else repr(bound)
+                    bucket_labels = format_labels(
+                        label_names + ('le',), labels + (le,)
+                    )
+                    lines.append(f'{name}_bucket{bucket_labels} {cumulative}')
+                label_text = format_labels(label_names, labels)
+                lines.append(f'{name}_sum{label_text} {format_value(total)}')
+                lines.append(f'{name}_count{label_text} {cumulative}')
+        hits = counters.get(('yatube_cache_requests_total', ('hit',)), 0)
+        misses = counters.get(('yatube_cache_requests_total', ('miss',)), 0)
+        lines.append('# HELP yatube_cache_hit_ratio Share of cache hits.')
+        lines.append('# TYPE yatube_cache_hit_ratio gauge')
+        ratio = hits / (hits + misses) if hits + misses else 0
+        lines.append(f'yatube_cache_hit_ratio {format_value(ratio)}')
+        return '\n'.join(lines) + '\n'
+
+
+def file_pid(path):
+    try:
+        return int(os.path.basename(path).split('-', 1)[0])
+    except ValueError:
+        return None
+
+
+def process_alive(pid):
+    if pid is None:
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def mark_process_dead(pid, directory=None):
+    """Удаляет файлы метрик завершившегося воркера.
+
+    Для хука child_exit сервера приложений: так исчезают и файлы
+    воркеров, убитых без atexit, не дожидаясь следующего /metrics.
+    """
+    directory = directory or settings.METRICS_DIR
+    if not directory:
+        return
+    for path in glob.glob(os.path.join(directory, f'{pid}-*.json')):
+        remove(path)
+
+
+def format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(
+        f'{name}="{escape(value)}"' for name, value in zip(names, values)
+    )
+    return '{' + pairs + '}'
+
+
+def escape(value):
+    return (
+        str(value).replace('\\', r'\\').replace('\n', r'\n')
+        .replace('"', r'\"')
+    )
+
+
+def format_value(value):
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = Registry(
+                    settings.METRICS_DIR, settings.METRICS_FLUSH_INTERVAL
+                )
+    return _registry
+
+
+def reset_registry():
+    global _registry
+    _registry = None
@@ -0,0 +1,106 @@
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import timing
+from .metrics import get_registry
+
+logger = logging.getLogger('core.timing')
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """Пишет задержку, статус и число SQL-запросов по имени view."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        registry = get_registry()
+        registry.observe(
+            'yatube_request_duration_seconds', elapsed, (view,)
+        )
+        registry.inc(
+            'yatube_responses_total', (view, str(response.status_code))
+        )
+        registry.inc('yatube_db_queries_total', (view,), counter.count)
+        registry.maybe_flush()
+        return response
+
+
+class ServerTimingMiddleware:
+    """Отдает разбивку времени запроса в заголовке Server-Timing и в лог.
+
+    Доля замеряемых запросов задается SERVER_TIMING_SAMPLE_RATE, поэтому
+    middleware можно держать включенным и в продакшене.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.SERVER_TIMING_SAMPLE_RATE
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return self.get_response(request)
+        started = time.perf_counter()
+        with timing.collect() as timings:
+            response = self.get_response(request)
+        summary = timings.summary(time.perf_counter() - started)
+        if settings.SERVER_TIMING_HEADER:
+            response['Server-Timing'] = self.header(timings, summary)
+        if settings.SERVER_TIMING_LOG:
+            self.log(request, response, timings, summary)
+        return response
+
+    def header(self, timings, summary):
+        metrics = [
+            f'sql;dur={summary["sql"] * 1000:.2f};'
+            f'desc="{timings.sql_count} queries"',
+            f'tpl;dur={summary["tpl"] * 1000:.2f}',
+            f'thumb;dur={summary["thumb"] * 1000:.2f};'
+            f'desc="{timings.thumbnail_count} thumbnails"',
+            f'cache;desc="hit={timings.cache_hits} '
+            f'miss={timings.cache_misses}"',
+            f'view;dur={summary["view"] * 1000:.2f}',
+            f'total;dur={summary["total"] * 1000:.2f}',
+        ]
+        return ', '.join(metrics)
+
+    def log(self, request, response, timings, summary):
+        match = request.resolver_match
+        fields = {
+            'view': match.view_name if match else None,
+            'path': request.path,
+            'status': response.status_code,
+            'sql_count': timings.sql_count,
+            'cache_hits': timings.cache_hits,
+            'cache_misses': timings.cache_misses,
+            'thumbnails': timings.thumbnail_count,
+        }
+        for name, value in summary.items():
+            fields[f'{name}_ms'] = round(value * 1000, 2)
+        logger.info(
+            ' '.join(f'{key}={value}' for key, value in fields.items()),
+            extra={'timing': fields},
+        )
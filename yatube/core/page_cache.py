@@ -0,0 +1,71 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .cache import lock
+
+# Кэш целых страниц с индексом по тегам: тег -> ключи страниц, которые от
+# него зависят. purge(tag) удаляет ровно эти страницы, не дожидаясь TTL.
+# Индекс живет не меньше своих страниц: каждая запись продлевает его.
+
+
+def page_key(request):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'page:{path}'
+
+
+def tag_key(tag):
+    return f'page_tag:{tag}'
+
+
+def tagged(response, tags):
+    """Помечает ответ тегами; без тегов страница не кэшируется.
+
+    Те же теги уходят прокси в Surrogate-Key (Varnish, Fastly) и
+    Cache-Tag (Cloudflare): по ним core.purge сбрасывает его кэш.
+    """
+    response.cache_tags = set(tags)
+    response['Surrogate-Key'] = ' '.join(sorted(response.cache_tags))
+    response['Cache-Tag'] = ','.join(sorted(response.cache_tags))
+    return response
+
+
+def store(key, response):
+    keys = [tag_key(tag) for tag in response.cache_tags]
+    with lock('page_cache'):
+        indexes = cache.get_many(keys)
+        cache.set_many(
+            {name: indexes.get(name, set()) | {key} for name in keys},
+            settings.PAGE_CACHE_TIMEOUT,
+        )
+        cache.set(key, response, settings.PAGE_CACHE_TIMEOUT)
+
+
+def purge(*tags):
+    """Удаляет страницы с любым из тегов; возвращает их ключи."""
+    keys = [tag_key(tag) for tag in tags]
+    with lock('page_cache'):
+        indexes = cache.get_many(keys)
+        pages = set().union(*indexes.values())
+        cache.delete_many([*pages, *indexes])
+    return pages
+
+
+def cached(view):
+    """Отдает страницу из кэша; кэшируются только помеченные ответы 200."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+        key = page_key(request)
+        response = cache.get(key)
+        if response is None:
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and getattr(
+                response, 'cache_tags', None
+            ):
+                store(key, response)
+        return response
+    return wrapper
@@ -0,0 +1,140 @@
+import logging
+import threading
+from contextlib import contextmanager
+from functools import partial
+
+import requests
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger('core.purge')
+
+SURROGATE_KEY = 'Surrogate-Key'
+
+
+class HttpPurgeBackend:
+    """PURGE на PURGE_URL с ключами в заголовке Surrogate-Key.
+
+    Так чистят Varnish с vmod xkey и похожие прокси. Ключи уходят
+    пачками по PURGE_BATCH_SIZE; ошибки прокси пишутся в лог и не
+    ломают запрос, который вызвал сброс.
+    """
+
+    def __init__(self, url, timeout, batch_size):
+        self.url = url
+        self.timeout = timeout
+        self.batch_size = batch_size
+
+    def purge(self, keys):
+        for start in range(0, len(keys), self.batch_size):
+            chunk = keys[start:start + self.batch_size]
+            try:
+                requests.request(
+                    'PURGE', self.url,
+                    headers={SURROGATE_KEY: ' '.join(chunk)},
+                    timeout=self.timeout,
+                ).raise_for_status()
+            except requests.RequestException as error:
+                logger.warning('Purge of %s failed: %s', chunk, error)
+
+
+class PurgeDispatcher:
+    """Копит ключи и отправляет их бэкенду одной пачкой без повторов.
+
+    Внутри batch() (на время запроса) ключи отправляются при выходе из
+    него, вне batch() - сразу; в обоих случаях после коммита транзакции
+    на той базе, куда шла запись, чтобы прокси не успел закэшировать
+    старые данные заново.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.local = threading.local()
+
+    def pending(self):
+        """Ключи, ждущие отправки, по псевдонимам баз."""
+        if not hasattr(self.local, 'keys'):
+            self.local.keys = {}
+            self.local.depth = 0
+        return self.local.keys
+
+    @contextmanager
+    def batch(self, using=DEFAULT_DB_ALIAS):
+        self.pending()
+        self.local.depth += 1
+        try:
+            yield
+        finally:
+            self.local.depth -= 1
+            if not self.local.depth:
+                self.schedule(using, *self.pending())
+
+    def purge(self, *keys, using=DEFAULT_DB_ALIAS):
+        self.pending().setdefault(using, set()).update(keys)
+        if not self.local.depth:
+            self.schedule(using)
+
+    def schedule(self, *aliases):
+        """Закоммиченные базы - одной пачкой сейчас, остальные - после."""
+        aliases = dict.fromkeys(aliases)
+        busy = [
+            alias for alias in aliases
+            if connections[alias].in_atomic_block
+        ]
+        self.flush(*(alias for alias in aliases if alias not in busy))
+        for alias in busy:
+            transaction.on_commit(partial(self.flush, alias), using=alias)
+
+    def flush(self, *aliases):
+        pending = self.pending()
+        keys = set()
+        for alias in aliases:
+            keys.update(pending.pop(alias, ()))
+        if keys:
+            self.backend.purge(sorted(keys))
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    """Диспетчер по PURGE_BACKEND или None, если прокси не настроен."""
+    global _dispatcher
+    if settings.PURGE_BACKEND is None:
+        return None
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            backend = import_string(settings.PURGE_BACKEND)(
+                settings.PURGE_URL,
+                settings.PURGE_TIMEOUT,
+                settings.PURGE_BATCH_SIZE,
+            )
+            _dispatcher = PurgeDispatcher(backend)
+        return _dispatcher
+
+
+def reset_dispatcher():
+    global _dispatcher
+    _dispatcher = None
+
+
+def purge(*keys, using=DEFAULT_DB_ALIAS):
+    dispatcher = get_dispatcher()
+    if dispatcher is not None:
+        dispatcher.purge(*keys, using=using)
+
+
+class PurgeBatchMiddleware:
+    """Все сбросы за время запроса уходят прокси одной пачкой."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        dispatcher = get_dispatcher()
+        if dispatcher is None:
+            return self.get_response(request)
+        with dispatcher.batch():
+            return self.get_response(request)
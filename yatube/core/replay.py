@@ -0,0 +1,289 @@
+import hashlib
+import queue
+import re
+import threading
+import time
+from collections import Counter, defaultdict, namedtuple
+from datetime import datetime
+from importlib import import_module
+from socketserver import ThreadingMixIn
+from urllib.parse import urlsplit
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+import requests
+from django.conf import settings
+from django.contrib.auth import (BACKEND_SESSION_KEY, HASH_SESSION_KEY,
+                                 SESSION_KEY)
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connections
+from django.http import HttpRequest
+from django.middleware.csrf import get_token
+from django.test import Client
+from django.urls import Resolver404, resolve
+
+from .benchmark import summarize
+
+# Common/Combined Log Format: host ident user [time] "request" status size
+LOG_LINE_RE = re.compile(
+    r'(?P<host>\S+) \S+ (?P<user>\S+) \[(?P<time>[^\]]+)\] '
+    r'"(?P<method>[A-Z]+) (?P<path>\S+)[^"]*" (?P<status>\d{3})'
+)
+LOG_TIME_FORMAT = '%d/%b/%Y:%H:%M:%S %z'
+
+# Эти страницы бессмысленно проигрывать анонимно: они уводят на логин.
+LOGIN_REQUIRED_VIEWS = {
+    'posts:follow_index',
+    'posts:add_comment',
+    'posts:post_create',
+    'posts:post_edit',
+    'posts:profile_follow',
+    'posts:profile_unfollow',
+}
+SKIP_PREFIXES = ('/static/', '/media/', '/favicon')
+
+LogEntry = namedtuple('LogEntry', 'timestamp method path user host')
+
+
+def parse_log(lines):
+    """Разбирает строки access-лога, пропуская статику и мусор."""
+    for line in lines:
+        match = LOG_LINE_RE.match(line)
+        if match is None or match['path'].startswith(SKIP_PREFIXES):
+            continue
+        yield LogEntry(
+            timestamp=datetime.strptime(match['time'], LOG_TIME_FORMAT),
+            method=match['method'],
+            path=match['path'],
+            user=None if match['user'] == '-' else match['user'],
+            host=match['host'],
+        )
+
+
+def resolve_pattern(path):
+    try:
+        return resolve(urlsplit(path).path).view_name
+    except Resolver404:
+        return 'unresolved'
+
+
+def create_session(user):
+    """Сессия залогиненного пользователя, как после входа на сайт."""
+    engine = import_module(settings.SESSION_ENGINE)
+    session = engine.SessionStore()
+    session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.save()
+    return session.session_key
+
+
+def create_csrf_pair():
+    """Значение csrf-cookie и парный ему токен для заголовка."""
+    request = HttpRequest()
+    token = get_token(request)
+    return request.META['CSRF_COOKIE'], token
+
+
+class UserPool:
+    """Сопоставляет пользователей и адреса из лога засеянным аккаунтам."""
+
+    def __init__(self, users):
+        self.users = list(users)
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def session_for(self, entry, pattern):
+        if not self.users:
+            return None
+        if entry.user is None and pattern not in LOGIN_REQUIRED_VIEWS:
+            return None
+        identity = (entry.user or entry.host).encode()
+        digest = int.from_bytes(hashlib.md5(identity).digest()[:4], 'big')
+        user = self.users[digest % len(self.users)]
+        with self.lock:
+            if user.pk not in self.sessions:
+                self.sessions[user.pk] = create_session(user)
+            return self.sessions[user.pk]
+
+
+class InProcessTransport:
+    """Гоняет запросы через django.test.Client без сети."""
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def send(self, method, path, session_key, data):
+        if not hasattr(self.local, 'client'):
+            self.local.client = Client()
+        client = self.local.client
+        if session_key:
+            client.cookies[settings.SESSION_COOKIE_NAME] = session_key
+        else:
+            client.cookies.pop(settings.SESSION_COOKIE_NAME, None)
+        response = getattr(client, method.lower())(path, data)
+        return response.status_code
+
+    def close(self):
+        connections.close_all()
+
+
+class HttpTransport:
+    """Ходит по HTTP на уже поднятый сервер через requests."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.local = threading.local()
+        self.csrf_cookie, self.csrf_token = create_csrf_pair()
+
+    def send(self, method, path, session_key, data):
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+        cookies = {settings.CSRF_COOKIE_NAME: self.csrf_cookie}
+        if session_key:
+            cookies[settings.SESSION_COOKIE_NAME] = session_key
+        response = self.local.session.request(
+            method, self.base_url + path,
+            data=data,
+            cookies=cookies,
+            headers={'X-CSRFToken': self.csrf_token},
+            allow_redirects=False,
+        )
+        return response.status_code
+
+    def close(self):
+        pass
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class LocalServer:
+    """Локальный многопоточный WSGI-сервер в фоновом потоке."""
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.httpd = make_server(
+            host, port, WSGIHandler(),
+            server_class=ThreadingWSGIServer,
+            handler_class=QuietHandler,
+        )
+        self.thread = threading.Thread(
+            target=self.httpd.serve_forever, daemon=True
+        )
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class Replayer:
+    """Проигрывает записи лога с заданной конкурентностью и ускорением.
+
+    speedup=0 отключает выдержку интервалов: запросы идут без пауз.
+    """
+
+    def __init__(self, transport, users=(), concurrency=4, speedup=1.0,
+                 post_data=None):
+        self.transport = transport
+        self.pool = UserPool(users)
+        self.concurrency = concurrency
+        self.speedup = speedup
+        self.post_data = post_data or {'text': 'Комментарий из реплея'}
+        self.results = defaultdict(lambda: {
+            'timings': [], 'statuses': [], 'failures': Counter(),
+        })
+        self.lock = threading.Lock()
+
+    def run(self, entries):
+        jobs = queue.Queue(maxsize=self.concurrency * 4)
+        workers = [
+            threading.Thread(target=self.work, args=(jobs,))
+            for _ in range(self.concurrency)
+        ]
+        for worker in workers:
+            worker.start()
+        started = time.perf_counter()
+        first = None
+        for entry in entries:
+            if self.speedup > 0:
+                first = first or entry.timestamp
+                offset = (entry.timestamp - first).total_seconds()
+                delay = started + offset / self.speedup - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            jobs.put(entry)
+        for _ in workers:
+            jobs.put(None)
+        for worker in workers:
+            worker.join()
+        return self.report(time.perf_counter() - started)
+
+    def work(self, jobs):
+        try:
+            while True:
+                entry = jobs.get()
+                if entry is None:
+                    return
+                self.replay(entry)
+        finally:
+            self.transport.close()
+
+    def replay(self, entry):
+        pattern = resolve_pattern(entry.path)
+        session_key = self.pool.session_for(entry, pattern)
+        data = self.post_data if entry.method == 'POST' else None
+        began = time.perf_counter()
+        try:
+            code = self.transport.send(
+                entry.method, entry.path, session_key, data
+            )
+            status, failed = str(code), code >= 500
+        except Exception as error:
+            # Упавший запрос учитывается под именем исключения, чтобы в
+            # отчете было видно, что именно ломается.
+            status = type(error).__name__
+            failed = True
+        elapsed = time.perf_counter() - began
+        with self.lock:
+            result = self.results[pattern]
+            result['timings'].append(elapsed)
+            result['statuses'].append(status)
+            if failed:
+                result['failures'][status] += 1
+
+    def report(self, duration):
+        total = sum(len(item['timings']) for item in self.results.values())
+        errors = sum(
+            sum(item['failures'].values()) for item in self.results.values()
+        )
+        patterns = {}
+        for pattern, item in sorted(self.results.items()):
+            summary = summarize(
+                item['timings'], statuses=item['statuses']
+            )
+            failures = sum(item['failures'].values())
+            summary['errors'] = failures
+            summary['error_rate'] = round(failures / summary['requests'], 4)
+            summary['failures'] = dict(sorted(item['failures'].items()))
+            patterns[pattern] = summary
+        return {
+            'requests': total,
+            'duration_s': round(duration, 3),
+            'throughput_rps': round(total / duration, 2) if duration else 0,
+            'error_rate': round(errors / total, 4) if total else 0,
+            'patterns': patterns,
+        }
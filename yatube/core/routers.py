@@ -0,0 +1,87 @@
+import random
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_local = threading.local()
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def mark_write():
+    """Запись в запросе: дальше читать с primary и закрепить клиента.
+
+    Вызывают все роутеры, выбирающие базу для записи: до ReplicaRouter
+    запись на шард не доходит (ShardRouter отвечает раньше).
+    """
+    _local.read_replica = False
+    _local.wrote = True
+
+
+class ReplicaRouter:
+    """Чтения во view отправляет на реплику, все записи - на primary.
+
+    Реплика используется только внутри запроса, который middleware
+    пометила как читающий; команды, миграции и транзакции работают
+    с primary. Первая запись в запросе переводит его остальные чтения
+    на primary и отмечается для ReplicaPinningMiddleware.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not getattr(_local, 'read_replica', False):
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if not settings.DATABASE_REPLICAS:
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        mark_write()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaPinningMiddleware:
+    """Read-your-writes: после записи клиент читает с primary.
+
+    Небезопасный запрос (POST и т.п.) целиком идет на primary. Любой
+    запрос, который что-то записал на primary (в том числе GET вроде
+    подписки или отметки прочитанного), ставит cookie на
+    REPLICA_PIN_SECONDS; пока она жива, чтения тоже идут на primary
+    и реплика успевает догнать изменения.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = (
+            request.method not in SAFE_METHODS
+            or settings.REPLICA_PIN_COOKIE in request.COOKIES
+        )
+        _local.read_replica = not pinned
+        _local.wrote = False
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = _local.wrote
+            _local.read_replica = False
+            _local.wrote = False
+        if wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS, httponly=True,
+            )
+        return response
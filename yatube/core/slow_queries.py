@@ -0,0 +1,143 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger('core.slow_queries')
+
+_local = threading.local()
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDER_RE = re.compile(r'%s')
+IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+SPACE_RE = re.compile(r'\s+')
+
+
+def normalize(sql):
+    """Заменяет литералы и плейсхолдеры на ?, списки IN - на (...)."""
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    sql = PLACEHOLDER_RE.sub('?', sql)
+    sql = IN_LIST_RE.sub('(...)', sql)
+    return SPACE_RE.sub(' ', sql).strip()
+
+
+def fingerprint(text):
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def explain(connection, sql, params):
+    if connection.vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    else:
+        prefix = 'EXPLAIN '
+    _local.explaining = True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return [
+                ' '.join(str(column) for column in row)
+                for row in cursor.fetchall()
+            ]
+    except Exception as error:
+        return [f'EXPLAIN failed: {error}']
+    finally:
+        _local.explaining = False
+
+
+def slow_query_wrapper(execute, sql, params, many, context):
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS
+    if threshold is None or getattr(_local, 'explaining', False):
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = (time.perf_counter() - started) * 1000
+        if duration >= threshold:
+            record(context['connection'], sql, params, many, duration)
+
+
+def record(connection, sql, params, many, duration):
+    normalized = normalize(sql)
+    entry = {
+        'time': timezone.now().isoformat(),
+        'view': getattr(_local, 'view', None),
+        'duration_ms': round(duration, 3),
+        'fingerprint': fingerprint(normalized),
+        'params_fingerprint': fingerprint(repr(params)),
+        'sql': normalized,
+        'plan': [],
+    }
+    is_select = sql.lstrip()[:6].upper() == 'SELECT'
+    if settings.SLOW_QUERY_EXPLAIN and is_select and not many:
+        entry['plan'] = explain(connection, sql, params)
+    logger.warning(
+        'slow query %.1f ms view=%s fingerprint=%s: %s',
+        duration, entry['view'], entry['fingerprint'], normalized,
+        extra={'slow_query': entry},
+    )
+    if settings.SLOW_QUERY_LOG_FILE:
+        with open(settings.SLOW_QUERY_LOG_FILE, 'a', encoding='utf-8') as log:
+            log.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+
+def install(sender, connection, **kwargs):
+    if slow_query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(slow_query_wrapper)
+
+
+def aggregate(entries, top=10):
+    """Топ fingerprint'ов по суммарному времени."""
+    groups = {}
+    for entry in entries:
+        group = groups.setdefault(entry['fingerprint'], {
+            'fingerprint': entry['fingerprint'],
+            'sql': entry['sql'],
+            'count': 0,
+            'total_ms': 0.0,
+            'max_ms': 0.0,
+            'views': set(),
+            'params': set(),
+            'plan': entry['plan'],
+        })
+        group['count'] += 1
+        group['total_ms'] += entry['duration_ms']
+        group['max_ms'] = max(group['max_ms'], entry['duration_ms'])
+        if entry['view']:
+            group['views'].add(entry['view'])
+        group['params'].add(entry['params_fingerprint'])
+        if entry['plan']:
+            group['plan'] = entry['plan']
+    report = sorted(
+        groups.values(), key=lambda group: group['total_ms'], reverse=True
+    )[:top]
+    for group in report:
+        group['mean_ms'] = round(group['total_ms'] / group['count'], 3)
+        group['total_ms'] = round(group['total_ms'], 3)
+        group['views'] = sorted(group['views'])
+        group['distinct_params'] = len(group.pop('params'))
+    return report
+
+
+class SlowQueryMiddleware:
+    """Запоминает имя view, чтобы медленные запросы знали источник."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            _local.view = None
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        _local.view = match.view_name if match else view_func.__name__
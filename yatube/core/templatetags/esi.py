@@ -0,0 +1,12 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from core.esi import include
+
+register = template.Library()
+
+
+@register.simple_tag
+def esi(name, **params):
+    """Дырка под персональный фрагмент name (см. core.esi)."""
+    return mark_safe(include(name, **params))
@@ -0,0 +1,33 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from uuid import uuid4
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+@contextmanager
+def run_on_commit(using=DEFAULT_DB_ALIAS):
+    """Выполняет on_commit-колбэки, накопленные внутри блока.
+
+    TestCase держит тест в транзакции, которая не коммитится, и
+    колбэки иначе не запускаются. Бэкпорт captureOnCommitCallbacks
+    (execute=True) из Django 3.2.
+    """
+    connection = connections[using]
+    start = len(connection.run_on_commit)
+    try:
+        yield
+    finally:
+        while len(connection.run_on_commit) > start:
+            _, callback = connection.run_on_commit.pop(start)
+            callback()
+
+
+def temp_media_root():
+    """Путь для MEDIA_ROOT тестов; каталог создает хранилище при загрузке.
+
+    mkdtemp при импорте модуля оставлял пустые каталоги, если классы
+    модуля не запускались (-k, отдельный файл).
+    """
+    return os.path.join(tempfile.gettempdir(), f'yatube_media_{uuid4().hex}')
@@ -0,0 +1,100 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.core.cache.backends import locmem
+from django.test import SimpleTestCase, override_settings
+
+from core.cache import InstrumentedCacheMixin, LocMemCache, lock
+from core.metrics import get_registry, reset_registry
+from posts import versions
+
+MISSING = object()
+
+
+class MultiGetCache(locmem.LocMemCache):
+    """get_many одним запросом мимо get, как у memcached."""
+
+    def get_many(self, keys, version=None):
+        found = {}
+        for key in keys:
+            value = locmem.LocMemCache.get(self, key, MISSING, version)
+            if value is not MISSING:
+                found[key] = value
+        return found
+
+
+class InstrumentedMultiGetCache(InstrumentedCacheMixin, MultiGetCache):
+    pass
+
+
+class CacheLockTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_lock_serializes_read_modify_write(self):
+        cache.set('counter', [], 60)
+
+        def append(number):
+            with lock('counter'):
+                items = cache.get('counter')
+                time.sleep(0.001)
+                cache.set('counter', items + [number], 60)
+
+        threads = [
+            threading.Thread(target=append, args=(number,))
+            for number in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(cache.get('counter')), list(range(8)))
+        self.assertIsNone(cache.get('lock:counter'))
+
+    @override_settings(CACHE_LOCK_TIMEOUT=0.05)
+    def test_abandoned_lock_expires(self):
+        cache.add('lock:stale', 1, 0.05)
+        started = time.monotonic()
+        with lock('stale'):
+            self.assertGreaterEqual(time.monotonic() - started, 0.04)
+
+
+class InstrumentedCacheTest(SimpleTestCase):
+    def setUp(self):
+        reset_registry()
+        self.addCleanup(reset_registry)
+
+    def lookups(self):
+        counters = get_registry().counters
+        return {
+            result: counters.get(('yatube_cache_requests_total', (result,)))
+            for result in ('hit', 'miss')
+        }
+
+    def test_get_many_is_counted_once(self):
+        for backend in (LocMemCache, InstrumentedMultiGetCache):
+            with self.subTest(backend=backend.__name__):
+                reset_registry()
+                instrumented = backend(f'instrumented-{backend.__name__}', {})
+                instrumented.set('present', 1)
+                self.assertEqual(
+                    instrumented.get_many(['present', 'absent']),
+                    {'present': 1},
+                )
+                self.assertEqual(self.lookups(), {'hit': 1, 'miss': 1})
+
+
+class VersionCacheTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(VERSION_CACHE_TIMEOUT=60)
+    def test_marks_expire(self):
+        versions.get_versions([versions.INDEX])
+        versions.bump(versions.USERS)
+        for key in (versions.INDEX, versions.USERS):
+            expires = cache._expire_info[
+                cache.make_key(versions.cache_key(key))
+            ]
+            self.assertLessEqual(expires, time.time() + 60)
@@ -0,0 +1,116 @@
+from http import HTTPStatus
+
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core import esi
+
+from posts.models import Post
+
+User = get_user_model()
+
+
+class EsiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='EsiAuthor')
+        cls.reader = User.objects.create(username='EsiReader')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_cached_index_is_shared_and_personalized(self):
+        url = reverse('posts:index')
+        response = self.author_client.get(url)
+        self.assertContains(response, 'Пользователь: EsiAuthor')
+        self.assertNotContains(response, '<esi:include')
+        response = self.reader_client.get(url)
+        self.assertNotIn(
+            'posts/index.html', [t.name for t in response.templates]
+        )
+        self.assertContains(response, 'Пользователь: EsiReader')
+        self.assertContains(response, 'Избранные авторы')
+        response = self.client.get(url)
+        self.assertNotContains(response, 'Пользователь:')
+        self.assertNotContains(response, 'Избранные авторы')
+
+    def test_post_actions_depend_on_viewer(self):
+        url = reverse('posts:post_detail', args=(self.post.id,))
+        edit = reverse('posts:post_edit', args=(self.post.id,))
+        response = self.author_client.get(url)
+        self.assertContains(response, edit)
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        response = self.reader_client.get(url)
+        self.assertNotContains(response, edit)
+        self.assertContains(response, 'Добавить комментарий')
+        self.assertNotContains(self.client.get(url), 'Добавить комментарий')
+
+    def test_edge_with_esi_gets_placeholders(self):
+        response = self.reader_client.get(
+            reverse('posts:profile', args=(self.author.username,)),
+            HTTP_SURROGATE_CAPABILITY='varnish="ESI/1.0"',
+        )
+        self.assertContains(response, '<esi:include src="/fragments/')
+        self.assertNotContains(response, 'Подписаться')
+        self.assertEqual(response['Surrogate-Control'], 'content="ESI/1.0"')
+
+    def test_fragment_endpoint(self):
+        response = self.reader_client.get(
+            reverse('fragment', args=('profile_actions',)),
+            {'username': self.author.username},
+        )
+        self.assertContains(response, 'Подписаться')
+        self.assertIn('max-age=0', response['Cache-Control'])
+        for name, params in (
+            ('unknown', {}),
+            ('profile_actions', {}),
+            ('profile_actions', {'username': 'x', 'extra': '1'}),
+        ):
+            with self.subTest(name=name):
+                response = self.client.get(
+                    reverse('fragment', args=(name,)), params
+                )
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_fragment_errors_are_not_hidden(self):
+        broken = mock.Mock(side_effect=KeyError('bug'))
+        with mock.patch.dict(esi.FRAGMENTS, {'header': broken}):
+            with self.assertRaises(KeyError):
+                self.client.get(reverse('fragment', args=('header',)))
+
+    def test_post_actions_validates_params(self):
+        url = reverse('fragment', args=('post_actions',))
+        for params in (
+            {'post_id': 'abc', 'author': self.author.username},
+            {'post_id': self.post.id},
+        ):
+            with self.subTest(params=params):
+                response = self.author_client.get(url, params)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_post_actions_edit_link_only_for_author(self):
+        url = reverse('fragment', args=('post_actions',))
+        cases = (
+            (self.author_client, self.author.username, True),
+            (self.reader_client, self.author.username, False),
+            (self.client, '', False),
+        )
+        for client, author, shown in cases:
+            with self.subTest(author=author, shown=shown):
+                response = client.get(
+                    url, {'post_id': self.post.id, 'author': author}
+                )
+                self.assertEqual(
+                    'Редактировать запись' in response.content.decode(),
+                    shown,
+                )
@@ -0,0 +1,155 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.metrics import Registry, mark_process_dead, reset_registry
+from core.testing import temp_media_root
+from posts.models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = temp_media_root()
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+class RegistryTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_workers_are_aggregated(self):
+        first = Registry(self.directory)
+        second = Registry(self.directory)
+        first.inc('yatube_db_queries_total', ('posts:index',), 3)
+        second.inc('yatube_db_queries_total', ('posts:index',), 4)
+        first.observe(
+            'yatube_request_duration_seconds', 0.02, ('posts:index',)
+        )
+        second.observe(
+            'yatube_request_duration_seconds', 3, ('posts:index',)
+        )
+        second.flush()
+        text = first.render()
+        self.assertIn(
+            'yatube_db_queries_total{view="posts:index"} 7', text
+        )
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket'
+            '{view="posts:index",le="0.025"} 1', text
+        )
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket'
+            '{view="posts:index",le="+Inf"} 2', text
+        )
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 2',
+            text
+        )
+
+    def dead_worker_file(self):
+        process = subprocess.Popen([sys.executable, '-c', 'pass'])
+        process.wait()
+        dead = Registry(self.directory)
+        dead.filename = os.path.join(
+            self.directory, f'{process.pid}-deadbeef.json'
+        )
+        dead.inc('yatube_db_queries_total', ('posts:index',), 5)
+        dead.flush()
+        return process.pid, dead.filename
+
+    def test_dead_workers_are_dropped(self):
+        pid, path = self.dead_worker_file()
+        live = Registry(self.directory)
+        live.inc('yatube_db_queries_total', ('posts:index',), 1)
+        self.assertIn(
+            'yatube_db_queries_total{view="posts:index"} 1', live.render()
+        )
+        self.assertFalse(os.path.exists(path))
+
+    def test_mark_process_dead_removes_worker_files(self):
+        pid, path = self.dead_worker_file()
+        live = Registry(self.directory)
+        live.flush()
+        mark_process_dead(pid, self.directory)
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(live.filename))
+        live.close()
+        self.assertFalse(os.path.exists(live.filename))
+
+    def test_recording_is_cheap(self):
+        registry = Registry()
+        started = time.perf_counter()
+        for _ in range(10000):
+            registry.observe(
+                'yatube_request_duration_seconds', 0.01, ('posts:index',)
+            )
+        per_call = (time.perf_counter() - started) / 10000
+        self.assertLess(per_call, 50e-6)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MetricsEndpointTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='MetricsUser')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                'metrics.gif', SMALL_GIF, content_type='image/gif'
+            ),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        reset_registry()
+
+    def tearDown(self):
+        reset_registry()
+
+    def test_metrics_exposition(self):
+        self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        )
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        text = response.content.decode()
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:post_detail"}'
+            ' 1', text
+        )
+        self.assertIn(
+            'yatube_responses_total{view="posts:post_detail",status="200"}',
+            text
+        )
+        self.assertIn('yatube_thumbnail_generation_seconds_count', text)
+        self.assertIn('yatube_cache_hit_ratio', text)
+
+    def test_metrics_forbidden_for_other_hosts(self):
+        response = self.client.get(
+            reverse('metrics'), REMOTE_ADDR='10.1.2.3'
+        )
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,250 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import requests
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import SimpleTestCase, TransactionTestCase
+from django.test import override_settings
+from django.urls import reverse
+
+from core import purge
+from core.replay import LocalServer
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class StandInProxy(ThreadingHTTPServer):
+    """Кэширующий прокси для тестов: GET из кэша, PURGE по Surrogate-Key."""
+
+    daemon_threads = True
+
+    def __init__(self, upstream):
+        super().__init__(('127.0.0.1', 0), ProxyHandler)
+        self.upstream = upstream
+        self.pages = {}
+        self.keys = {}
+        self.purges = []
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(
+            target=self.serve_forever, daemon=True
+        )
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+
+class ProxyHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status, body=b'', headers=()):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        proxy = self.server
+        with proxy.lock:
+            page = proxy.pages.get(self.path)
+        if page is not None:
+            return self.reply(200, page, [('X-Cache', 'HIT')])
+        response = requests.get(
+            proxy.upstream + self.path, allow_redirects=False
+        )
+        keys = response.headers.get('Surrogate-Key', '').split()
+        if response.status_code == 200 and keys:
+            with proxy.lock:
+                proxy.pages[self.path] = response.content
+                for key in keys:
+                    proxy.keys.setdefault(key, set()).add(self.path)
+        self.reply(response.status_code, response.content, [
+            ('X-Cache', 'MISS'),
+        ])
+
+    def do_PURGE(self):
+        proxy = self.server
+        keys = self.headers.get('Surrogate-Key', '').split()
+        with proxy.lock:
+            proxy.purges.append(keys)
+            for key in keys:
+                for path in proxy.keys.pop(key, ()):
+                    proxy.pages.pop(path, None)
+        self.reply(200)
+
+
+class ProxyPurgeTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        purge.reset_dispatcher()
+        self.author = User.objects.create(username='ProxyAuthor')
+        self.other = User.objects.create(username='ProxyOther')
+        self.reader = User.objects.create(username='ProxyReader')
+        self.group = Group.objects.create(
+            title='Proxy group', slug='proxy_group', description='Proxy',
+        )
+        self.post = Post.objects.create(
+            author=self.author, text='Пост', group=self.group
+        )
+        Post.objects.create(author=self.other, text='Чужой пост')
+        self.app = LocalServer().__enter__()
+        self.proxy = StandInProxy(self.app.url).__enter__()
+        settings = override_settings(
+            PURGE_BACKEND='core.purge.HttpPurgeBackend',
+            PURGE_URL=self.proxy.url + '/',
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(purge.reset_dispatcher)
+        self.addCleanup(self.app.__exit__)
+        self.addCleanup(self.proxy.__exit__)
+        self.urls = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group_list', args=(self.group.slug,)),
+            'profile': reverse('posts:profile', args=(self.author.username,)),
+            'other': reverse('posts:profile', args=(self.other.username,)),
+            'detail': reverse('posts:post_detail', args=(self.post.id,)),
+        }
+
+    def fetch(self, name):
+        return requests.get(self.proxy.url + self.urls[name])
+
+    def cached(self):
+        for name in self.urls:
+            self.fetch(name)
+        return {
+            name for name, url in self.urls.items()
+            if url in self.proxy.pages
+        }
+
+    def test_pages_carry_surrogate_keys(self):
+        response = requests.get(self.app.url + self.urls['detail'])
+        keys = response.headers['Surrogate-Key'].split()
+        self.assertEqual(set(keys), {
+            f'post:{self.post.id}', 'author:ProxyAuthor', 'group:proxy_group',
+        })
+        self.assertEqual(
+            response.headers['Cache-Tag'].split(','), sorted(keys)
+        )
+        self.assertEqual(self.fetch('detail').headers['X-Cache'], 'MISS')
+        self.assertEqual(self.fetch('detail').headers['X-Cache'], 'HIT')
+
+    def test_changes_purge_only_affected_pages(self):
+        changes = {
+            'comment': lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Ком'
+            ),
+            'group': lambda: Group.objects.get(pk=self.group.pk).save(),
+            'follow': lambda: Follow.objects.create(
+                user=self.reader, author=self.author
+            ),
+        }
+        expected = {
+            'comment': {'other'},
+            'group': {'other'},
+            'follow': set(self.urls),
+        }
+        for change, action in changes.items():
+            with self.subTest(change=change):
+                self.assertEqual(self.cached(), set(self.urls))
+                action()
+                self.assertEqual(
+                    set(self.proxy.pages),
+                    {self.urls[name] for name in expected[change]},
+                )
+
+    def test_request_purges_are_batched_and_deduplicated(self):
+        self.cached()
+        self.client.force_login(self.author)
+        self.client.post(
+            reverse('posts:post_edit', args=(self.post.id,)),
+            {'text': 'Новый текст', 'group': self.group.id},
+        )
+        self.assertEqual(len(self.proxy.purges), 1)
+        keys = self.proxy.purges[0]
+        self.assertEqual(len(keys), len(set(keys)))
+        self.assertIn(f'post:{self.post.id}', keys)
+        self.assertEqual(set(self.proxy.pages), {self.urls['other']})
+
+    def test_write_in_transaction_purges_once_after_commit(self):
+        self.cached()
+        with transaction.atomic():
+            Group.objects.get(pk=self.group.pk).save()
+            self.assertEqual(self.proxy.purges, [])
+        self.assertEqual(len(self.proxy.purges), 1)
+        self.assertIn('group:proxy_group', self.proxy.purges[0])
+
+
+class PurgeDispatcherTest(SimpleTestCase):
+    def setUp(self):
+        self.backend = mock.Mock()
+        self.dispatcher = purge.PurgeDispatcher(self.backend)
+        self.callbacks = []
+        patcher = mock.patch.object(
+            purge.transaction, 'on_commit',
+            side_effect=lambda func, using: self.callbacks.append(
+                (using, func)
+            ),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def in_atomic(self, *aliases):
+        return mock.patch.object(purge, 'connections', {
+            alias: mock.Mock(in_atomic_block=alias in aliases)
+            for alias in ('default', 'shard')
+        })
+
+    def test_purge_waits_for_commit_on_its_alias(self):
+        with self.in_atomic('shard'):
+            self.dispatcher.purge('post:1', using='shard')
+        self.backend.purge.assert_not_called()
+        self.assertEqual(
+            [using for using, func in self.callbacks], ['shard']
+        )
+        self.callbacks[0][1]()
+        self.backend.purge.assert_called_once_with(['post:1'])
+
+    def test_batch_sends_committed_aliases_together(self):
+        with self.in_atomic('shard'):
+            with self.dispatcher.batch():
+                self.dispatcher.purge('post:1')
+                self.dispatcher.purge('post:2', using='shard')
+                self.dispatcher.purge('post:1', using='shard')
+        self.backend.purge.assert_called_once_with(['post:1'])
+        self.assertEqual(
+            [using for using, func in self.callbacks], ['shard']
+        )
+        self.callbacks[0][1]()
+        self.backend.purge.assert_called_with(['post:1', 'post:2'])
+
+
+class PurgeBackendTest(SimpleTestCase):
+    def test_keys_are_sent_in_chunks_and_errors_logged(self):
+        backend = purge.HttpPurgeBackend('http://proxy/', 1, 2)
+        with mock.patch.object(
+            purge.requests, 'request',
+            side_effect=requests.ConnectionError('down'),
+        ) as request, self.assertLogs('core.purge', 'WARNING'):
+            backend.purge(['a', 'b', 'c'])
+        self.assertEqual(
+            [call.kwargs['headers']['Surrogate-Key']
+             for call in request.call_args_list],
+            ['a b', 'c'],
+        )
@@ -0,0 +1,104 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+
+from core.replay import (HttpTransport, InProcessTransport, LocalServer,
+                         Replayer, parse_log, resolve_pattern)
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+LOG = [
+    '127.0.0.1 - - [19/Oct/2026:10:00:00 +0000] "GET / HTTP/1.1" 200 512',
+    '127.0.0.1 - - [19/Oct/2026:10:00:01 +0000] "GET /?page=40 HTTP/1.1" '
+    '200 512 "-" "Mozilla/5.0"',
+    '10.0.0.2 - alice [19/Oct/2026:10:00:01 +0000] "GET /follow/ HTTP/1.1" '
+    '200 512',
+    '10.0.0.3 - - [19/Oct/2026:10:00:02 +0000] '
+    '"POST /posts/{post}/comment/ HTTP/1.1" 302 0',
+    '10.0.0.3 - - [19/Oct/2026:10:00:02 +0000] '
+    '"GET /static/css/bootstrap.min.css HTTP/1.1" 200 100',
+    'garbage line',
+]
+
+
+class ParseLogTest(TestCase):
+    def test_parse_skips_static_and_garbage(self):
+        entries = list(parse_log(LOG))
+        self.assertEqual(len(entries), 4)
+        self.assertEqual(entries[1].path, '/?page=40')
+        self.assertEqual(entries[2].user, 'alice')
+        self.assertEqual(entries[3].method, 'POST')
+
+    def test_resolve_pattern(self):
+        self.assertEqual(resolve_pattern('/?page=3'), 'posts:index')
+        self.assertEqual(
+            resolve_pattern('/profile/someone/'), 'posts:profile'
+        )
+        self.assertEqual(resolve_pattern('/auth/login/'), 'users:login')
+        self.assertEqual(resolve_pattern('/nowhere/'), 'unresolved')
+
+
+class ReplayTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = [
+            User.objects.create(username=f'bench_user_{number}')
+            for number in range(3)
+        ]
+        self.post = Post.objects.create(author=self.users[0], text='Пост')
+        self.entries = list(parse_log(
+            line.format(post=self.post.id) for line in LOG
+        ))
+
+    def check_report(self, report):
+        self.assertEqual(report['requests'], 4)
+        self.assertEqual(report['error_rate'], 0)
+        self.assertEqual(
+            report['patterns']['posts:index']['requests'], 2
+        )
+        self.assertEqual(
+            report['patterns']['posts:follow_index']['statuses'],
+            {'200': 1},
+        )
+        self.assertEqual(Comment.objects.filter(post=self.post).count(), 1)
+
+    def test_replay_in_process(self):
+        replayer = Replayer(
+            InProcessTransport(), users=self.users, concurrency=2, speedup=0
+        )
+        self.check_report(replayer.run(self.entries))
+
+    def test_replay_over_local_wsgi_server(self):
+        with LocalServer() as server:
+            replayer = Replayer(
+                HttpTransport(server.url), users=self.users, speedup=0
+            )
+            self.check_report(replayer.run(self.entries))
+
+
+class FailingTransport:
+    """Главная отвечает 503, остальные страницы - ошибкой соединения."""
+
+    def send(self, method, path, session_key, data):
+        if path.startswith('/?') or path == '/':
+            return 503
+        raise ConnectionError(path)
+
+    def close(self):
+        pass
+
+
+class ReplayFailuresTest(SimpleTestCase):
+    def test_failures_are_counted_by_status_and_exception(self):
+        entries = [
+            entry for entry in parse_log(LOG) if entry.method == 'GET'
+        ]
+        report = Replayer(FailingTransport(), speedup=0).run(entries)
+        self.assertEqual(report['error_rate'], 1)
+        index = report['patterns']['posts:index']
+        self.assertEqual(index['errors'], 2)
+        self.assertEqual(index['failures'], {'503': 2})
+        follow = report['patterns']['posts:follow_index']
+        self.assertEqual(follow['failures'], {'ConnectionError': 1})
+        self.assertEqual(follow['statuses'], {'ConnectionError': 1})
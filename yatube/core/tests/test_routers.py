@@ -0,0 +1,144 @@
+import io
+import os
+import sqlite3
+import tempfile
+
+from django.core.management import call_command
+from django.db import router
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory, SimpleTestCase, TestCase, override_settings
+)
+
+from core.routers import ReplicaPinningMiddleware, ReplicaRouter
+from posts.models import Group, Post
+
+
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def route(self, request):
+        routed = {}
+
+        def view(request):
+            routed['read'] = self.router.db_for_read(Post)
+            return HttpResponse()
+
+        response = ReplicaPinningMiddleware(view)(request)
+        return routed, response
+
+    def test_reads_go_to_replica_writes_to_primary(self):
+        with override_settings(DATABASE_REPLICAS=['replica']):
+            routed, response = self.route(self.factory.get('/'))
+        self.assertEqual(routed['read'], 'replica')
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+        self.assertNotIn('db_primary', response.cookies)
+
+    def test_write_pins_client_to_primary(self):
+        def view(request):
+            self.router.db_for_write(Post)
+            return HttpResponse()
+
+        with override_settings(DATABASE_REPLICAS=['replica']):
+            routed, _ = self.route(self.factory.post('/'))
+            self.assertEqual(routed['read'], 'default')
+            response = ReplicaPinningMiddleware(view)(self.factory.post('/'))
+            self.assertIn('db_primary', response.cookies)
+            request = self.factory.get('/')
+            request.COOKIES['db_primary'] = '1'
+            routed, _ = self.route(request)
+        self.assertEqual(routed['read'], 'default')
+
+    def test_write_in_get_pins_client_to_primary(self):
+        # Подписка и отметка прочитанного пишут в базу на GET.
+        reads = []
+
+        def view(request):
+            reads.append(self.router.db_for_read(Post))
+            self.router.db_for_write(Post)
+            reads.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        with override_settings(DATABASE_REPLICAS=['replica']):
+            response = ReplicaPinningMiddleware(view)(self.factory.get('/'))
+        self.assertEqual(reads, ['replica', 'default'])
+        self.assertIn('db_primary', response.cookies)
+
+    def test_shard_write_pins_client_to_primary(self):
+        # ShardRouter стоит первым и отвечает за запись поста сам.
+        routed = []
+
+        def view(request):
+            routed.append(router.db_for_write(Post, instance=Post(pk=3)))
+            routed.append(router.db_for_read(Group))
+            return HttpResponse()
+
+        with override_settings(
+            DATABASE_REPLICAS=['replica'], POST_SHARDS=['shard_0', 'shard_1']
+        ):
+            response = ReplicaPinningMiddleware(view)(self.factory.get('/'))
+        self.assertEqual(routed, ['shard_1', 'default'])
+        self.assertIn('db_primary', response.cookies)
+
+    def test_unsafe_request_without_writes_does_not_pin(self):
+        def view(request):
+            return HttpResponse()
+
+        with override_settings(DATABASE_REPLICAS=['replica']):
+            response = ReplicaPinningMiddleware(view)(self.factory.post('/'))
+        self.assertNotIn('db_primary', response.cookies)
+
+    def test_outside_requests_and_without_replicas_use_primary(self):
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        routed, _ = self.route(self.factory.get('/'))
+        self.assertEqual(routed['read'], 'default')
+
+
+class RefreshReplicaTest(TestCase):
+    def test_backup_copies_database(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'primary.sqlite3')
+            target = os.path.join(directory, 'replica.sqlite3')
+            with sqlite3.connect(source) as connection:
+                connection.execute('CREATE TABLE t (value INTEGER)')
+                connection.execute('INSERT INTO t VALUES (42)')
+            connection.close()
+            call_command(
+                'refresh_replica', source=source, target=target,
+                stdout=io.StringIO(),
+            )
+            connection = sqlite3.connect(target)
+            self.assertEqual(
+                connection.execute('SELECT value FROM t').fetchall(), [(42,)]
+            )
+            connection.close()
+
+    def test_refresh_keeps_open_wal_connections_current(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'primary.sqlite3')
+            target = os.path.join(directory, 'replica.sqlite3')
+            primary = sqlite3.connect(source, isolation_level=None)
+            primary.execute('CREATE TABLE t (value INTEGER)')
+            primary.execute('INSERT INTO t VALUES (1)')
+            call_command(
+                'refresh_replica', source=source, target=target,
+                stdout=io.StringIO(),
+            )
+            replica = sqlite3.connect(target, isolation_level=None)
+            replica.execute('PRAGMA journal_mode=WAL')
+            self.assertEqual(
+                replica.execute('SELECT value FROM t').fetchall(), [(1,)]
+            )
+            primary.execute('INSERT INTO t VALUES (2)')
+            call_command(
+                'refresh_replica', source=source, target=target,
+                stdout=io.StringIO(),
+            )
+            self.assertEqual(
+                replica.execute('SELECT value FROM t').fetchall(),
+                [(1,), (2,)],
+            )
+            replica.close()
+            primary.close()
@@ -0,0 +1,96 @@
+import io
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.slow_queries import aggregate, normalize
+from posts.models import Follow, Post
+
+User = get_user_model()
+
+
+class NormalizeTest(TestCase):
+    def test_literals_and_in_lists_are_normalized(self):
+        self.assertEqual(
+            normalize(
+                "SELECT * FROM t WHERE a = 'x''y' AND b IN (%s, %s, %s)\n"
+                "  LIMIT 10"
+            ),
+            'SELECT * FROM t WHERE a = ? AND b IN (...) LIMIT ?',
+        )
+
+    def test_aggregate_orders_by_total_time(self):
+        entries = [
+            {'fingerprint': 'a', 'sql': 'A', 'duration_ms': 5, 'view': 'v1',
+             'params_fingerprint': 'p1', 'plan': []},
+            {'fingerprint': 'b', 'sql': 'B', 'duration_ms': 3, 'view': 'v1',
+             'params_fingerprint': 'p1', 'plan': ['SCAN b']},
+            {'fingerprint': 'b', 'sql': 'B', 'duration_ms': 4, 'view': 'v2',
+             'params_fingerprint': 'p2', 'plan': []},
+        ]
+        report = aggregate(entries, top=1)
+        self.assertEqual(len(report), 1)
+        self.assertEqual(report[0]['fingerprint'], 'b')
+        self.assertEqual(report[0]['count'], 2)
+        self.assertEqual(report[0]['views'], ['v1', 'v2'])
+        self.assertEqual(report[0]['distinct_params'], 2)
+        self.assertEqual(report[0]['plan'], ['SCAN b'])
+
+
+class SlowQueryLogTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='SlowAuthor')
+        cls.reader = User.objects.create(username='SlowReader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        descriptor, self.log_file = tempfile.mkstemp(suffix='.log')
+        os.close(descriptor)
+
+    def tearDown(self):
+        os.remove(self.log_file)
+
+    def read_log(self):
+        with open(self.log_file, encoding='utf-8') as log:
+            return [json.loads(line) for line in log]
+
+    def test_slow_queries_are_logged_with_view_and_plan(self):
+        self.client.force_login(self.reader)
+        with override_settings(
+            SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_LOG_FILE=self.log_file
+        ), self.assertLogs('core.slow_queries', 'WARNING'):
+            self.client.get(reverse('posts:follow_index'))
+        entries = [
+            entry for entry in self.read_log()
+            if entry['view'] == 'posts:follow_index'
+            and 'posts_follow' in entry['sql']
+        ]
+        self.assertTrue(entries)
+        self.assertTrue(entries[0]['plan'])
+        self.assertNotIn(str(self.reader.id) + ')', entries[0]['sql'])
+
+        output = io.StringIO()
+        call_command(
+            'slow_queries', file=self.log_file, top=3, json=True,
+            stdout=output,
+        )
+        report = json.loads(output.getvalue())
+        self.assertLessEqual(len(report), 3)
+        self.assertIn('posts:follow_index', report[0]['views'])
+
+    def test_fast_queries_are_not_logged(self):
+        with override_settings(
+            SLOW_QUERY_THRESHOLD_MS=10000, SLOW_QUERY_LOG_FILE=self.log_file
+        ):
+            self.client.get(reverse('posts:index'))
+        self.assertEqual(self.read_log(), [])
@@ -0,0 +1,67 @@
+import io
+import json
+import os
+import sqlite3
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from core.db.backends.sqlite3.base import retry_locked
+
+
+class SQLiteBackendTest(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_are_applied_on_connect(self):
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('cache_size'), -20000)
+
+    def test_maintenance_command(self):
+        output = io.StringIO()
+        call_command('sqlite_maintenance', stdout=output)
+        self.assertIn('ANALYZE', output.getvalue())
+        self.assertIn('PRAGMA optimize', output.getvalue())
+
+
+class RetryLockedTest(SimpleTestCase):
+    def test_lock_errors_are_retried_outside_transactions(self):
+        calls = mock.Mock(side_effect=[
+            sqlite3.OperationalError('database is locked'),
+            sqlite3.OperationalError('database table is locked'), 'ok',
+        ])
+        connection = mock.Mock(in_transaction=False)
+        with mock.patch('core.db.backends.sqlite3.base.time.sleep'):
+            self.assertEqual(retry_locked(calls, connection, 3, 0), 'ok')
+        self.assertEqual(calls.call_count, 3)
+
+    def test_no_retry_inside_transaction_or_after_limit(self):
+        error = sqlite3.OperationalError('database is locked')
+        for in_transaction, retries in ((True, 3), (False, 0)):
+            with self.subTest(in_transaction=in_transaction):
+                calls = mock.Mock(side_effect=error)
+                connection = mock.Mock(in_transaction=in_transaction)
+                with self.assertRaises(sqlite3.OperationalError):
+                    retry_locked(calls, connection, retries, 0)
+                self.assertEqual(calls.call_count, 1)
+
+    def test_benchmark_reports_all_profiles(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'report.json')
+            call_command(
+                'benchmark_sqlite', threads=2, duration=0.2, rows=100,
+                output=path, stdout=io.StringIO(),
+            )
+            with open(path, encoding='utf-8') as report:
+                results = json.load(report)['results']
+        self.assertEqual(set(results), {'baseline', 'tuned', 'queued'})
+        for name in ('tuned', 'queued'):
+            with self.subTest(profile=name):
+                self.assertGreater(results[name]['requests'], 0)
+                self.assertEqual(results[name]['errors'], 0)
@@ -0,0 +1,69 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import timing
+from posts.models import Post
+
+User = get_user_model()
+
+
+@override_settings(SERVER_TIMING_SAMPLE_RATE=1)
+class ServerTimingMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='TimingUser')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def parse(self, response):
+        metrics = {}
+        for metric in response['Server-Timing'].split(', '):
+            name, *params = metric.split(';')
+            metrics[name] = dict(param.split('=', 1) for param in params)
+        return metrics
+
+    def test_header_reports_sql_and_templates(self):
+        with self.assertLogs('core.timing', 'INFO') as logs:
+            response = self.client.get(
+                reverse('posts:profile', kwargs={'username': self.user})
+            )
+        metrics = self.parse(response)
+        self.assertIn('dur', metrics['sql'])
+        self.assertNotEqual(metrics['sql']['desc'], '"0 queries"')
+        self.assertGreater(float(metrics['tpl']['dur']), 0)
+        self.assertIn('total', metrics)
+        self.assertIn('view=posts:profile', logs.output[0])
+        self.assertIn('sql_count=', logs.output[0])
+
+    def test_header_counts_cache_hits(self):
+        self.client.get(reverse('posts:index'))
+        metrics = self.parse(self.client.get(reverse('posts:index')))
+        self.assertNotIn('hit=0 ', metrics['cache']['desc'])
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+    def test_disabled_sampling(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+class RequestTimingsTest(TestCase):
+    def test_nested_time_is_not_counted_twice(self):
+        with timing.collect() as timings:
+            with timing.template_render():
+                list(Post.objects.all())
+                timing.record_thumbnail(0.5)
+        summary = timings.summary(total=2.0)
+        self.assertEqual(timings.sql_count, 1)
+        self.assertEqual(timings.thumbnail_count, 1)
+        self.assertLess(summary['tpl'], timings.template_time)
+        self.assertAlmostEqual(
+            summary['view'] + summary['tpl'] + summary['sql']
+            + summary['thumb'],
+            2.0,
+        )
+        self.assertIsNone(timing.current())
@@ -0,0 +1,136 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core.db import writer
+from core.db.writer import WriteQueue
+from posts import counts, feed_cache, versions
+from posts.models import Comment, Follow, Post
+
+User = get_user_model()
+
+
+@override_settings(WRITE_QUEUE_ENABLED=True)
+class WriteQueueTest(TransactionTestCase):
+    def setUp(self):
+        self.queue = WriteQueue(batch_size=8)
+        self.user = User.objects.create(username='WriterUser')
+
+    def tearDown(self):
+        self.queue.stop()
+
+    def block_writer(self):
+        started, gate = threading.Event(), threading.Event()
+        self.queue.submit(lambda: (started.set(), gate.wait()))
+        started.wait(5)
+        return gate
+
+    def test_jobs_are_committed_in_batches(self):
+        batches = []
+        original = self.queue.commit
+        self.queue.commit = lambda batch: (
+            batches.append(len(batch)), original(batch)
+        )
+        gate = self.block_writer()
+        futures = [
+            self.queue.submit(
+                Post.objects.create, author=self.user, text=f'Пост {number}'
+            )
+            for number in range(5)
+        ]
+        gate.set()
+        posts = [future.result(5) for future in futures]
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertEqual(posts[0].text, 'Пост 0')
+        self.assertEqual(batches, [1, 5])
+
+    def test_failed_job_does_not_roll_back_the_batch(self):
+        gate = self.block_writer()
+        good = self.queue.submit(
+            Post.objects.create, author=self.user, text='Пост'
+        )
+        bad = self.queue.submit(Post.objects.create, text='Без автора')
+        gate.set()
+        good.result(5)
+        with self.assertRaises(Exception):
+            bad.result(5)
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_batch_is_atomic_on_queue_database(self):
+        aliases = []
+
+        def atomic(using):
+            aliases.append(using)
+            return transaction.atomic(using=using)
+
+        self.queue = WriteQueue(atomic=atomic, using='default')
+        self.queue.submit(Post.objects.create, author=self.user, text='П')
+        self.queue.stop()
+        self.assertEqual(aliases, ['default', 'default'])
+
+    def test_side_effects_wait_for_commit(self):
+        cache.clear()
+        post = Post.objects.create(author=self.user, text='Пост')
+        index = counts.feed_count(counts.INDEX, Post.objects.all())
+        key = versions.post_key(post.id)
+        with transaction.atomic():
+            Post.objects.create(author=self.user, text='Второй')
+            self.assertEqual(counts.feed_count(counts.INDEX, []), index)
+            post.text = 'Новый текст'
+            post.save()
+            # Читатель до коммита кэширует старую строку под новой меткой.
+            stamp = versions.get_versions([key])
+            cache.set(feed_cache.post_key(post.id), 'старый пост')
+        self.assertEqual(counts.feed_count(counts.INDEX, []), index + 1)
+        self.assertIsNone(cache.get(feed_cache.post_key(post.id)))
+        self.assertNotEqual(versions.get_versions([key]), stamp)
+
+    def test_run_uses_writer_thread_outside_transactions(self):
+        try:
+            thread = writer.run(threading.current_thread)
+            with transaction.atomic():
+                inline = writer.run(threading.current_thread)
+        finally:
+            writer.get_queue().stop()
+        self.assertEqual(thread.name, 'write-queue')
+        self.assertIs(inline, threading.current_thread())
+
+
+class WriterViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='WriterAuthor')
+        cls.reader = User.objects.create(username='WriterReader')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def test_writes_go_through_writer_run(self):
+        self.client.force_login(self.reader)
+        calls = []
+        original = writer.run
+
+        def run(func, *args, **kwargs):
+            calls.append(func)
+            return original(func, *args, **kwargs)
+
+        writer.run = run
+        try:
+            self.client.post(
+                reverse('posts:add_comment', args=(self.post.id,)),
+                {'text': 'Комментарий'},
+            )
+            self.client.get(
+                reverse('posts:profile_follow', args=(self.author,))
+            )
+            self.client.get(
+                reverse('posts:profile_unfollow', args=(self.author,))
+            )
+        finally:
+            writer.run = original
+        self.assertEqual(len(calls), 3)
+        self.assertTrue(Comment.objects.filter(text='Комментарий').exists())
+        self.assertFalse(Follow.objects.exists())
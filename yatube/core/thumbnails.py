@@ -0,0 +1,30 @@
+import time
+
+from sorl.thumbnail.base import ThumbnailBackend
+
+from . import timing
+from .metrics import get_registry
+
+
+class TimedThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl-thumbnail, замеряющий получение и генерацию миниатюр."""
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        started = time.perf_counter()
+        try:
+            return super().get_thumbnail(file_, geometry_string, **options)
+        finally:
+            timing.record_thumbnail(time.perf_counter() - started)
+
+    def _create_thumbnail(self, source_image, geometry_string, options,
+                          thumbnail):
+        started = time.perf_counter()
+        try:
+            return super()._create_thumbnail(
+                source_image, geometry_string, options, thumbnail
+            )
+        finally:
+            get_registry().observe(
+                'yatube_thumbnail_generation_seconds',
+                time.perf_counter() - started,
+            )
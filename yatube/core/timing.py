@@ -0,0 +1,105 @@
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+_local = threading.local()
+
+
+class RequestTimings:
+    """Счетчики одного запроса: SQL, шаблоны, кеш и миниатюры.
+
+    Время SQL и миниатюр, потраченное внутри рендера шаблона, учитывается
+    один раз: template_time в сводке - собственное время шаблонизатора.
+    """
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.thumbnail_count = 0
+        self.thumbnail_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.nested_time = 0.0
+        self.template_depth = 0
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.add_nested('sql', time.perf_counter() - started)
+
+    def add_nested(self, kind, elapsed):
+        if kind == 'sql':
+            self.sql_count += 1
+            self.sql_time += elapsed
+        else:
+            self.thumbnail_count += 1
+            self.thumbnail_time += elapsed
+        if self.template_depth:
+            self.nested_time += elapsed
+
+    def summary(self, total):
+        template = max(self.template_time - self.nested_time, 0.0)
+        return {
+            'sql': self.sql_time,
+            'tpl': template,
+            'thumb': self.thumbnail_time,
+            'view': max(
+                total - self.sql_time - self.thumbnail_time - template, 0.0
+            ),
+            'total': total,
+        }
+
+
+def current():
+    return getattr(_local, 'timings', None)
+
+
+@contextmanager
+def collect():
+    """Включает сбор счетчиков для текущего потока."""
+    timings = RequestTimings()
+    previous = current()
+    _local.timings = timings
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(timings.execute)
+                )
+            yield timings
+    finally:
+        _local.timings = previous
+
+
+@contextmanager
+def template_render():
+    timings = current()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    timings.template_depth += 1
+    try:
+        yield
+    finally:
+        timings.template_depth -= 1
+        if not timings.template_depth:
+            timings.template_time += time.perf_counter() - started
+
+
+def record_thumbnail(elapsed):
+    timings = current()
+    if timings is not None:
+        timings.add_nested('thumb', elapsed)
+
+
+def record_cache(hits, misses):
+    timings = current()
+    if timings is not None:
+        timings.cache_hits += hits
+        timings.cache_misses += misses
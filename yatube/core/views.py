@@ -1,4 +1,10 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden
 from django.shortcuts import render
+from django.views.decorators.cache import never_cache
+
+from . import esi
+from .metrics import get_registry
 
 
 def page_not_found(request, exception):
@@ -11,3 +17,21 @@ def csrf_failure(request, reason=''):
 
 def server_error(request):
     return render(request, 'core/500.html', status=500)
+
+
+def metrics(request):
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(
+        get_registry().render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+@never_cache
+def fragment(request, name):
+    """Персональный фрагмент страницы для прокси с ESI."""
+    params = request.GET.dict()
+    if not esi.accepts(name, params):
+        raise Http404
+    return HttpResponse(esi.render(request, name, params))
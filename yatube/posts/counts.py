@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.core.cache import cache
+
+# Счетчики постов в лентах. Хранятся в кэше с TTL и поддерживаются
+# сигналами (incr/decr), так что пагинатору не нужен COUNT(*) на каждый
+# запрос. Ленту подписок сигналы не отслеживают - там только TTL.
+INDEX = 'index'
+
+
+def group_key(group_id):
+    return f'group:{group_id}'
+
+
+def author_key(author_id):
+    return f'author:{author_id}'
+
+
+def follow_key(user_id):
+    return f'follow:{user_id}'
+
+
+def cache_key(key):
+    return f'count:{key}'
+
+
+def estimate_count(queryset, limit=None):
+    """Точное число строк, если их не больше limit, иначе оценка.
+
+    Оценка экстраполирует плотность первых limit постов ленты на весь
+    интервал дат: три запроса по индексу (…, created) вместо полного
+    COUNT(*).
+    """
+    limit = settings.COUNT_EXACT_LIMIT if limit is None else limit
+    parts = getattr(queryset, 'querysets', None)
+    if parts is not None:
+        # Лента из шардов (sharding.ScatterGather): сумма по шардам.
+        return sum(estimate_count(part, limit) for part in parts)
+    queryset = queryset.order_by()
+    bounded = queryset[:limit + 1].count()
+    if bounded <= limit:
+        return bounded
+    dates = queryset.values_list('created', flat=True)
+    newest = dates.order_by('-created').first()
+    oldest = dates.order_by('created').first()
+    boundary = dates.order_by('-created')[limit]
+    window = (newest - boundary).total_seconds()
+    if window <= 0:
+        return bounded
+    total = (newest - oldest).total_seconds()
+    return max(bounded, round(limit * total / window) + 1)
+
+
+def feed_count(key, queryset):
+    count = cache.get(cache_key(key))
+    if count is None:
+        count = estimate_count(queryset)
+        remember(key, count)
+    return count
+
+
+def remember(key, count):
+    cache.set(cache_key(key), count, settings.COUNT_CACHE_TIMEOUT)
+
+
+def change(delta, *keys):
+    for key in keys:
+        try:
+            cache.incr(cache_key(key), delta)
+        except ValueError:
+            # Счетчика нет в кэше - его посчитает следующий запрос.
+            pass
+
+
+def forget(*keys):
+    cache.delete_many([cache_key(key) for key in keys])
@@ -0,0 +1,238 @@
+import heapq
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import prefetch_related_objects
+
+from core.cache import lock
+
+from . import sharding
+from .models import Post
+
+# Ленты (index, группа, автор) хранятся в кэше как id постов в array('q')
+# кусками по FEED_CACHE_CHUNK, от старых к новым. Новый пост дописывается
+# в головной кусок - запись O(1) независимо от длины ленты; при переходе
+# на новый кусок самый старый выбрасывается, и в кэше остается не больше
+# FEED_CACHE_MAX_IDS id. Сами посты лежат отдельно, по одному ключу на
+# пост, поэтому память растет с числом постов, а не страниц.
+#
+# Поколение ленты растет при каждой дописке и сбросе. build() запоминает
+# его до чтения из базы и не сохраняет ленту, если оно сменилось: иначе
+# читатель, прочитавший id до коммита нового поста, положил бы ленту без
+# него уже после append, который не нашел ленты в кэше.
+
+
+def meta_key(feed):
+    return f'feed:{feed}'
+
+
+def chunk_key(feed, number):
+    return f'feed:{feed}:{number}'
+
+
+def generation_key(feed):
+    return f'feed_gen:{feed}'
+
+
+def generation(feed):
+    return cache.get(generation_key(feed), 0)
+
+
+def next_generation(*feeds):
+    for feed in feeds:
+        try:
+            cache.incr(generation_key(feed))
+        except ValueError:
+            cache.set(generation_key(feed), 1, settings.FEED_CACHE_TIMEOUT)
+
+
+def post_key(post_id):
+    return f'post_obj:{post_id}'
+
+
+def max_chunks():
+    return max(settings.FEED_CACHE_MAX_IDS // settings.FEED_CACHE_CHUNK, 1)
+
+
+def pack(ids):
+    return array('q', ids).tobytes()
+
+
+def unpack(data):
+    ids = array('q')
+    ids.frombytes(data)
+    return ids
+
+
+def newest_ids(source, limit):
+    """Первые limit id ленты (queryset или ScatterGather) от новых."""
+    parts = getattr(source, 'querysets', None) or [source]
+    rows = heapq.merge(
+        *(
+            part.order_by('-created', '-id').values_list(
+                'created', 'id'
+            )[:limit]
+            for part in parts
+        ),
+        reverse=True,
+    )
+    return [post_id for _, post_id in rows][:limit]
+
+
+def build(feed, source):
+    """Кладет в кэш последние FEED_CACHE_MAX_IDS id ленты.
+
+    Если за время чтения ленту дописали или сбросили, ничего не пишет.
+    """
+    started = generation(feed)
+    limit = settings.FEED_CACHE_MAX_IDS
+    ids = newest_ids(source, limit + 1)
+    complete = len(ids) <= limit
+    ids = ids[:limit][::-1]
+    size = settings.FEED_CACHE_CHUNK
+    chunks = [ids[start:start + size] for start in range(0, len(ids), size)]
+    chunks = chunks or [[]]
+    meta = {
+        'tail': 0,
+        'head': len(chunks) - 1,
+        'size': len(chunks[-1]),
+        'complete': complete,
+    }
+    values = {
+        chunk_key(feed, number): pack(chunk)
+        for number, chunk in enumerate(chunks)
+    }
+    values[meta_key(feed)] = meta
+    with lock('feed_cache'):
+        if generation(feed) == started:
+            cache.set_many(values, settings.FEED_CACHE_TIMEOUT)
+    return meta
+
+
+def append(post_id, *feeds):
+    """Дописывает новый пост в закэшированные ленты: O(1) на ленту."""
+    timeout = settings.FEED_CACHE_TIMEOUT
+    with lock('feed_cache'):
+        next_generation(*feeds)
+        for feed, meta in cache.get_many(
+            [meta_key(feed) for feed in feeds]
+        ).items():
+            feed = feed[len('feed:'):]
+            head = cache.get(chunk_key(feed, meta['head']))
+            if head is None:
+                cache.delete(meta_key(feed))
+                continue
+            ids = unpack(head)
+            if post_id in ids:
+                # Лента пересобрана из базы уже после коммита поста.
+                continue
+            if len(ids) >= settings.FEED_CACHE_CHUNK:
+                meta['head'] += 1
+                ids = array('q')
+                if meta['head'] - meta['tail'] >= max_chunks():
+                    cache.delete(chunk_key(feed, meta['tail']))
+                    meta['tail'] += 1
+                    meta['complete'] = False
+            ids.append(post_id)
+            meta['size'] = len(ids)
+            cache.set_many({
+                chunk_key(feed, meta['head']): ids.tobytes(),
+                meta_key(feed): meta,
+            }, timeout)
+
+
+def forget(*feeds):
+    with lock('feed_cache'):
+        next_generation(*feeds)
+        cache.delete_many([meta_key(feed) for feed in feeds])
+
+
+def cached_ids(feed, start, stop):
+    """id ленты с позиции start по stop (от новых) или None.
+
+    None - позиций нет в кэше (глубже FEED_CACHE_MAX_IDS или кусок
+    вытеснен), такие страницы читаются из базы.
+    """
+    meta = cache.get(meta_key(feed))
+    if meta is None:
+        return None
+    size = settings.FEED_CACHE_CHUNK
+    total = meta['size'] + (meta['head'] - meta['tail']) * size
+    if stop > total and not meta['complete']:
+        return None
+    positions = []
+    for position in range(start, min(stop, total)):
+        if position < meta['size']:
+            positions.append((meta['head'], meta['size'] - 1 - position))
+        else:
+            offset = position - meta['size']
+            positions.append(
+                (meta['head'] - 1 - offset // size, size - 1 - offset % size)
+            )
+    keys = {
+        chunk_key(feed, number): number for number, _ in positions
+    }
+    found = cache.get_many(keys)
+    if len(found) < len(keys):
+        forget(feed)
+        return None
+    chunks = {keys[key]: unpack(data) for key, data in found.items()}
+    return [chunks[number][index] for number, index in positions]
+
+
+def hydrate(ids):
+    """Посты по списку id: get_many по кэшу объектов, промахи - in_bulk.
+
+    В кэше лежат посты без связей: авторы и группы подгружаются на
+    каждую страницу заново, поэтому переименования не требуют сброса.
+    """
+    found = cache.get_many([post_key(post_id) for post_id in ids])
+    posts = {post.id: post for post in found.values()}
+    missing = [post_id for post_id in ids if post_id not in posts]
+    if missing:
+        loaded = sharding.in_bulk(Post.objects.all(), missing, related=())
+        cache.set_many(
+            {post_key(post_id): post for post_id, post in loaded.items()},
+            settings.POST_CACHE_TIMEOUT,
+        )
+        posts.update(loaded)
+    result = [posts[post_id] for post_id in ids if post_id in posts]
+    prefetch_related_objects(result, 'author', 'group')
+    return result
+
+
+def forget_posts(*post_ids):
+    cache.delete_many([post_key(post_id) for post_id in post_ids])
+
+
+class CachedFeed:
+    """Лента для пагинатора: срез - id из кэша и посты из hydrate.
+
+    source - queryset или ScatterGather той же ленты: из него строится
+    кэш и читаются страницы глубже закэшированных.
+    """
+    ordered = True
+
+    def __init__(self, feed, source):
+        self.feed = feed
+        self.source = source
+        self.querysets = getattr(source, 'querysets', None) or [source]
+
+    def count(self):
+        return self.source.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        start, stop = key.start or 0, key.stop
+        ids = cached_ids(self.feed, start, stop)
+        if ids is None and cache.get(meta_key(self.feed)) is None:
+            build(self.feed, self.source)
+            ids = cached_ids(self.feed, start, stop)
+        if ids is None:
+            return list(self.source[start:stop])
+        return hydrate(ids)
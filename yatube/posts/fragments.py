@@ -0,0 +1,49 @@
+from django.http import Http404
+from django.template.loader import render_to_string
+
+from core import esi
+
+from .forms import CommentForm
+from .models import Follow, FollowSuggestion
+
+
+@esi.register('follow_tab')
+def follow_tab(request, active=''):
+    return render_to_string(
+        'posts/includes/follow_tab.html', {'active': active}, request
+    )
+
+
+@esi.register('post_actions')
+def post_actions(request, post_id, author):
+    try:
+        post_id = int(post_id)
+    except ValueError:
+        raise Http404
+    user = request.user
+    context = {
+        'post_id': post_id,
+        'can_edit': user.is_authenticated and user.username == author,
+        'form': CommentForm(),
+    }
+    return render_to_string(
+        'posts/includes/post_actions.html', context, request
+    )
+
+
+@esi.register('profile_actions')
+def profile_actions(request, username):
+    user = request.user
+    context = {
+        'username': username,
+        'self_page': user.username == username,
+        'following': user.is_authenticated and Follow.objects.filter(
+            user=user, author__username=username
+        ).exists(),
+        'suggestions': FollowSuggestion.objects.filter(
+            user=user
+        ).select_related('author') if user.is_authenticated else [],
+    }
+    return render_to_string(
+        'posts/includes/profile_actions.html', context, request
+    )
@@ -0,0 +1,118 @@
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+
+from core.cache import lock
+
+from .versions import now_stamp
+
+# Журналы лент для опроса: номер последнего события и id новых постов
+# (не больше LIVE_FEED_BACKLOG). Журнал появляется при первом опросе
+# ленты; эпоха меняется, когда он теряется из кэша, - тогда старые
+# токены получают reset и клиент перечитывает ленту целиком.
+INDEX = 'index'
+FOLLOW = 'follow'
+FOLLOW_SALT = 'posts.live.follow'
+
+
+def group_feed(slug):
+    return f'group:{slug}'
+
+
+def author_feed(username):
+    return f'author:{username}'
+
+
+def follow_feed(user_id):
+    return f'{FOLLOW}:{user_id}'
+
+
+def cache_key(feed):
+    return f'live:{feed}'
+
+
+def sign_follow(user_id):
+    """Имя ленты подписок, по которому ее опрашивают без сессии.
+
+    Подпись живет SESSION_COOKIE_AGE: утекшее или оставшееся после выхода
+    имя перестает работать вместе с сессией, в которой его выдали.
+    """
+    return f'{FOLLOW}:' + signing.dumps(user_id, salt=FOLLOW_SALT)
+
+
+def resolve(name):
+    """Внутреннее имя ленты по имени из запроса; ValueError - не лента."""
+    kind, _, value = name.partition(':')
+    if name == INDEX:
+        return INDEX
+    if kind in ('group', 'author') and value:
+        return name
+    if kind == FOLLOW and value:
+        try:
+            return follow_feed(signing.loads(
+                value, salt=FOLLOW_SALT, max_age=settings.SESSION_COOKIE_AGE
+            ))
+        except signing.SignatureExpired as error:
+            raise ValueError(f'Подпись ленты устарела: {name}') from error
+        except signing.BadSignature as error:
+            raise ValueError(f'Неверная подпись ленты: {name}') from error
+    raise ValueError(f'Неизвестная лента: {name}')
+
+
+def post_feeds(post, follower_ids):
+    feeds = [INDEX, author_feed(post.author.username)]
+    if post.group_id:
+        feeds.append(group_feed(post.group.slug))
+    feeds.extend(follow_feed(user_id) for user_id in follower_ids)
+    return feeds
+
+
+def journal(feed):
+    key = cache_key(feed)
+    entry = cache.get(key)
+    if entry is None:
+        entry = {'epoch': now_stamp(), 'seq': 0, 'ids': []}
+        if not cache.add(key, entry, settings.LIVE_FEED_TIMEOUT):
+            entry = cache.get(key, entry)
+    return entry
+
+
+def token(entry):
+    return f"{entry['epoch']}.{entry['seq']}"
+
+
+def parse_token(value):
+    try:
+        epoch, seq = value.split('.')
+        return int(epoch), int(seq)
+    except ValueError as error:
+        raise ValueError(f'Некорректный токен: {value}') from error
+
+
+def publish(post_id, feeds):
+    """Дописывает пост в журналы лент; лент без журнала никто не ждет."""
+    with lock('live'):
+        found = cache.get_many([cache_key(feed) for feed in feeds])
+        for entry in found.values():
+            entry['seq'] += 1
+            entry['ids'] = (entry['ids'] + [post_id])[
+                -settings.LIVE_FEED_BACKLOG:
+            ]
+        cache.set_many(found, settings.LIVE_FEED_TIMEOUT)
+
+
+def changes(feed, since):
+    """Новые посты ленты после токена since: (token, ids).
+
+    ids - от новых к старым, пустой список - изменений нет, None - токен
+    устарел (другая эпоха или разрыв длиннее журнала) и нужен reset.
+    """
+    entry = journal(feed)
+    if since is None:
+        return token(entry), []
+    epoch, seq = parse_token(since)
+    missed = entry['seq'] - seq
+    if epoch != entry['epoch'] or not 0 <= missed <= len(entry['ids']):
+        return token(entry), None
+    return token(entry), entry['ids'][::-1][:missed]
@@ -0,0 +1,191 @@
+import json
+import random
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.benchmark import summarize
+from posts import ranking, sharding
+from posts.models import Follow, Group, Post, User
+
+TARGETS = (
+    'index', 'group_list', 'profile', 'post_detail', 'follow_index',
+    'follow_index_ranked', 'profile_follow', 'post_create', 'add_comment',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержку (p50/p95/p99) и число SQL-запросов '
+        'для страниц приложения posts и пишет результат в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Число замеров на каждый адрес.',
+        )
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--max-page', type=int, default=1,
+            help='Случайная страница ?page= из диапазона 1..max-page.',
+        )
+        parser.add_argument(
+            '--targets', nargs='+', choices=TARGETS, default=TARGETS,
+        )
+        parser.add_argument(
+            '--username',
+            help='От чьего имени ходить; по умолчанию самый активный '
+                 'подписчик.',
+        )
+        parser.add_argument(
+            '--cold-cache', action='store_true',
+            help='Очищать кеш перед каждым запросом.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Файл для JSON-отчета.')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.max_page = options['max_page']
+        user = self.get_user(options['username'])
+        posts = sharding.feed(Post.objects.all())
+        post = next(iter(posts[:1]), None)
+        group = self.busiest_group()
+        if post is None or group is None:
+            raise CommandError(
+                'База пуста, сначала выполните manage.py seed_benchmark.'
+            )
+        author = User.objects.annotate(
+            followers_count=Count('following')
+        ).order_by('-followers_count').first()
+
+        client = Client()
+        client.force_login(user)
+        requests = self.build_requests(user, author, group, post)
+        results = {}
+        for name in options['targets']:
+            results[name] = self.measure(
+                client, *requests[name],
+                count=options['requests'],
+                warmup=options['warmup'],
+                cold_cache=options['cold_cache'],
+            )
+            self.stdout.write(
+                f"{name:>19}: p50 {results[name]['p50_ms']} ms, "
+                f"p95 {results[name]['p95_ms']} ms, "
+                f"p99 {results[name]['p99_ms']} ms, "
+                f"queries {results[name]['queries']['p50']}"
+            )
+
+        report = {
+            'meta': {
+                'started': timezone.now().isoformat(),
+                'username': user.username,
+                'options': {
+                    key: options[key] for key in (
+                        'requests', 'warmup', 'max_page', 'cold_cache',
+                        'seed',
+                    )
+                },
+                'rows': {
+                    'users': User.objects.count(),
+                    'posts': posts.count(),
+                    'follows': Follow.objects.count(),
+                },
+            },
+            'results': results,
+        }
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+    def get_user(self, username):
+        if username:
+            user = User.objects.filter(username=username).first()
+        else:
+            user = User.objects.annotate(
+                follows_count=Count('follower')
+            ).order_by('-follows_count').first()
+        if user is None:
+            raise CommandError('Не найден пользователь для замеров.')
+        return user
+
+    def busiest_group(self):
+        # Посты могут лежать на шардах, где нет JOIN с группами.
+        totals = ranking.grouped_counts(
+            Post.objects.exclude(group=None), 'group_id'
+        )
+        if not totals:
+            return None
+        return Group.objects.filter(pk=max(totals, key=totals.get)).first()
+
+    def build_requests(self, user, author, group, post):
+        # Для каждого адреса: метод, построитель пути, данные формы.
+        return {
+            'index': ('get', self.paged(reverse('posts:index')), None),
+            'group_list': ('get', self.paged(reverse(
+                'posts:group_list', kwargs={'slug': group.slug}
+            )), None),
+            'profile': ('get', self.paged(reverse(
+                'posts:profile', kwargs={'username': author.username}
+            )), None),
+            'post_detail': ('get', lambda: reverse(
+                'posts:post_detail', kwargs={'post_id': post.id}
+            ), None),
+            'follow_index': (
+                'get', self.paged(reverse('posts:follow_index')), None
+            ),
+            'follow_index_ranked': ('get', self.paged(
+                reverse('posts:follow_index') + '?mode=ranked'
+            ), None),
+            'profile_follow': ('get', lambda: reverse(
+                'posts:profile_follow', kwargs={'username': author.username}
+            ), None),
+            'post_create': ('post', lambda: reverse('posts:post_create'), {
+                'text': 'Пост из нагрузочного теста',
+            }),
+            'add_comment': ('post', lambda: reverse(
+                'posts:add_comment', kwargs={'post_id': post.id}
+            ), {'text': 'Комментарий из нагрузочного теста'}),
+        }
+
+    def paged(self, url):
+        def build():
+            page = self.rng.randint(1, self.max_page)
+            separator = '&' if '?' in url else '?'
+            return f'{url}{separator}page={page}' if page > 1 else url
+        return build
+
+    def measure(self, client, method, build_url, data, count, warmup,
+                cold_cache):
+        send = getattr(client, method)
+        for _ in range(warmup):
+            send(build_url(), data)
+        timings = []
+        queries = []
+        statuses = []
+        for _ in range(count):
+            url = build_url()
+            if cold_cache:
+                cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = send(url, data)
+                timings.append(time.perf_counter() - started)
+            queries.append(len(context.captured_queries))
+            statuses.append(response.status_code)
+        summary = summarize(timings, queries, statuses)
+        summary['method'] = method.upper()
+        summary['url'] = build_url()
+        return summary
@@ -0,0 +1,65 @@
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import versions
+from posts.models import Follow, FollowSuggestion
+from posts.suggestions import top_suggestions
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рекомендации "кого почитать" по матрице подписок '
+        '(косинусная близость авторов по общим подписчикам).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=settings.FOLLOW_SUGGESTIONS_COUNT,
+            help='Сколько рекомендаций хранить на пользователя.',
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--min-score', type=float, default=0.0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        pairs = np.fromiter(
+            (
+                value
+                for pair in Follow.objects.values_list(
+                    'user_id', 'author_id'
+                ).iterator()
+                for value in pair
+            ),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        suggestions = (
+            FollowSuggestion(
+                user_id=user_id, author_id=author_id, score=score, rank=rank
+            )
+            for user_id, author_id, score, rank in top_suggestions(
+                pairs, options['limit'], options['chunk_size'],
+                options['min_score'],
+            )
+        )
+        created = 0
+        with transaction.atomic():
+            FollowSuggestion.objects.all().delete()
+            batch = []
+            for suggestion in suggestions:
+                batch.append(suggestion)
+                if len(batch) >= options['batch_size']:
+                    FollowSuggestion.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+            FollowSuggestion.objects.bulk_create(batch)
+            created += len(batch)
+        versions.bump(versions.SUGGESTIONS)
+        self.stdout.write(
+            f'Подписок: {len(pairs)}, рекомендаций: {created}, '
+            f'{time.perf_counter() - started:.1f} с'
+        )
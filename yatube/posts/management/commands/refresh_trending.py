@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет корзины активности старше окна и пересчитывает топ '
+        '"Популярное". Запускать по расписанию, например раз в час.'
+    )
+
+    def handle(self, *args, **options):
+        deleted = trending.prune()
+        top = trending.rebuild_top()
+        self.stdout.write(
+            f'Удалено корзин: {deleted}, постов в топе: {len(top)}'
+        )
@@ -0,0 +1,225 @@
+import io
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from PIL import Image
+
+from posts import sharding
+from posts.models import Comment, Follow, Group, Post, User
+
+BENCH_PASSWORD = 'bench-password'
+IMAGE_COLORS = (
+    'crimson', 'gold', 'seagreen', 'steelblue', 'orchid', 'slategray',
+)
+
+
+def zipf_weights(size, skew):
+    """Веса вида 1/rank^skew: несколько популярных, длинный хвост."""
+    return [1 / (rank ** skew) for rank in range(1, size + 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями и подписками для нагрузочного тестирования.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument('--follows', type=int, default=20000)
+        parser.add_argument(
+            '--image-ratio', type=float, default=0.2,
+            help='Доля постов с картинкой.',
+        )
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель степенного распределения популярности.',
+        )
+        parser.add_argument(
+            '--days', type=int, default=90,
+            help='За сколько дней распределить даты публикаций.',
+        )
+        parser.add_argument('--prefix', default='bench')
+        parser.add_argument('--seed', type=int, default=0)
+        # SQLite склеивает пакет вставки в INSERT ... UNION ALL SELECT,
+        # а составной SELECT ограничен 500 частями.
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if sharding.enabled():
+            # bulk_create и UPDATE created идут мимо роутера и IdSequence:
+            # посты легли бы на default с id, не указывающими на шард.
+            raise CommandError(
+                'seed_benchmark не поддерживает шарды: очистите '
+                'POST_SHARDS на время заполнения.'
+            )
+        if options['users'] < 2:
+            raise CommandError('Нужно минимум два пользователя.')
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.prefix = options['prefix']
+        self.image_ratio = options['image_ratio']
+        self.now = timezone.now()
+        self.period = timedelta(days=options['days'])
+        skew = options['skew']
+
+        with transaction.atomic():
+            users = self.create_users(options['users'])
+            groups = self.create_groups(options['groups'])
+            images = self.create_images()
+            posts = self.create_posts(
+                options['posts'], users, groups, images, skew
+            )
+            comments = self.create_comments(
+                options['comments'], users, posts, skew
+            )
+            follows = self.create_follows(options['follows'], users, skew)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: пользователей {len(users)}, групп {len(groups)}, '
+            f'постов {len(posts)}, комментариев {comments}, '
+            f'подписок {follows}. Пароль пользователей: {BENCH_PASSWORD}'
+        ))
+
+    def next_id(self, model):
+        return (model.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+
+    def random_moment(self, since=None):
+        start = since or self.now - self.period
+        span = (self.now - start).total_seconds()
+        return start + timedelta(seconds=self.rng.uniform(0, span))
+
+    def set_created(self, model, rows):
+        # auto_now_add перезаписывает created при вставке, поэтому
+        # реалистичные даты проставляются отдельным обновлением.
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'UPDATE {model._meta.db_table} SET created = %s '
+                'WHERE id = %s',
+                [(created, pk) for pk, created in rows],
+            )
+
+    def create_users(self, count):
+        first_id = self.next_id(User)
+        password = make_password(BENCH_PASSWORD)
+        users = [
+            User(
+                id=first_id + number,
+                username=f'{self.prefix}_user_{first_id + number}',
+                first_name='Bench',
+                last_name=f'User{first_id + number}',
+                password=password,
+            )
+            for number in range(count)
+        ]
+        User.objects.bulk_create(users, batch_size=self.batch_size)
+        # Первые пользователи в списке - самые популярные авторы.
+        self.rng.shuffle(users)
+        return [user.id for user in users]
+
+    def create_groups(self, count):
+        first_id = self.next_id(Group)
+        groups = [
+            Group(
+                id=first_id + number,
+                title=f'Группа {first_id + number}',
+                slug=f'{self.prefix}-group-{first_id + number}',
+                description='Синтетическая группа для нагрузочных тестов',
+            )
+            for number in range(count)
+        ]
+        Group.objects.bulk_create(groups, batch_size=self.batch_size)
+        return [group.id for group in groups]
+
+    def create_images(self):
+        if self.image_ratio <= 0:
+            return []
+        names = []
+        for number, color in enumerate(IMAGE_COLORS):
+            buffer = io.BytesIO()
+            Image.new('RGB', (960, 339), color).save(buffer, format='JPEG')
+            names.append(default_storage.save(
+                f'posts/{self.prefix}_{number}.jpg',
+                ContentFile(buffer.getvalue()),
+            ))
+        return names
+
+    def create_posts(self, count, users, groups, images, skew):
+        first_id = self.next_id(Post)
+        authors = self.rng.choices(
+            users, weights=zipf_weights(len(users), skew), k=count
+        )
+        group_choices = [None] + groups
+        group_ids = self.rng.choices(
+            group_choices,
+            weights=zipf_weights(len(group_choices), skew),
+            k=count,
+        )
+        posts = []
+        created = []
+        for number in range(count):
+            pk = first_id + number
+            image = ''
+            if images and self.rng.random() < self.image_ratio:
+                image = self.rng.choice(images)
+            posts.append(Post(
+                id=pk,
+                author_id=authors[number],
+                group_id=group_ids[number],
+                text=f'Синтетический пост номер {pk}. ' * 5,
+                image=image,
+            ))
+            created.append((pk, self.random_moment()))
+        Post.objects.bulk_create(posts, batch_size=self.batch_size)
+        self.set_created(Post, created)
+        return created
+
+    def create_comments(self, count, users, posts, skew):
+        if not posts:
+            return 0
+        first_id = self.next_id(Comment)
+        # Популярность постов тоже степенная: немного "вирусных" постов.
+        targets = self.rng.choices(
+            posts, weights=zipf_weights(len(posts), skew), k=count
+        )
+        comments = []
+        created = []
+        for number, (post_id, post_created) in enumerate(targets):
+            pk = first_id + number
+            comments.append(Comment(
+                id=pk,
+                post_id=post_id,
+                author_id=self.rng.choice(users),
+                text=f'Синтетический комментарий {pk}',
+            ))
+            created.append((pk, self.random_moment(since=post_created)))
+        Comment.objects.bulk_create(comments, batch_size=self.batch_size)
+        self.set_created(Comment, created)
+        return count
+
+    def create_follows(self, count, users, skew):
+        # У популярных авторов степенной хвост подписчиков.
+        authors = self.rng.choices(
+            users, weights=zipf_weights(len(users), skew), k=count
+        )
+        pairs = set()
+        for author_id in authors:
+            user_id = self.rng.choice(users)
+            if user_id != author_id:
+                pairs.add((user_id, author_id))
+        Follow.objects.bulk_create(
+            [Follow(user_id=user, author_id=author) for user, author in pairs],
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+        return len(pairs)
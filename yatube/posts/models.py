@@ -3,8 +3,15 @@ from django.db import models
 
 from core.models import CreatedModel
 
+from .sharding import ShardedQuerySet
+
 User = get_user_model()
 
+# Посты и комментарии могут жить на шардах (posts.sharding), а
+# пользователи и группы - только на default. Поэтому ссылки на них всегда
+# идут без внешних ключей в БД (схема не зависит от настроек), а каскад
+# Django, который не ходит между базами, заменяют сигналы posts.signals.
+
 
 class Group(models.Model):
     title = models.CharField(
@@ -33,15 +40,17 @@ class Post(CreatedModel):
     )
     author = models.ForeignKey(
         User,
-        on_delete=models.CASCADE,
+        on_delete=models.DO_NOTHING,
         related_name='posts',
         verbose_name='Автор',
+        db_constraint=False,
     )
     group = models.ForeignKey(
         Group,
         blank=True,
         null=True,
-        on_delete=models.SET_NULL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
         related_name='posts',
         verbose_name='Group',
         help_text='Группа, к которой будет относиться пост',
@@ -53,8 +62,19 @@ class Post(CreatedModel):
         help_text='Картинка для поста',
     )
 
+    objects = ShardedQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(fields=['created', 'id'], name='post_feed_idx'),
+            models.Index(
+                fields=['author', 'created'], name='post_author_feed_idx'
+            ),
+            models.Index(
+                fields=['group', 'created'], name='post_group_feed_idx'
+            ),
+        ]
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
@@ -70,17 +90,25 @@ class Comment(CreatedModel):
     )
     author = models.ForeignKey(
         User,
-        on_delete=models.CASCADE,
+        on_delete=models.DO_NOTHING,
         related_name='comments',
-        verbose_name='Пользователь'
+        verbose_name='Пользователь',
+        db_constraint=False,
     )
     text = models.TextField(
         verbose_name='Текст',
         help_text='Добавить комментарий:',
     )
 
+    objects = ShardedQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=['post', 'created'], name='comment_post_feed_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.author} {self.text[:10]}'
@@ -109,3 +137,77 @@ class Follow(models.Model):
 
     def __str__(self):
         return f'{self.author}, follower:{self.user}'
+
+
+class IdSequence(models.Model):
+    """Счетчик id постов и комментариев, общий для всех шардов."""
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.name}: {self.value}'
+
+
+class PostActivity(models.Model):
+    """Число комментариев поста в часовой корзине (posts.trending).
+
+    Хранится на default, поэтому post_id - просто число: пост может жить
+    на другом шарде.
+    """
+    post_id = models.PositiveIntegerField()
+    bucket = models.PositiveIntegerField()
+    comments = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post_id', 'bucket'], name='post_activity_unique'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['bucket'], name='post_activity_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id}@{self.bucket}: {self.comments}'
+
+
+class FollowSuggestion(models.Model):
+    """Рекомендации "кого почитать", считаются compute_follow_suggestions."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follow_suggestions',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['rank']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'rank'], name='follow_suggestion_unique'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user} -> {self.author}: {self.score:.3f}'
+
+
+class FeedWatermark(models.Model):
+    """Когда пользователь последний раз открывал ленту подписок."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='feed_watermark',
+    )
+    seen = models.DateTimeField()
+
+    def __str__(self):
+        return f'{self.user}: {self.seen}'
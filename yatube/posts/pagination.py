@@ -0,0 +1,152 @@
+import base64
+import binascii
+
+from django.core.paginator import EmptyPage, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from . import counts
+
+KEYSET_ORDERING = ('-created', '-id')
+
+
+def encode_cursor(created, pk):
+    raw = f'{created.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Возвращает (created, id) или бросает ValueError."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created, pk = raw.decode().split('|')
+        created = parse_datetime(created)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as error:
+        raise ValueError(f'Некорректный курсор: {cursor}') from error
+    if created is None:
+        raise ValueError(f'Некорректный курсор: {cursor}')
+    return created, pk
+
+
+def row_key(row):
+    if isinstance(row, dict):
+        return row['created'], row['id']
+    return row.created, row.id
+
+
+def after_position(queryset, position):
+    queryset = queryset.order_by(*KEYSET_ORDERING)
+    if position:
+        created, pk = position
+        queryset = queryset.filter(
+            Q(created__lt=created) | Q(created=created, id__lt=pk)
+        )
+    return queryset
+
+
+def keyset_page(queryset, cursor=None, size=10):
+    """Страница ленты после курсора по (created, id) без OFFSET и COUNT.
+
+    Возвращает строки страницы и курсор следующей страницы (или None).
+    Лента из шардов (ScatterGather) фильтруется по курсору на каждом шарде.
+    """
+    position = decode_cursor(cursor) if cursor else None
+    if hasattr(queryset, 'querysets'):
+        queryset = type(queryset)([
+            after_position(part, position) for part in queryset.querysets
+        ])
+    else:
+        queryset = after_position(queryset, position)
+    rows = list(queryset[:size + 1])
+    next_cursor = None
+    if len(rows) > size:
+        rows = rows[:size]
+        next_cursor = encode_cursor(*row_key(rows[-1]))
+    return rows, next_cursor
+
+
+def elided_page_range(number, num_pages, on_each_side=2, on_ends=1):
+    """Номера страниц вокруг текущей и по краям, пропуски - None.
+
+    Порт Paginator.get_elided_page_range из Django 3.2: длина результата
+    не зависит от общего числа страниц.
+    """
+    if num_pages <= (on_each_side + on_ends) * 2:
+        return list(range(1, num_pages + 1))
+    pages = []
+    if number > (1 + on_each_side + on_ends) + 1:
+        pages.extend(range(1, on_ends + 1))
+        pages.append(None)
+        pages.extend(range(number - on_each_side, number + 1))
+    else:
+        pages.extend(range(1, number + 1))
+    if number < (num_pages - on_each_side - on_ends) - 1:
+        pages.extend(range(number + 1, number + on_each_side + 1))
+        pages.append(None)
+        pages.extend(range(num_pages - on_ends + 1, num_pages + 1))
+    else:
+        pages.extend(range(number + 1, num_pages + 1))
+    return pages
+
+
+class CountedPaginator(Paginator):
+    """Paginator, берущий число постов из counts.feed_count.
+
+    Счетчик может быть приблизительным, поэтому страница читается с
+    лишней строкой, а номера за оценкой не отбрасываются. Если проба
+    разошлась со счетчиком, count поправляется (и has_next страницы
+    вместе с ним): точно, если дошли до конца ленты, иначе счетчик в кэше
+    сбрасывается до пересчета. Номер за концом ленты ведет на настоящую
+    последнюю страницу.
+    """
+
+    def __init__(self, object_list, per_page, count_key, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+
+    @cached_property
+    def count(self):
+        return counts.feed_count(self.count_key, self.object_list)
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            number = int(number)
+            if number < 1:
+                raise
+            # За оценкой: есть ли там посты, решает page().
+            return number
+
+    def get_page(self, number):
+        try:
+            return super().get_page(number)
+        except EmptyPage:
+            return self.page(self.num_pages)
+
+    def correct(self, count, exact=True):
+        if exact:
+            counts.remember(self.count_key, count)
+        else:
+            counts.forget(self.count_key)
+        self.__dict__['count'] = count
+        self.__dict__.pop('num_pages', None)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not rows and number > 1:
+            # Оценка завышена: настоящая последняя страница раньше.
+            self.correct(self.object_list.count())
+            raise EmptyPage('That page contains no results')
+        seen = bottom + len(rows)
+        if not more and seen != self.count:
+            self.correct(seen)
+        elif more and seen >= self.count:
+            self.correct(seen + 1, exact=False)
+        return self._get_page(rows, number, self)
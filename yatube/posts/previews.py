@@ -0,0 +1,93 @@
+from collections import defaultdict
+
+from django.conf import settings
+
+from . import sharding
+from .models import Comment, User
+
+PREVIEW_SQL = '''
+SELECT id, post_id, author_id, text, created, {username}
+       comments_total
+FROM (
+    SELECT comment.id, comment.post_id, comment.author_id, comment.text,
+           comment.created, {author_username}
+           ROW_NUMBER() OVER (
+               PARTITION BY comment.post_id
+               ORDER BY comment.created DESC, comment.id DESC
+           ) AS row_number,
+           COUNT(*) OVER (PARTITION BY comment.post_id) AS comments_total
+    FROM {comments} AS comment
+    {join}
+    WHERE comment.post_id IN ({placeholders})
+) AS ranked
+WHERE row_number <= %s
+ORDER BY post_id, row_number
+'''
+
+
+JOIN_USERS = {
+    'username': 'author_username,',
+    'author_username': 'author.username AS author_username,',
+    'join': 'INNER JOIN {users} AS author ON author.id = comment.author_id',
+}
+
+# На шардах таблицы пользователей нет: имена берутся с default.
+NO_JOIN = {'username': '', 'author_username': '', 'join': ''}
+
+
+def preview_comments(posts, size, using=None, join=JOIN_USERS):
+    sql = PREVIEW_SQL.format(
+        comments=Comment._meta.db_table,
+        placeholders=', '.join(['%s'] * len(posts)),
+        **{
+            name: part.format(users=User._meta.db_table)
+            for name, part in join.items()
+        },
+    )
+    return list(Comment.objects.db_manager(using).raw(
+        sql, [post.id for post in posts] + [size]
+    ))
+
+
+def sharded_preview_comments(posts, size):
+    by_shard = defaultdict(list)
+    for post in posts:
+        by_shard[sharding.shard_for_post(post.id)].append(post)
+    comments = [
+        comment
+        for alias, shard_posts in by_shard.items()
+        for comment in preview_comments(shard_posts, size, alias, NO_JOIN)
+    ]
+    usernames = dict(User.objects.filter(
+        id__in={comment.author_id for comment in comments}
+    ).values_list('id', 'username'))
+    for comment in comments:
+        comment.author_username = usernames.get(comment.author_id)
+    return comments
+
+
+def attach_comment_previews(posts, size=None):
+    """Добавляет постам comment_count и latest_comments одним запросом.
+
+    Последние комментарии всех постов страницы выбираются оконной
+    функцией ROW_NUMBER() OVER (PARTITION BY post_id), так что число
+    запросов не зависит ни от числа постов, ни от числа комментариев.
+    С шардами - по запросу на шард плюс один за именами авторов.
+    """
+    posts = list(posts)
+    if not posts:
+        return posts
+    size = settings.COMMENT_PREVIEW_COUNT if size is None else size
+    if sharding.enabled():
+        comments = sharded_preview_comments(posts, size)
+    else:
+        comments = preview_comments(posts, size)
+    previews = {post.id: [] for post in posts}
+    totals = {}
+    for comment in comments:
+        previews[comment.post_id].append(comment)
+        totals[comment.post_id] = comment.comments_total
+    for post in posts:
+        post.latest_comments = previews[post.id]
+        post.comment_count = totals.get(post.id, 0)
+    return posts
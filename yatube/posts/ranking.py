@@ -0,0 +1,89 @@
+import heapq
+from itertools import islice
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count
+from django.utils import timezone
+
+from . import sharding
+from .models import Comment
+
+
+def candidate_rows(post_list, limit):
+    """(id, author_id, created) последних limit постов ленты."""
+    querysets = getattr(post_list, 'querysets', [post_list])
+    parts = [
+        queryset.select_related(None).order_by(
+            '-created', '-id'
+        ).values_list('id', 'author_id', 'created')[:limit]
+        for queryset in querysets
+    ]
+    rows = heapq.merge(
+        *parts, key=lambda row: (row[2], row[0]), reverse=True
+    )
+    return list(islice(rows, limit))
+
+
+def grouped_counts(queryset, field):
+    """{значение field: число строк} со всех шардов (посты, комментарии)."""
+    result = {}
+    aliases = sharding.shards() if sharding.enabled() else [None]
+    for alias in aliases:
+        rows = queryset.using(alias).order_by().values(field).annotate(
+            total=Count('id')
+        ).values_list(field, 'total')
+        for key, total in rows:
+            result[key] = result.get(key, 0) + total
+    return result
+
+
+def score(created, affinity, engagement, now, weights, half_life):
+    """Оценка кандидатов одним векторным проходом.
+
+    created - секунды unix, affinity - комментарии читателя к автору
+    поста, engagement - комментарии к посту.
+    """
+    age = np.maximum(now - created, 0)
+    recency = np.exp2(-age / half_life)
+    return (
+        weights['recency'] * recency
+        + weights['affinity'] * np.log1p(affinity)
+        + weights['engagement'] * np.log1p(engagement)
+    )
+
+
+def ranked_post_ids(user, post_list, limit=None):
+    """id постов ленты подписок, упорядоченные по оценке."""
+    limit = limit or settings.RANKED_FEED_CANDIDATES
+    rows = candidate_rows(post_list, limit)
+    if not rows:
+        return []
+    ids = np.fromiter((row[0] for row in rows), np.int64, len(rows))
+    authors = np.fromiter((row[1] for row in rows), np.int64, len(rows))
+    created = np.fromiter(
+        (row[2].timestamp() for row in rows), np.float64, len(rows)
+    )
+    affinity_by_author = grouped_counts(
+        Comment.objects.filter(
+            author=user, post__author_id__in=set(authors.tolist())
+        ),
+        'post__author_id',
+    )
+    engagement_by_post = grouped_counts(
+        Comment.objects.filter(post_id__in=ids.tolist()), 'post_id'
+    )
+    affinity = np.fromiter(
+        (affinity_by_author.get(author, 0) for author in authors.tolist()),
+        np.float64, len(rows),
+    )
+    engagement = np.fromiter(
+        (engagement_by_post.get(post_id, 0) for post_id in ids.tolist()),
+        np.float64, len(rows),
+    )
+    scores = score(
+        created, affinity, engagement, timezone.now().timestamp(),
+        settings.RANKED_FEED_WEIGHTS, settings.RANKED_FEED_HALF_LIFE,
+    )
+    # Стабильная сортировка: при равных оценках - хронологический порядок.
+    return ids[np.argsort(-scores, kind='stable')].tolist()
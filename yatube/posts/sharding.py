@@ -0,0 +1,233 @@
+import heapq
+import threading
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F, QuerySet, prefetch_related_objects
+
+from core.routers import mark_write
+
+SHARDED_MODELS = ('posts.post', 'posts.comment')
+
+
+def enabled():
+    return bool(settings.POST_SHARDS)
+
+
+def shards():
+    return list(settings.POST_SHARDS) or [DEFAULT_DB_ALIAS]
+
+
+def shard_index(value):
+    return value % len(shards())
+
+
+def shard_for_author(author_id):
+    return shards()[shard_index(author_id)]
+
+
+def shard_for_post(post_id):
+    """Шард поста по его id: id выдаются так, что id % N - номер шарда."""
+    return shards()[shard_index(post_id)]
+
+
+def shard_of(instance):
+    label = instance._meta.label_lower
+    if label == 'posts.post':
+        if instance.pk:
+            return shard_for_post(instance.pk)
+        return shard_for_author(instance.author_id)
+    if label == 'posts.comment':
+        return shard_for_post(instance.post_id)
+    return None
+
+
+class ShardRouter:
+    """Раскладывает посты по шардам по author_id, комментарии - к постам.
+
+    Пользователи, группы и подписки остаются на default. Запросы без
+    подсказки instance роутер не распределяет - ленты собираются явно
+    через feed() и for_post().
+    """
+
+    def route(self, model, instance):
+        if not enabled() or model._meta.label_lower not in SHARDED_MODELS:
+            return None
+        if instance is None:
+            return None
+        shard = shard_of(instance)
+        if (shard is None and model._meta.label_lower == 'posts.post'
+                and instance._meta.label_lower
+                == settings.AUTH_USER_MODEL.lower()):
+            # user.posts: все посты автора на одном шарде.
+            shard = shard_for_author(instance.pk)
+        return shard
+
+    def db_for_read(self, model, **hints):
+        return self.route(model, hints.get('instance'))
+
+    def db_for_write(self, model, **hints):
+        mark_write()
+        return self.route(model, hints.get('instance'))
+
+    def allow_relation(self, obj1, obj2, **hints):
+        labels = {obj1._meta.label_lower, obj2._meta.label_lower}
+        if enabled() and labels & set(SHARDED_MODELS):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if not enabled():
+            return None
+        if f'{app_label}.{model_name}' in SHARDED_MODELS:
+            return db in settings.POST_SHARDS
+        if db in settings.POST_SHARDS and db != DEFAULT_DB_ALIAS:
+            return False
+        return None
+
+
+class ShardedQuerySet(QuerySet):
+    def create(self, **kwargs):
+        # QuerySet.create сохраняет в self.db, выбранный без instance;
+        # без явного using() шард выбирает роутер по самому объекту.
+        obj = self.model(**kwargs)
+        self._for_write = True
+        obj.save(force_insert=True, using=self._db)
+        return obj
+
+
+class IdAllocator:
+    """Выдает id блоками из IdSequence на default.
+
+    Блок резервируется одной транзакцией, дальше id раздаются из памяти
+    процесса; неиспользованный остаток блока при перезапуске теряется.
+    """
+
+    def __init__(self, block):
+        self.block = block
+        self.lock = threading.Lock()
+        self.ranges = {}
+
+    def reserve(self, name):
+        from .models import IdSequence
+
+        sequences = IdSequence.objects.using(DEFAULT_DB_ALIAS)
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            sequences.get_or_create(name=name)
+            sequences.filter(name=name).update(value=F('value') + self.block)
+            end = sequences.values_list('value', flat=True).get(name=name)
+        return end - self.block + 1, end + 1
+
+    def next(self, name):
+        with self.lock:
+            current, end = self.ranges.get(name, (0, 0))
+            if current >= end:
+                current, end = self.reserve(name)
+            self.ranges[name] = (current + 1, end)
+            return current
+
+
+_allocator = None
+
+
+def assign_id(instance, shard_key):
+    """Дает новому объекту id, указывающий на шард shard_key."""
+    global _allocator
+    if _allocator is None:
+        _allocator = IdAllocator(settings.POST_SHARD_ID_BLOCK)
+    sequence = _allocator.next(instance._meta.label_lower)
+    instance.id = sequence * len(shards()) + shard_index(shard_key)
+
+
+def feed_key(post):
+    if isinstance(post, dict):
+        return post['created'], post['id']
+    return post.created, post.id
+
+
+class ScatterGather:
+    """Лента постов из нескольких шардов.
+
+    Срез [start:stop] берет первые stop постов каждого шарда и сливает их
+    k-way merge по (created, id), затем подгружает авторов и группы с
+    default. Глубокие страницы стоят stop строк с каждого шарда.
+    Строки values() (API) сливаются так же, связи к ним не подгружаются.
+    """
+    ordered = True
+
+    def __init__(self, querysets):
+        self.querysets = querysets
+
+    def count(self):
+        return sum(queryset.count() for queryset in self.querysets)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        start, stop = key.start or 0, key.stop
+        parts = [
+            queryset.order_by('-created', '-id')[:stop]
+            for queryset in self.querysets
+        ]
+        posts = list(islice(
+            heapq.merge(*parts, key=feed_key, reverse=True), start, stop
+        ))
+        if posts and not isinstance(posts[0], dict):
+            prefetch_related_objects(posts, 'author', 'group')
+        return posts
+
+
+def feed(queryset, aliases=None):
+    """Лента по queryset постов: без шардов - сам queryset."""
+    if not enabled():
+        return queryset
+    queryset = queryset.select_related(None)
+    return ScatterGather([
+        queryset.using(alias) for alias in aliases or shards()
+    ])
+
+
+def authors_feed(queryset, author_ids):
+    """Лента постов авторов: на каждый шард только его авторы."""
+    by_shard = defaultdict(list)
+    for author_id in author_ids:
+        by_shard[shard_for_author(author_id)].append(author_id)
+    queryset = queryset.select_related(None)
+    return ScatterGather([
+        queryset.filter(author_id__in=ids).using(alias)
+        for alias, ids in by_shard.items()
+    ])
+
+
+def in_bulk(queryset, ids, related=('author', 'group')):
+    """{id: пост} для списка id: по запросу на каждый нужный шард."""
+    if not enabled():
+        return queryset.in_bulk(ids)
+    by_shard = defaultdict(list)
+    for post_id in ids:
+        by_shard[shard_for_post(post_id)].append(post_id)
+    queryset = queryset.select_related(None)
+    posts = {}
+    for alias, shard_ids in by_shard.items():
+        posts.update(queryset.using(alias).in_bulk(shard_ids))
+    prefetch_related_objects(list(posts.values()), *related)
+    return posts
+
+
+def for_post(queryset, post_id):
+    """Queryset постов или комментариев на шарде поста post_id."""
+    if not enabled():
+        return queryset
+    return queryset.select_related(None).using(shard_for_post(post_id))
+
+
+def hydrate(objects, *lookups):
+    """На шардах нет JOIN с default: связи подгружаются отдельно."""
+    if enabled():
+        prefetch_related_objects(objects, *lookups)
+    return objects
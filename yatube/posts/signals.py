@@ -0,0 +1,300 @@
+from functools import partial
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Subquery
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save,
+)
+from django.dispatch import receiver
+
+from core import page_cache, purge
+
+from . import (
+    counts, feed_cache, live, sharding, trending, unread, versions,
+)
+from .models import Comment, Follow, Group, Post, User
+
+USER_VISIBLE_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def after_commit(using, func, *args):
+    """func(*args) после коммита транзакции на using, вне ее - сразу.
+
+    Счетчики, журналы и ленты не должны видеть строк, которых еще нет
+    в базе (например, в пачке core.db.writer до ее COMMIT).
+    """
+    transaction.on_commit(partial(func, *args), using=using)
+
+
+def invalidate(using, func, *args):
+    """Сброс кэша сейчас и, внутри транзакции, еще раз после коммита.
+
+    Читатель, успевший до коммита закэшировать старые строки под новой
+    меткой, иначе раздавал бы их до истечения TTL.
+    """
+    func(*args)
+    if connections[using].in_atomic_block:
+        after_commit(using, func, *args)
+
+
+def reset(*keys):
+    versions.bump(*keys)
+    page_cache.purge(*keys)
+
+
+def changed(*keys, using=DEFAULT_DB_ALIAS):
+    """Новые метки версий и сброс страниц с этими ключами здесь и в прокси.
+
+    Прокси чистится один раз: диспетчер сам ждет коммита на using.
+    """
+    invalidate(using, reset, *keys)
+    purge.purge(*keys, using=using)
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, using, **kwargs):
+    instance._previous_group_id = None
+    if instance.pk:
+        instance._previous_group_id = Post.objects.using(using).filter(
+            pk=instance.pk
+        ).values_list('group_id', flat=True).first()
+
+
+@receiver(pre_save, sender=Post)
+def assign_post_id(sender, instance, **kwargs):
+    if sharding.enabled() and instance.pk is None:
+        sharding.assign_id(instance, instance.author_id)
+
+
+@receiver(pre_save, sender=Comment)
+def assign_comment_id(sender, instance, **kwargs):
+    if sharding.enabled() and instance.pk is None:
+        sharding.assign_id(instance, instance.post_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_changed(sender, instance, using, **kwargs):
+    group_ids = {
+        instance.group_id, getattr(instance, '_previous_group_id', None)
+    } - {None}
+    slugs = Group.objects.filter(
+        pk__in=group_ids
+    ).values_list('slug', flat=True) if group_ids else []
+    changed(
+        versions.INDEX,
+        versions.post_key(instance.pk),
+        versions.author_key(instance.author.username),
+        *(versions.group_key(slug) for slug in slugs),
+        using=using,
+    )
+
+
+@receiver(post_save, sender=Post)
+def post_saved_counts(sender, instance, created, using, **kwargs):
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if created:
+        after_commit(
+            using, counts.change,
+            1, counts.INDEX, counts.author_key(instance.author_id),
+            *([counts.group_key(instance.group_id)]
+              if instance.group_id else []),
+        )
+    elif previous_group_id != instance.group_id:
+        if previous_group_id:
+            after_commit(
+                using, counts.change, -1, counts.group_key(previous_group_id)
+            )
+        if instance.group_id:
+            after_commit(
+                using, counts.change, 1, counts.group_key(instance.group_id)
+            )
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted_counts(sender, instance, using, **kwargs):
+    after_commit(
+        using, counts.change,
+        -1, counts.INDEX, counts.author_key(instance.author_id),
+        *([counts.group_key(instance.group_id)]
+          if instance.group_id else []),
+    )
+
+
+def cached_feeds(author_id, *group_ids):
+    return [
+        counts.INDEX, counts.author_key(author_id),
+        *(counts.group_key(group_id) for group_id in group_ids if group_id),
+    ]
+
+
+@receiver(post_save, sender=Post)
+def post_saved_feed_cache(sender, instance, created, using, **kwargs):
+    invalidate(using, feed_cache.forget_posts, instance.pk)
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if created:
+        after_commit(
+            using, feed_cache.append,
+            instance.pk, *cached_feeds(instance.author_id, instance.group_id)
+        )
+    elif previous_group_id != instance.group_id:
+        # Пост переехал между группами: его место в обеих лентах группы
+        # проще пересобрать из базы, чем вставлять по дате.
+        invalidate(using, feed_cache.forget, *(
+            counts.group_key(group_id)
+            for group_id in (previous_group_id, instance.group_id)
+            if group_id
+        ))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted_feed_cache(sender, instance, using, **kwargs):
+    invalidate(using, feed_cache.forget_posts, instance.pk)
+    invalidate(
+        using, feed_cache.forget,
+        *cached_feeds(instance.author_id, instance.group_id),
+    )
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted_trending(sender, instance, using, **kwargs):
+    invalidate(using, trending.forget_post, instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def post_created_feeds(sender, instance, created, using, **kwargs):
+    if not created:
+        return
+    follower_ids = list(Follow.objects.filter(
+        author_id=instance.author_id
+    ).values_list('user_id', flat=True))
+    after_commit(using, unread.fan_out, follower_ids)
+    after_commit(
+        using, live.publish,
+        instance.pk, live.post_feeds(instance, follower_ids),
+    )
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted_unread(sender, instance, using, **kwargs):
+    invalidate(using, unread.forget, *Follow.objects.filter(
+        author_id=instance.author_id
+    ).values_list('user_id', flat=True))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, using, **kwargs):
+    # Счетчик и последние комментарии видны и в карточках лент:
+    # меняются страницы группы и автора поста, а также главная.
+    username, slug = post_author_and_group(instance.post_id)
+    changed(
+        versions.INDEX,
+        versions.post_key(instance.post_id),
+        *([versions.author_key(username)] if username else []),
+        *([versions.group_key(slug)] if slug else []),
+        using=using,
+    )
+
+
+def post_author_and_group(post_id):
+    """(username, slug) поста одним запросом; с шардами - двумя."""
+    posts = sharding.for_post(Post.objects.filter(pk=post_id), post_id)
+    if not sharding.enabled():
+        return posts.values_list(
+            'author__username', 'group__slug'
+        ).first() or (None, None)
+    # На шарде нет пользователей и групп: JOIN делается на default.
+    author_id, group_id = posts.values_list(
+        'author_id', 'group_id'
+    ).first() or (None, None)
+    return User.objects.filter(pk=author_id).annotate(
+        slug=Subquery(Group.objects.filter(pk=group_id).values('slug'))
+    ).values_list('username', 'slug').first() or (None, None)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created_trending(sender, instance, created, using, **kwargs):
+    if created:
+        after_commit(
+            using, trending.record_comment, instance.post_id, instance.created
+        )
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_changed(sender, instance, using, **kwargs):
+    changed(versions.follows_key(instance.user_id), using=using)
+    invalidate(using, counts.forget, counts.follow_key(instance.user_id))
+    invalidate(using, unread.forget, instance.user_id)
+
+
+@receiver(pre_save, sender=Group)
+def remember_group_slug(sender, instance, **kwargs):
+    instance._previous_slug = None
+    if instance.pk:
+        instance._previous_slug = Group.objects.filter(
+            pk=instance.pk
+        ).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, using, **kwargs):
+    slugs = {instance.slug, getattr(instance, '_previous_slug', None)}
+    changed(
+        versions.INDEX,
+        *(versions.group_key(slug) for slug in slugs if slug),
+        using=using,
+    )
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted_counts(sender, instance, using, **kwargs):
+    invalidate(using, counts.forget, counts.group_key(instance.pk))
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleted_posts(sender, instance, **kwargs):
+    """SET_NULL для постов группы на всех шардах (ключ без каскада)."""
+    for alias in sharding.shards():
+        posts = Post.objects.using(alias).filter(group_id=instance.pk)
+        feed_cache.forget_posts(*posts.values_list('id', flat=True))
+        posts.update(group=None)
+
+
+@receiver(pre_delete, sender=User)
+def user_deleted_posts(sender, instance, **kwargs):
+    """Удаляет посты и комментарии пользователя на всех шардах."""
+    for alias in sharding.shards():
+        Comment.objects.using(alias).filter(author_id=instance.pk).delete()
+    Post.objects.using(sharding.shard_for_author(instance.pk)).filter(
+        author_id=instance.pk
+    ).delete()
+
+
+@receiver(pre_save, sender=User)
+def remember_user_names(sender, instance, update_fields=None, **kwargs):
+    instance._previous_names = None
+    if update_fields and not set(update_fields) & set(USER_VISIBLE_FIELDS):
+        return
+    if instance.pk:
+        instance._previous_names = User.objects.filter(
+            pk=instance.pk
+        ).values_list(*USER_VISIBLE_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, using, **kwargs):
+    # last_login обновляется при каждом входе - такие сохранения
+    # не меняют страниц и не должны сбрасывать валидаторы.
+    previous = getattr(instance, '_previous_names', None)
+    current = tuple(getattr(instance, field) for field in USER_VISIBLE_FIELDS)
+    if created or previous is None or previous == current:
+        return
+    usernames = {instance.username, previous[0]}
+    changed(
+        versions.USERS,
+        *(versions.author_key(username) for username in usernames),
+        using=using,
+    )
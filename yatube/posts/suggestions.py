@@ -0,0 +1,75 @@
+import numpy as np
+from scipy import sparse
+
+
+def follow_matrix(pairs):
+    """CSR-матрица подписок users x users и массив id пользователей.
+
+    pairs - массив (user_id, author_id) формы (n, 2).
+    """
+    ids, index = np.unique(pairs, return_inverse=True)
+    index = index.reshape(pairs.shape)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(pairs), dtype=np.float32), (index[:, 0], index[:, 1])),
+        shape=(len(ids), len(ids)),
+    )
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    return matrix, ids
+
+
+def author_similarity(matrix):
+    """Косинусная близость авторов по общим подписчикам: A^T A / |a||b|."""
+    co_follows = (matrix.T @ matrix).tocsr()
+    co_follows.setdiag(0)
+    co_follows.eliminate_zeros()
+    followers = np.asarray(matrix.sum(axis=0)).ravel()
+    norm = np.sqrt(followers)
+    norm[norm == 0] = 1
+    inverse = sparse.diags(1 / norm)
+    return (inverse @ co_follows @ inverse).tocsr()
+
+
+def top_suggestions(pairs, limit, chunk_size=1000, min_score=0.0):
+    """Для каждого подписчика - до limit авторов, близких к его подпискам.
+
+    Оценка автора - сумма его близостей к авторам, на которых пользователь
+    уже подписан. Пользователи обрабатываются блоками по chunk_size, чтобы
+    не держать в памяти всю матрицу оценок. Выдает кортежи
+    (user_id, author_id, score, rank).
+    """
+    pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+    if not len(pairs):
+        return
+    matrix, ids = follow_matrix(pairs)
+    similarity = author_similarity(matrix)
+    for start in range(0, matrix.shape[0], chunk_size):
+        block = matrix[start:start + chunk_size]
+        scores = (block @ similarity).tocsr()
+        for offset in range(block.shape[0]):
+            row = start + offset
+            columns = scores.indices[
+                scores.indptr[offset]:scores.indptr[offset + 1]
+            ]
+            values = scores.data[
+                scores.indptr[offset]:scores.indptr[offset + 1]
+            ]
+            followed = block.indices[
+                block.indptr[offset]:block.indptr[offset + 1]
+            ]
+            keep = (
+                ~np.isin(columns, followed) & (columns != row)
+                & (values > min_score)
+            )
+            columns, values = columns[keep], values[keep]
+            if not len(columns):
+                continue
+            if len(columns) > limit:
+                best = np.argpartition(-values, limit)[:limit]
+                columns, values = columns[best], values[best]
+            order = np.lexsort((ids[columns], -values))
+            for rank, position in enumerate(order, start=1):
+                yield (
+                    int(ids[row]), int(ids[columns[position]]),
+                    float(values[position]), rank,
+                )
@@ -0,0 +1,30 @@
+from django import template
+
+from posts.pagination import elided_page_range as get_elided_page_range
+from posts.pagination import encode_cursor
+
+register = template.Library()
+
+
+@register.simple_tag
+def elided_page_range(page_obj):
+    return get_elided_page_range(
+        page_obj.number, page_obj.paginator.num_pages
+    )
+
+
+@register.simple_tag(takes_context=True)
+def page_url(context, number):
+    """?page=N с сохранением остальных GET-параметров (mode и т.п.)."""
+    query = context['request'].GET.copy()
+    query['page'] = number
+    return f'?{query.urlencode()}'
+
+
+@register.simple_tag
+def next_cursor(page_obj):
+    """Курсор после последнего поста страницы для догрузки ленты."""
+    if not page_obj.has_next() or not page_obj.object_list:
+        return None
+    last = page_obj.object_list[-1]
+    return encode_cursor(last.created, last.id)
@@ -0,0 +1,73 @@
+import io
+import json
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
+
+from core.benchmark import percentile, summarize
+from core.testing import temp_media_root
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = temp_media_root()
+
+
+class PercentileTest(TestCase):
+    def test_percentile_interpolates(self):
+        values = [1, 2, 3, 4]
+        self.assertEqual(percentile(values, 50), 2.5)
+        self.assertEqual(percentile(values, 100), 4)
+        self.assertEqual(percentile([], 99), 0.0)
+
+    def test_summarize_reports_percentiles(self):
+        summary = summarize([0.001, 0.002, 0.003], [2, 2, 5], [200, 200, 302])
+        self.assertEqual(summary['p50_ms'], 2.0)
+        self.assertEqual(summary['queries']['max'], 5)
+        self.assertEqual(summary['statuses'], {'200': 2, '302': 1})
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BenchmarkCommandsTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def seed(self):
+        call_command(
+            'seed_benchmark', users=10, groups=2, posts=30, comments=40,
+            follows=20, image_ratio=0.5, stdout=io.StringIO(),
+        )
+
+    def test_seed_benchmark_creates_rows(self):
+        self.seed()
+        self.assertEqual(User.objects.count(), 10)
+        self.assertEqual(Group.objects.count(), 2)
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertEqual(Comment.objects.count(), 40)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        self.assertFalse(
+            Follow.objects.filter(user_id=F('author_id')).exists()
+        )
+
+    def test_benchmark_urls_writes_json(self):
+        self.seed()
+        with tempfile.NamedTemporaryFile('r', suffix='.json') as output:
+            call_command(
+                'benchmark_urls', requests=3, warmup=0,
+                output=output.name, stdout=io.StringIO(),
+            )
+            report = json.load(output)
+        self.assertEqual(report['meta']['rows']['posts'], 30 + 3)
+        for name in ('index', 'post_detail', 'follow_index', 'add_comment'):
+            with self.subTest(target=name):
+                result = report['results'][name]
+                self.assertEqual(result['requests'], 3)
+                self.assertIn('p99_ms', result)
+                self.assertGreater(result['queries']['max'], 0)
@@ -0,0 +1,140 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.testing import run_on_commit
+from posts import counts, feed_cache
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+@override_settings(FEED_CACHE_CHUNK=3, FEED_CACHE_MAX_IDS=6)
+class FeedCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='FeedAuthor')
+        cls.group = Group.objects.create(
+            title='Feed group', slug='feed_group', description='Feed group',
+        )
+        cls.other_group = Group.objects.create(
+            title='Other group', slug='other_group',
+            description='Other group',
+        )
+        for number in range(5):
+            Post.objects.create(
+                author=cls.author, text=f'Пост {number}', group=cls.group
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.feed = counts.group_key(self.group.id)
+        self.source = self.group.posts.all()
+
+    def newest(self, limit):
+        return list(self.source.values_list('id', flat=True)[:limit])
+
+    def test_build_stores_ids_as_int64_chunks(self):
+        meta = feed_cache.build(self.feed, self.source)
+        self.assertEqual(
+            meta, {'tail': 0, 'head': 1, 'size': 2, 'complete': True}
+        )
+        chunk = cache.get(feed_cache.chunk_key(self.feed, 0))
+        self.assertIsInstance(chunk, bytes)
+        self.assertEqual(len(chunk), 3 * 8)
+        self.assertEqual(
+            feed_cache.cached_ids(self.feed, 0, 10), self.newest(10)
+        )
+        self.assertEqual(
+            feed_cache.cached_ids(self.feed, 1, 4), self.newest(4)[1:]
+        )
+
+    def test_new_posts_are_appended_and_oldest_chunks_dropped(self):
+        feed_cache.build(self.feed, self.source)
+        with run_on_commit():
+            for number in range(4):
+                Post.objects.create(
+                    author=self.author, text=f'Новый {number}',
+                    group=self.group,
+                )
+        meta = cache.get(feed_cache.meta_key(self.feed))
+        self.assertEqual(meta['head'] - meta['tail'] + 1, 2)
+        self.assertFalse(meta['complete'])
+        self.assertIsNone(cache.get(feed_cache.chunk_key(self.feed, 0)))
+        self.assertEqual(
+            feed_cache.cached_ids(self.feed, 0, 6), self.newest(6)
+        )
+        self.assertIsNone(feed_cache.cached_ids(self.feed, 3, 9))
+        self.assertEqual(
+            [post.id for post in feed_cache.CachedFeed(
+                self.feed, self.source
+            )[3:9]],
+            self.newest(9)[3:],
+        )
+
+    def test_build_racing_a_new_post_does_not_store_stale_feed(self):
+        newest_ids = feed_cache.newest_ids
+
+        def read_then_commit_post(source, limit):
+            ids = newest_ids(source, limit)
+            with run_on_commit():
+                Post.objects.create(
+                    author=self.author, text='Гонка', group=self.group
+                )
+            return ids
+
+        with mock.patch.object(
+            feed_cache, 'newest_ids', read_then_commit_post
+        ):
+            feed_cache.build(self.feed, self.source)
+        self.assertIsNone(cache.get(feed_cache.meta_key(self.feed)))
+        self.assertEqual(
+            [post.id for post in feed_cache.CachedFeed(
+                self.feed, self.source
+            )[0:3]],
+            self.newest(3),
+        )
+
+    def test_uncached_feed_is_not_written_on_new_post(self):
+        Post.objects.create(author=self.author, text='Новый')
+        self.assertIsNone(cache.get(feed_cache.meta_key(counts.INDEX)))
+
+    def test_hydrate_reads_posts_from_object_cache(self):
+        ids = self.newest(5)
+        posts = feed_cache.hydrate(ids)
+        self.assertEqual([post.id for post in posts], ids)
+        # Остаются только запросы авторов и групп.
+        with self.assertNumQueries(2):
+            posts = feed_cache.hydrate(ids)
+        self.assertEqual(posts[0].author, self.author)
+        self.assertEqual(posts[0].group, self.group)
+
+    def test_edit_and_delete_reach_the_cached_feed(self):
+        url = reverse('posts:group_list', args=(self.group.slug,))
+        self.client.get(url)
+        post = Post.objects.get(pk=self.newest(1)[0])
+        post.text = 'Исправленный пост'
+        post.save()
+        self.assertContains(self.client.get(url), 'Исправленный пост')
+        post.group = self.other_group
+        post.save()
+        self.assertIsNone(cache.get(feed_cache.meta_key(self.feed)))
+        self.assertNotContains(self.client.get(url), 'Исправленный пост')
+        other = self.group.posts.first()
+        other.delete()
+        self.assertNotContains(self.client.get(url), other.text)
+
+    def test_pages_are_served_from_the_feed_cache(self):
+        url = reverse('posts:profile', args=(self.author.username,))
+        response = self.client.get(url)
+        self.assertEqual(
+            [post.id for post in response.context['page_obj']],
+            list(self.author.posts.values_list('id', flat=True)),
+        )
+        self.assertIsNotNone(cache.get(feed_cache.meta_key(
+            counts.author_key(self.author.id)
+        )))
@@ -0,0 +1,79 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedFragmentTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='FragmentAuthor')
+        cls.reader = User.objects.create(username='FragmentReader')
+        cls.group = Group.objects.create(
+            title='Fragment group', slug='fragment_group',
+            description='Fragment group',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, text=f'Пост {number}', group=cls.group
+            )
+            for number in range(13)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def test_pages_link_to_fragments_after_last_post(self):
+        pages = {
+            reverse('posts:index'): reverse('posts:index_feed'),
+            reverse('posts:group_list', args=(self.group.slug,)): reverse(
+                'posts:group_feed', args=(self.group.slug,)
+            ),
+            reverse('posts:profile', args=(self.author.username,)): reverse(
+                'posts:profile_feed', args=(self.author.username,)
+            ),
+            reverse('posts:follow_index'): reverse('posts:follow_feed'),
+        }
+        expected = [post.id for post in reversed(self.posts)]
+        for page_url, feed_url in pages.items():
+            with self.subTest(url=page_url):
+                response = self.client.get(page_url)
+                self.assertContains(response, f'href="{feed_url}?cursor=')
+                more = response.context['next_cursor']
+                response = self.client.get(feed_url, {'cursor': more})
+                self.assertTemplateUsed(response, 'posts/includes/feed.html')
+                self.assertTemplateNotUsed(response, 'base.html')
+                self.assertEqual(
+                    [post.id for post in response.context['posts']],
+                    expected[10:],
+                )
+                self.assertIsNone(response.context['next_cursor'])
+                self.assertNotContains(response, 'js-more-posts')
+
+    def test_first_fragment_and_bad_cursor(self):
+        url = reverse('posts:index_feed')
+        response = self.client.get(url)
+        self.assertEqual(len(response.context['posts']), 10)
+        self.assertContains(response, 'js-more-posts')
+        response = self.client.get(url, {'cursor': '!!'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_public_fragments_are_conditional(self):
+        url = reverse('posts:group_feed', args=(self.group.slug,))
+        etag = self.client.get(url)['ETag']
+        self.client.logout()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.assertEqual(
+            self.client.get(reverse('posts:follow_feed')).status_code,
+            HTTPStatus.FOUND,
+        )
@@ -1,7 +1,7 @@
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-from posts.models import Group, Post
+from posts.models import Comment, Group, Post
 
 User = get_user_model()
 
@@ -57,3 +57,26 @@ class GroupModelTest(TestCase):
                     self.group._meta.get_field(field).help_text,
                     expected_value
                 )
+
+
+class ReferenceDeleteTest(TestCase):
+    """Ключи на пользователей и группы без каскада в БД: его делают сигналы."""
+
+    def test_user_and_group_deletes_reach_posts(self):
+        author = User.objects.create(username='DeletedAuthor')
+        reader = User.objects.create(username='Reader')
+        group = Group.objects.create(
+            title='Группа', slug='deleted_group', description='Группа'
+        )
+        post = Post.objects.create(author=reader, text='Пост', group=group)
+        own = Post.objects.create(author=author, text='Свой пост')
+        Comment.objects.create(post=post, author=author, text='Ответ')
+        Comment.objects.create(post=own, author=reader, text='Ответ')
+        group.delete()
+        post.refresh_from_db()
+        self.assertIsNone(post.group_id)
+        author_id = author.pk
+        author.delete()
+        self.assertFalse(Post.objects.filter(pk=own.pk).exists())
+        self.assertFalse(Comment.objects.filter(author_id=author_id).exists())
+        self.assertFalse(Comment.objects.filter(post=own).exists())
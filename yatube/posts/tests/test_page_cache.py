@@ -0,0 +1,107 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core import page_cache
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class PageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='CachedAuthor')
+        cls.other = User.objects.create(username='OtherAuthor')
+        cls.reader = User.objects.create(username='CachedReader')
+        cls.group = Group.objects.create(
+            title='Cached group', slug='cached_group',
+            description='Cached group',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, text='Пост', group=cls.group
+        )
+        cls.other_post = Post.objects.create(
+            author=cls.other, text='Чужой пост'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.urls = {
+            'group': reverse('posts:group_list', args=(self.group.slug,)),
+            'profile': reverse('posts:profile', args=(self.author.username,)),
+            'detail': reverse('posts:post_detail', args=(self.post.id,)),
+            'other': reverse('posts:post_detail', args=(self.other_post.id,)),
+        }
+
+    def rendered(self, url, client=None):
+        response = (client or self.client).get(url)
+        return any(
+            template.name.startswith('posts/') and 'includes' not in (
+                template.name
+            )
+            for template in response.templates
+        )
+
+    def warm(self):
+        for url in self.urls.values():
+            self.rendered(url)
+
+    def test_pages_are_shared_by_anonymous_and_logged_in_users(self):
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                self.assertTrue(self.rendered(url))
+                self.assertFalse(self.rendered(url))
+                self.assertFalse(self.rendered(url, self.reader_client))
+        with self.assertNumQueries(0):
+            self.client.get(self.urls['group'])
+
+    def test_changes_purge_only_affected_pages(self):
+        changes = {
+            'comment': (
+                lambda: Comment.objects.create(
+                    post=self.post, author=self.reader, text='Ком'
+                ),
+                {'group', 'profile', 'detail'},
+            ),
+            'edit': (
+                lambda: Post.objects.get(pk=self.post.pk).save(),
+                {'group', 'profile', 'detail'},
+            ),
+            'new post': (
+                lambda: Post.objects.create(author=self.other, text='Новый'),
+                {'other'},
+            ),
+            'group': (
+                lambda: Group.objects.get(pk=self.group.pk).save(),
+                {'group', 'profile', 'detail'},
+            ),
+            'follow': (
+                lambda: Follow.objects.create(
+                    user=self.reader, author=self.author
+                ),
+                set(),
+            ),
+        }
+        for change, (action, purged) in changes.items():
+            with self.subTest(change=change):
+                self.warm()
+                action()
+                self.assertEqual(
+                    {
+                        name for name, url in self.urls.items()
+                        if self.rendered(url)
+                    },
+                    purged,
+                )
+
+    def test_purge_returns_page_keys(self):
+        self.warm()
+        self.assertEqual(
+            len(page_cache.purge(f'post:{self.other_post.id}')), 1
+        )
+        self.assertEqual(page_cache.purge('post:0'), set())
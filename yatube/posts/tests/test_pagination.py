@@ -0,0 +1,132 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.testing import run_on_commit
+from posts import counts
+from posts.models import Group, Post
+from posts.pagination import CountedPaginator, elided_page_range
+
+User = get_user_model()
+
+
+class ElidedPageRangeTest(TestCase):
+    def test_small_range_is_not_elided(self):
+        self.assertEqual(elided_page_range(2, 5), [1, 2, 3, 4, 5])
+
+    def test_window_around_current_page(self):
+        self.assertEqual(
+            elided_page_range(5000, 10000),
+            [1, None, 4998, 4999, 5000, 5001, 5002, None, 10000],
+        )
+        self.assertEqual(
+            elided_page_range(1, 10000), [1, 2, 3, None, 10000]
+        )
+        self.assertEqual(
+            elided_page_range(10000, 10000),
+            [1, None, 9998, 9999, 10000],
+        )
+
+
+@override_settings(PAGE_COUNT=1)
+class WindowedPaginatorTemplateTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='TestPagerUser')
+        for number in range(30):
+            Post.objects.create(author=cls.user, text=f'Post {number}')
+
+    def test_paginator_renders_window(self):
+        cache.clear()
+        response = self.client.get(reverse('posts:index') + '?page=15')
+        content = response.content.decode()
+        self.assertEqual(content.count('class="page-link"'), 13)
+        self.assertIn('?page=30', content)
+        self.assertNotIn('?page=20"', content)
+        self.assertIn('&hellip;', content)
+
+
+class FeedCountTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='CountUser')
+        cls.group = Group.objects.create(
+            title='Count group', slug='count_group', description='Count',
+        )
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Post {number}')
+            for number in range(6)
+        ]
+        # Посты раз в час: оценка по плотности должна дать точный ответ.
+        for number, post in enumerate(cls.posts):
+            Post.objects.filter(pk=post.pk).update(
+                created=post.created - timedelta(hours=number)
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_count_is_served_from_cache(self):
+        key = counts.author_key(self.user.id)
+        self.assertEqual(counts.feed_count(key, self.user.posts.all()), 6)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                counts.feed_count(key, self.user.posts.all()), 6
+            )
+
+    def test_signals_maintain_counters(self):
+        index = counts.feed_count(counts.INDEX, Post.objects.all())
+        group_key = counts.group_key(self.group.id)
+        counts.feed_count(group_key, self.group.posts.all())
+        with run_on_commit():
+            post = Post.objects.create(
+                author=self.user, text='Новый', group=self.group
+            )
+        self.assertEqual(cache.get(counts.cache_key(counts.INDEX)), index + 1)
+        self.assertEqual(cache.get(counts.cache_key(group_key)), 1)
+        post.group = None
+        with run_on_commit():
+            post.save()
+        self.assertEqual(cache.get(counts.cache_key(group_key)), 0)
+        with run_on_commit():
+            post.delete()
+        self.assertEqual(cache.get(counts.cache_key(counts.INDEX)), index)
+
+    def test_large_feed_count_is_estimated(self):
+        self.assertEqual(
+            counts.estimate_count(self.user.posts.all(), limit=3), 6
+        )
+
+    def test_stale_count_does_not_truncate_page(self):
+        cache.set(counts.cache_key(counts.author_key(self.user.id)), 1)
+        paginator = CountedPaginator(
+            self.user.posts.all(), 4, counts.author_key(self.user.id)
+        )
+        self.assertEqual(len(paginator.get_page(1)), 4)
+
+    def test_low_estimate_keeps_tail_pages_reachable(self):
+        key = counts.author_key(self.user.id)
+        counts.remember(key, 1)
+        paginator = CountedPaginator(self.user.posts.all(), 4, key)
+        self.assertTrue(paginator.get_page(1).has_next())
+        paginator = CountedPaginator(self.user.posts.all(), 4, key)
+        page = paginator.get_page(2)
+        self.assertEqual(page.number, 2)
+        self.assertEqual(len(page), 2)
+        self.assertFalse(page.has_next())
+        self.assertEqual(cache.get(counts.cache_key(key)), 6)
+
+    def test_high_estimate_falls_back_to_real_last_page(self):
+        key = counts.author_key(self.user.id)
+        counts.remember(key, 100)
+        paginator = CountedPaginator(self.user.posts.all(), 4, key)
+        page = paginator.get_page(10)
+        self.assertEqual(page.number, 2)
+        self.assertEqual(len(page), 2)
+        self.assertEqual(paginator.num_pages, 2)
+        self.assertEqual(cache.get(counts.cache_key(key)), 6)
@@ -0,0 +1,72 @@
+from datetime import timedelta
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post
+from posts.ranking import score
+
+User = get_user_model()
+
+WEIGHTS = {'recency': 1.0, 'affinity': 0.5, 'engagement': 0.3}
+
+
+class ScoreTest(TestCase):
+    def test_vectorized_score(self):
+        scores = score(
+            created=np.array([100.0, 100.0, 0.0]),
+            affinity=np.array([0.0, 3.0, 0.0]),
+            engagement=np.array([0.0, 0.0, 0.0]),
+            now=100.0, weights=WEIGHTS, half_life=100.0,
+        )
+        np.testing.assert_allclose(
+            scores, [1.0, 1.0 + 0.5 * np.log(4), 0.5]
+        )
+
+
+@override_settings(PAGE_COUNT=2)
+class RankedFollowFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create(username='RankedReader')
+        cls.favorite = User.objects.create(username='RankedFavorite')
+        cls.other = User.objects.create(username='RankedOther')
+        for author in (cls.favorite, cls.other):
+            Follow.objects.create(user=cls.reader, author=author)
+        cls.old_favorite = Post.objects.create(
+            author=cls.favorite, text='Старый пост любимого автора'
+        )
+        Post.objects.filter(pk=cls.old_favorite.pk).update(
+            created=cls.old_favorite.created - timedelta(hours=6)
+        )
+        cls.fresh = Post.objects.create(author=cls.other, text='Свежий')
+        Comment.objects.create(
+            post=cls.old_favorite, author=cls.reader, text='Нравится'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def test_chronological_by_default(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [self.fresh, self.old_favorite],
+        )
+        self.assertFalse(response.context['ranked'])
+
+    def test_ranked_mode_prefers_affinity(self):
+        response = self.client.get(
+            reverse('posts:follow_index'), {'mode': 'ranked'}
+        )
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [self.old_favorite, self.fresh],
+        )
+        self.assertTrue(response.context['ranked'])
+        self.assertContains(response, 'По времени')
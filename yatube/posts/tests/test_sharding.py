@@ -0,0 +1,193 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from posts import sharding
+from posts.models import Comment, Follow, Group, Post
+from posts.pagination import keyset_page
+
+User = get_user_model()
+
+SHARDS = ['shard_test_0', 'shard_test_1']
+
+
+def add_shards():
+    for alias in SHARDS:
+        if alias in connections.databases:
+            continue
+        connections.databases[alias] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': f'file:{alias}?mode=memory&cache=shared',
+        }
+        connections.ensure_defaults(alias)
+        connections.prepare_test_settings(alias)
+
+
+@override_settings(POST_SHARDS=SHARDS, PAGE_COUNT=3)
+class ShardingTest(TransactionTestCase):
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        add_shards()
+        super().setUpClass()
+
+    def setUp(self):
+        cache.clear()
+        for alias in SHARDS:
+            call_command('migrate', database=alias, verbosity=0)
+        self.group = Group.objects.create(
+            title='Shard group', slug='shard_group', description='Shards',
+        )
+        self.authors = [
+            User.objects.create(username=f'ShardAuthor{number}')
+            for number in range(2)
+        ]
+        self.reader = User.objects.create(username='ShardReader')
+        self.posts = [
+            Post.objects.create(
+                author=self.authors[number % 2], text=f'Пост {number}',
+                group=self.group,
+            )
+            for number in range(7)
+        ]
+
+    def tearDown(self):
+        for alias in SHARDS:
+            with connections[alias].cursor() as cursor:
+                for table in ('posts_comment', 'posts_post'):
+                    cursor.execute(f'DROP TABLE IF EXISTS {table}')
+                cursor.execute('DELETE FROM django_migrations')
+
+    def test_posts_are_stored_on_author_shard(self):
+        for post in self.posts:
+            shard = sharding.shard_for_author(post.author_id)
+            self.assertEqual(post._state.db, shard)
+            self.assertEqual(sharding.shard_for_post(post.id), shard)
+        for alias in SHARDS:
+            self.assertTrue(Post.objects.using(alias).exists())
+        self.assertEqual(
+            len({post.id for post in self.posts}), len(self.posts)
+        )
+
+    def test_feeds_merge_shards_by_created(self):
+        expected = [post.id for post in reversed(self.posts)]
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+        self.client.force_login(self.reader)
+        urls = {
+            reverse('posts:index'): expected,
+            reverse('posts:group_list', args=(self.group.slug,)): expected,
+            reverse('posts:follow_index'): [
+                post.id for post in reversed(self.posts)
+                if post.author == self.authors[0]
+            ],
+        }
+        for url, ids in urls.items():
+            with self.subTest(url=url):
+                pages = [
+                    self.client.get(url, {'page': page}).context['page_obj']
+                    for page in (1, 2, 3)
+                ]
+                self.assertEqual(pages[0].paginator.count, len(ids))
+                self.assertEqual(
+                    [post.id for page in pages for post in page
+                     ][:len(ids)],
+                    ids,
+                )
+                self.assertEqual(
+                    pages[0][0].author.username,
+                    User.objects.get(pk=pages[0][0].author_id).username,
+                )
+
+    def test_keyset_pages_walk_shards(self):
+        ids, cursor = [], None
+        while True:
+            posts, cursor = keyset_page(
+                sharding.feed(Post.objects.all()), cursor, 3
+            )
+            ids.extend(post.id for post in posts)
+            if cursor is None:
+                break
+        self.assertEqual(ids, [post.id for post in reversed(self.posts)])
+
+    def test_post_detail_and_comments_on_shard(self):
+        post = self.posts[-1]
+        self.client.force_login(self.reader)
+        self.client.post(
+            reverse('posts:add_comment', args=(post.id,)),
+            {'text': 'Комментарий'},
+        )
+        comment = Comment.objects.using(
+            sharding.shard_for_post(post.id)
+        ).get()
+        self.assertEqual(comment.post_id, post.id)
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.id,))
+        )
+        self.assertEqual(response.context['post'], post)
+        self.assertEqual(
+            response.context['comments'][0].author, self.reader
+        )
+        response = self.client.get(reverse('posts:index'))
+        previews = {
+            card.id: card.latest_comments
+            for card in response.context['page_obj']
+        }
+        self.assertEqual(
+            previews[post.id][0].author_username, self.reader.username
+        )
+
+    def test_api_reads_shards(self):
+        post = self.posts[-1]
+        Comment.objects.create(post=post, author=self.reader, text='Ответ')
+        results = self.client.get(
+            reverse('api:index'), {'limit': 10}
+        ).json()['results']
+        self.assertEqual(
+            [row['id'] for row in results],
+            [post.id for post in reversed(self.posts)],
+        )
+        self.assertEqual(results[0]['author'], post.author.username)
+        self.assertEqual(results[0]['group'], self.group.slug)
+        profile = self.client.get(
+            reverse('api:profile_posts', args=(self.authors[0].username,))
+        ).json()['results']
+        self.assertEqual(
+            {row['author'] for row in profile}, {self.authors[0].username}
+        )
+        detail = self.client.get(reverse('api:post_detail', args=(post.id,)))
+        self.assertEqual(detail.json()['text'], post.text)
+        comments = self.client.get(
+            reverse('api:comments', args=(post.id,))
+        ).json()['results']
+        self.assertEqual(
+            [(row['text'], row['author']) for row in comments],
+            [('Ответ', self.reader.username)],
+        )
+
+    def test_deleting_user_and_group_reaches_shards(self):
+        author = self.authors[0]
+        post = self.posts[1]
+        Comment.objects.create(post=post, author=author, text='Свой')
+        self.group.delete()
+        for alias in SHARDS:
+            self.assertFalse(
+                Post.objects.using(alias).exclude(group=None).exists()
+            )
+        author.delete()
+        for alias in SHARDS:
+            self.assertFalse(
+                Post.objects.using(alias).filter(author_id=author.pk).exists()
+            )
+            self.assertFalse(
+                Comment.objects.using(alias).filter(
+                    author_id=author.pk
+                ).exists()
+            )
+
+    def test_seed_benchmark_refuses_shards(self):
+        with self.assertRaises(CommandError):
+            call_command('seed_benchmark', users=2, posts=1)
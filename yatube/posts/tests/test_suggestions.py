@@ -0,0 +1,75 @@
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Follow, FollowSuggestion
+from posts.suggestions import top_suggestions
+
+User = get_user_model()
+
+
+class TopSuggestionsTest(TestCase):
+    def test_co_followed_authors_are_suggested(self):
+        # 1 и 2 читают 10 и 11; 3 читает только 10 - ему советуем 11.
+        pairs = [(1, 10), (1, 11), (2, 10), (2, 11), (3, 10), (3, 12)]
+        suggestions = list(top_suggestions(pairs, limit=5))
+        for_user = {
+            user_id: [row[1] for row in suggestions if row[0] == user_id]
+            for user_id in (1, 2, 3)
+        }
+        self.assertEqual(for_user[3], [11])
+        self.assertEqual(for_user[1], [12])
+        self.assertNotIn(10, for_user[1] + for_user[2] + for_user[3])
+
+    def test_limit_and_ranks(self):
+        pairs = [(1, 10)] + [
+            (user_id, author_id)
+            for user_id in range(2, 6)
+            for author_id in (10, 20, 21, 22)
+        ]
+        suggestions = [
+            row for row in top_suggestions(pairs, limit=2) if row[0] == 1
+        ]
+        self.assertEqual([row[3] for row in suggestions], [1, 2])
+        self.assertEqual(list(top_suggestions([], 2)), [])
+
+
+class SuggestionsCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.users = [
+            User.objects.create(username=f'SuggestUser{number}')
+            for number in range(5)
+        ]
+        readers, authors = cls.users[:3], cls.users[3:]
+        for reader in readers[:2]:
+            for author in authors:
+                Follow.objects.create(user=reader, author=author)
+        Follow.objects.create(user=readers[2], author=authors[0])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_command_stores_suggestions_for_profile_sidebar(self):
+        call_command('compute_follow_suggestions', stdout=io.StringIO())
+        reader, suggested = self.users[2], self.users[4]
+        self.assertEqual(
+            list(FollowSuggestion.objects.filter(
+                user=reader
+            ).values_list('author_id', 'rank')),
+            [(suggested.id, 1)],
+        )
+        self.client.force_login(reader)
+        response = self.client.get(
+            reverse('posts:profile', args=(self.users[3].username,))
+        )
+        self.assertEqual(
+            [item.author for item in response.context['suggestions']],
+            [suggested],
+        )
+        self.assertContains(response, 'Кого почитать')
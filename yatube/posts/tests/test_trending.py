@@ -0,0 +1,89 @@
+import io
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.testing import run_on_commit
+from posts import trending
+from posts.models import Comment, Post, PostActivity
+
+User = get_user_model()
+
+
+@override_settings(TRENDING_SIZE=2)
+class TrendingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='TrendingUser')
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Пост {number}')
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def comment(self, post, count=1):
+        with run_on_commit():
+            for _ in range(count):
+                Comment.objects.create(
+                    post=post, author=self.user, text='Ком'
+                )
+
+    def test_comments_fill_hourly_buckets(self):
+        self.comment(self.posts[0], 3)
+        activity = PostActivity.objects.get(post_id=self.posts[0].id)
+        self.assertEqual(activity.comments, 3)
+        self.assertEqual(activity.bucket, trending.bucket_of(timezone.now()))
+
+    def test_top_is_bounded_and_updated_incrementally(self):
+        self.assertEqual(trending.top_post_ids(), [])
+        self.comment(self.posts[0], 1)
+        self.comment(self.posts[1], 3)
+        self.comment(self.posts[2], 2)
+        self.assertEqual(
+            trending.top_post_ids(), [self.posts[1].id, self.posts[2].id]
+        )
+        self.assertEqual(trending.rebuild_top(), cache.get(trending.TOP_KEY))
+
+    def test_old_activity_decays(self):
+        now = timezone.now()
+        old = trending.bucket_of(now - timedelta(hours=12))
+        PostActivity.objects.create(
+            post_id=self.posts[0].id, bucket=old, comments=3
+        )
+        PostActivity.objects.create(
+            post_id=self.posts[1].id, bucket=trending.bucket_of(now),
+            comments=1,
+        )
+        # Период полураспада 6 часов: 3 комментария 12 часов назад весят
+        # 0.75 свежего.
+        self.assertEqual(
+            [post_id for _, post_id in trending.rebuild_top(now)],
+            [self.posts[1].id, self.posts[0].id],
+        )
+
+    def test_refresh_prunes_buckets_outside_window(self):
+        PostActivity.objects.create(
+            post_id=self.posts[0].id,
+            bucket=trending.bucket_of(timezone.now() - timedelta(days=3)),
+            comments=10,
+        )
+        call_command('refresh_trending', stdout=io.StringIO())
+        self.assertFalse(PostActivity.objects.exists())
+        self.assertEqual(trending.top_post_ids(), [])
+
+    def test_trending_page(self):
+        self.comment(self.posts[2], 2)
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('posts:trending'))
+        self.assertEqual(
+            [post.id for post in response.context['page_obj']],
+            [self.posts[2].id],
+        )
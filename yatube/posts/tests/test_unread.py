@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from core.testing import run_on_commit
+from posts.models import FeedWatermark, Follow, Post
+
+User = get_user_model()
+
+
+class UnreadCountTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='UnreadAuthor')
+        cls.reader = User.objects.create(username='UnreadReader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def unread(self):
+        return self.client.get(
+            reverse('posts:trending')
+        ).context['unread_count']
+
+    def test_badge_counts_posts_since_last_visit(self):
+        self.client.get(reverse('posts:follow_index'))
+        self.assertTrue(FeedWatermark.objects.filter(user=self.reader))
+        with run_on_commit():
+            for number in range(3):
+                Post.objects.create(author=self.author, text=f'Пост {number}')
+        self.assertEqual(self.unread(), 3)
+        response = self.client.get(reverse('posts:trending'))
+        self.assertContains(response, '<span class="badge bg-primary">3')
+        self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(self.unread(), 0)
+
+    def test_counter_is_rebuilt_from_watermark(self):
+        self.client.get(reverse('posts:follow_index'))
+        Post.objects.create(author=self.author, text='Пост')
+        cache.clear()
+        self.client.force_login(self.reader)
+        self.assertEqual(self.unread(), 1)
+
+    def test_badge_costs_no_queries_when_cached(self):
+        self.client.get(reverse('posts:follow_index'))
+        with run_on_commit():
+            Post.objects.create(author=self.author, text='Пост')
+        response = self.client.get(reverse('posts:trending'))
+        with self.assertNumQueries(0):
+            self.assertEqual(int(str(response.context['unread_count'])), 1)
@@ -1,20 +1,22 @@
 import shutil
-import tempfile
 from datetime import datetime
+from http import HTTPStatus
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase
-from django.test.utils import override_settings
+from django.test.utils import CaptureQueriesContext, override_settings
 from django.urls import reverse
+from core.testing import temp_media_root
 from posts.models import Comment, Follow, Group, Post
 
 User = get_user_model()
 
-TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMP_MEDIA_ROOT = temp_media_root()
 
 
 class PostsPagesTests(TestCase):
@@ -362,3 +364,273 @@ class FollowTest(TestCase):
         response_not_follower = self.not_follower_client.get(reverse_name)
         self.assertEqual(response_follower.context['page_obj'][0], self.post)
         self.assertNotEqual(len(response_not_follower.context), 0)
+
+
+class ConditionalGetTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='TestEtagAuthor')
+        cls.reader = User.objects.create(username='TestEtagReader')
+        cls.group = Group.objects.create(
+            title='Etag group',
+            slug='etag_group',
+            description='Etag group',
+        )
+        cls.post = Post.objects.create(
+            text='Test post for conditional get',
+            author=cls.author,
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.urls = {
+            'group': reverse(
+                'posts:group_list', kwargs={'slug': self.group.slug}
+            ),
+            'profile': reverse(
+                'posts:profile', kwargs={'username': self.author}
+            ),
+            'detail': reverse(
+                'posts:post_detail', kwargs={'post_id': self.post.id}
+            ),
+        }
+
+    def assertChanged(self, client, url, change):
+        etag = client.get(url)['ETag']
+        change()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_unchanged_pages_are_not_rendered(self):
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                response = self.reader_client.get(url)
+                self.assertFalse(response.has_header('Last-Modified'))
+                response = self.reader_client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED
+                )
+                self.assertEqual(response.templates, [])
+
+    def test_if_modified_since_alone_is_not_trusted(self):
+        url = self.urls['group']
+        response = self.reader_client.get(
+            url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_etag_depends_on_user_and_page(self):
+        url = self.urls['profile']
+        etag = self.reader_client.get(url)['ETag']
+        self.assertNotEqual(self.author_client.get(url)['ETag'], etag)
+        self.assertNotEqual(
+            self.reader_client.get(url + '?page=2')['ETag'], etag
+        )
+
+    def test_post_edit_changes_validators(self):
+        def edit():
+            self.author_client.post(
+                reverse('posts:post_edit', kwargs={'post_id': self.post.id}),
+                {'text': 'Edited text', 'group': self.group.id},
+            )
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                self.assertChanged(self.reader_client, url, edit)
+
+    def test_comment_changes_post_detail(self):
+        self.assertChanged(
+            self.reader_client, self.urls['detail'],
+            lambda: self.reader_client.post(
+                reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+                {'text': 'Comment'},
+            ),
+        )
+
+    def test_comment_changes_feed_pages(self):
+        # Карточки в лентах показывают число и последние комментарии.
+        for name in ('group', 'profile'):
+            with self.subTest(page=name):
+                self.assertChanged(
+                    self.reader_client, self.urls[name],
+                    lambda: Comment.objects.create(
+                        post=self.post, author=self.reader, text='Comment'
+                    ),
+                )
+
+    def test_comment_keys_cost_one_query(self):
+        # INSERT и один SELECT автора и группы поста для ключей.
+        with self.assertNumQueries(2):
+            Comment.objects.create(
+                post=self.post, author=self.reader, text='Comment'
+            )
+
+    def test_follow_changes_profile(self):
+        self.assertChanged(
+            self.reader_client, self.urls['profile'],
+            lambda: self.reader_client.get(
+                reverse(
+                    'posts:profile_follow', kwargs={'username': self.author}
+                )
+            ),
+        )
+
+    def test_group_edit_changes_group_page(self):
+        def edit():
+            self.group.description = 'New description'
+            self.group.save()
+        self.assertChanged(self.reader_client, self.urls['group'], edit)
+
+
+@override_settings(COMMENTS_PAGE_COUNT=3)
+class CommentsPaginationTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='TestCommentsPager')
+        cls.post = Post.objects.create(text='Popular post', author=cls.user)
+        cls.commenters = [
+            User.objects.create(username=f'TestCommenter{number}')
+            for number in range(5)
+        ]
+        for number, commenter in enumerate(cls.commenters):
+            Comment.objects.create(
+                post=cls.post, author=commenter, text=f'Comment {number}'
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def detail(self):
+        return self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        )
+
+    def test_first_page_of_comments(self):
+        response = self.detail()
+        comments = response.context['comments']
+        self.assertEqual(len(comments), 3)
+        self.assertEqual(comments[0].text, 'Comment 4')
+        self.assertIsNotNone(response.context['comments_cursor'])
+        self.assertContains(response, 'js-more-comments')
+        self.assertTemplateUsed(response, 'posts/includes/feed_script.html')
+        self.assertContains(response, "getElementById('comments')")
+        self.assertContains(response, "closest('.js-more-comments')")
+
+    def test_fragment_loads_remaining_comments(self):
+        cursor = self.detail().context['comments_cursor']
+        response = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.id}),
+            {'cursor': cursor},
+        )
+        self.assertTemplateUsed(response, 'posts/includes/comments.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            ['Comment 1', 'Comment 0'],
+        )
+        self.assertIsNone(response.context['comments_cursor'])
+
+    def test_bad_cursor(self):
+        response = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.id}),
+            {'cursor': 'broken'},
+        )
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_queries_do_not_grow_with_comments(self):
+        # Прогрев счетчиков; новый комментарий сбрасывает кэш страницы.
+        self.detail()
+        Comment.objects.create(
+            post=self.post, author=self.commenters[0], text='Warm up'
+        )
+        with CaptureQueriesContext(connection) as before:
+            self.detail()
+        for number in range(10):
+            Comment.objects.create(
+                post=self.post,
+                author=self.commenters[number % 5],
+                text=f'More {number}',
+            )
+        with CaptureQueriesContext(connection) as after:
+            self.detail()
+        self.assertEqual(len(before), len(after))
+
+
+@override_settings(COMMENT_PREVIEW_COUNT=2)
+class CommentPreviewTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='TestPreviewUser')
+        cls.group = Group.objects.create(
+            title='Preview group',
+            slug='preview_group',
+            description='Preview group',
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Preview post {number}',
+                author=cls.user,
+                group=cls.group,
+            )
+            for number in range(3)
+        ]
+        for number in range(4):
+            Comment.objects.create(
+                post=cls.posts[0], author=cls.user, text=f'Comment {number}'
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        ]
+
+    def test_feed_cards_have_latest_comments(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                cache.clear()
+                response = self.client.get(url)
+                posts = {
+                    post.id: post for post in response.context['page_obj']
+                }
+                commented = posts[self.posts[0].id]
+                self.assertEqual(commented.comment_count, 4)
+                self.assertEqual(
+                    [comment.text for comment in commented.latest_comments],
+                    ['Comment 3', 'Comment 2'],
+                )
+                self.assertEqual(
+                    commented.latest_comments[0].author_username,
+                    self.user.username,
+                )
+                self.assertEqual(posts[self.posts[1].id].comment_count, 0)
+                self.assertContains(response, 'Комментариев: 4')
+
+    def test_feed_queries_do_not_grow_with_comments(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                cache.clear()
+                with CaptureQueriesContext(connection) as before:
+                    self.client.get(url)
+                for post in self.posts:
+                    Comment.objects.create(
+                        post=post, author=self.user, text='More'
+                    )
+                cache.clear()
+                with CaptureQueriesContext(connection) as after:
+                    self.client.get(url)
+                self.assertEqual(len(before), len(after))
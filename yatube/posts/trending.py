@@ -0,0 +1,122 @@
+import math
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.cache import lock
+
+from .models import PostActivity
+
+TOP_KEY = 'trending:top'
+
+
+def bucket_of(moment):
+    return int(moment.timestamp() // settings.TRENDING_BUCKET_SECONDS)
+
+
+def decay_rate():
+    return math.log(2) / settings.TRENDING_HALF_LIFE
+
+
+def log_weight(bucket, comments):
+    """Логарифм вклада корзины с forward decay.
+
+    Вес растет как exp(rate * t) от времени корзины, поэтому старые оценки
+    не надо пересчитывать: порядок постов тот же, что у exp(-rate * age).
+    Логарифм нужен, чтобы экспонента не переполнялась.
+    """
+    moment = bucket * settings.TRENDING_BUCKET_SECONDS
+    return math.log(comments) + decay_rate() * moment
+
+
+def log_sum(values):
+    values = list(values)
+    if not values:
+        return None
+    peak = max(values)
+    return peak + math.log(sum(math.exp(value - peak) for value in values))
+
+
+def window_start(now=None):
+    now = now or timezone.now()
+    return bucket_of(now) - settings.TRENDING_WINDOW // (
+        settings.TRENDING_BUCKET_SECONDS
+    )
+
+
+def post_score(post_id, now=None):
+    buckets = PostActivity.objects.filter(
+        post_id=post_id, bucket__gt=window_start(now)
+    ).values_list('bucket', 'comments')
+    return log_sum(log_weight(*row) for row in buckets)
+
+
+def record_comment(post_id, moment):
+    """Учитывает комментарий в часовой корзине поста и в топе."""
+    bucket = bucket_of(moment)
+    activity = PostActivity.objects.filter(post_id=post_id, bucket=bucket)
+    if not activity.update(comments=F('comments') + 1):
+        try:
+            with transaction.atomic():
+                PostActivity.objects.create(
+                    post_id=post_id, bucket=bucket, comments=1
+                )
+        except IntegrityError:
+            activity.update(comments=F('comments') + 1)
+    update_top(post_id, post_score(post_id))
+
+
+def update_top(post_id, score):
+    """Вставляет новую оценку поста в ограниченный топ: O(K)."""
+    with lock('trending'):
+        top = cache.get(TOP_KEY)
+        if top is None:
+            return
+        top = [entry for entry in top if entry[1] != post_id]
+        if score is not None:
+            top.append((score, post_id))
+            top.sort(reverse=True)
+        cache.set(
+            TOP_KEY, top[:settings.TRENDING_SIZE],
+            settings.TRENDING_CACHE_TIMEOUT,
+        )
+
+
+def rebuild_top(now=None):
+    """Полный пересчет топа по корзинам окна (команда refresh_trending)."""
+    scores = defaultdict(list)
+    rows = PostActivity.objects.filter(
+        bucket__gt=window_start(now)
+    ).values_list('post_id', 'bucket', 'comments')
+    for post_id, bucket, comments in rows.iterator():
+        scores[post_id].append(log_weight(bucket, comments))
+    top = sorted(
+        ((log_sum(weights), post_id) for post_id, weights in scores.items()),
+        reverse=True,
+    )[:settings.TRENDING_SIZE]
+    with lock('trending'):
+        cache.set(TOP_KEY, top, settings.TRENDING_CACHE_TIMEOUT)
+    return top
+
+
+def prune(now=None):
+    deleted, _ = PostActivity.objects.filter(
+        bucket__lte=window_start(now)
+    ).delete()
+    return deleted
+
+
+def top_post_ids():
+    top = cache.get(TOP_KEY)
+    if top is None:
+        top = rebuild_top()
+    return [post_id for _, post_id in top]
+
+
+def forget_post(post_id):
+    PostActivity.objects.filter(post_id=post_id).delete()
+    update_top(post_id, None)
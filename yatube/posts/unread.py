@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import sharding
+from .models import FeedWatermark, Post
+
+# Счетчик новых постов ленты подписок живет в кэше: публикация поста
+# увеличивает его у всех подписчиков автора, открытие /follow/
+# обнуляет. Из базы (по отметке FeedWatermark) он считается только
+# при промахе кэша.
+
+
+def cache_key(user_id):
+    return f'unread:{user_id}'
+
+
+def count_since_watermark(user):
+    seen = FeedWatermark.objects.filter(
+        user=user
+    ).values_list('seen', flat=True).first()
+    if seen is None:
+        return 0
+    posts = Post.objects.filter(created__gt=seen)
+    if sharding.enabled():
+        return sharding.authors_feed(
+            posts, user.follower.values_list('author_id', flat=True)
+        ).count()
+    return posts.filter(author__following__user=user).count()
+
+
+def unread_count(user):
+    count = cache.get(cache_key(user.pk))
+    if count is None:
+        count = count_since_watermark(user)
+        cache.set(cache_key(user.pk), count, settings.UNREAD_CACHE_TIMEOUT)
+    return count
+
+
+def mark_seen(user):
+    """Сдвигает отметку на текущий момент; повторный визит - без записи."""
+    if cache.get(cache_key(user.pk)) == 0:
+        return
+    FeedWatermark.objects.update_or_create(
+        user=user, defaults={'seen': timezone.now()}
+    )
+    cache.set(cache_key(user.pk), 0, settings.UNREAD_CACHE_TIMEOUT)
+
+
+def fan_out(follower_ids):
+    """+1 непрочитанный подписчикам автора, чей счетчик уже в кэше."""
+    for user_id in follower_ids:
+        try:
+            cache.incr(cache_key(user_id))
+        except ValueError:
+            pass
+
+
+def forget(*user_ids):
+    cache.delete_many([cache_key(user_id) for user_id in user_ids])
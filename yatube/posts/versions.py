@@ -0,0 +1,91 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.views.decorators.http import condition
+
+# Метки изменений лент и страниц. Значение - время последнего изменения
+# в микросекундах. Валидатор только ETag: Last-Modified с точностью до
+# секунды отдал бы 304 со старой страницей после двух правок за секунду.
+INDEX = 'index'
+USERS = 'users'
+SUGGESTIONS = 'suggestions'
+
+
+def post_key(post_id):
+    return f'post:{post_id}'
+
+
+def group_key(slug):
+    return f'group:{slug}'
+
+
+def author_key(username):
+    return f'author:{username}'
+
+
+def follows_key(user_id):
+    return f'follows:{user_id}'
+
+
+def cache_key(key):
+    return f'version:{key}'
+
+
+def now_stamp():
+    return time.time_ns() // 1000
+
+
+def get_versions(keys):
+    cache_keys = [cache_key(key) for key in keys]
+    found = cache.get_many(cache_keys)
+    missing = {
+        key: now_stamp() for key in cache_keys if key not in found
+    }
+    if missing:
+        # Потерянная метка заменяется текущим временем: новый валидатор
+        # гарантированно не совпадет ни с одним из выданных ранее. add
+        # не затирает метку, которую успел записать другой процесс.
+        for key, stamp in missing.items():
+            cache.add(key, stamp, settings.VERSION_CACHE_TIMEOUT)
+        found.update({**missing, **cache.get_many(list(missing))})
+    return [found[key] for key in cache_keys]
+
+
+def bump(*keys):
+    stamp = now_stamp()
+    cache.set_many(
+        {cache_key(key): stamp for key in keys},
+        settings.VERSION_CACHE_TIMEOUT,
+    )
+
+
+def etag(keys, *extra):
+    parts = [str(version) for version in get_versions(keys)]
+    parts.extend(str(item) for item in extra)
+    return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+
+def conditional(keys_func, personal=False):
+    """Условный GET по ETag из меток версий.
+
+    keys_func(request, **kwargs) возвращает ключи, от которых зависит
+    страница, или None, если валидатор построить нельзя. Для personal
+    страниц в ETag входит id пользователя: шапка и кнопки у всех разные.
+    """
+    def get_keys(request, kwargs):
+        if not hasattr(request, '_version_keys'):
+            request._version_keys = keys_func(request, **kwargs)
+        return request._version_keys
+
+    def etag_func(request, *args, **kwargs):
+        keys = get_keys(request, kwargs)
+        if keys is None:
+            return None
+        extra = sorted(request.GET.items())
+        if personal:
+            extra.append(request.user.pk)
+        return etag(keys, *extra)
+
+    return condition(etag_func=etag_func)
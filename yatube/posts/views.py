@@ -1,83 +1,222 @@
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db import router
+from django.http import HttpResponseBadRequest
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.cache import cache_page
 
+from core import page_cache
+from core.db import writer
+
+from . import (
+    counts, feed_cache, ranking, sharding, trending, unread, versions,
+)
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import Comment, Follow, Group, Post, User
+from .pagination import CountedPaginator, keyset_page
+from .previews import attach_comment_previews
+
+
+def index_keys(request):
+    return [versions.INDEX, versions.USERS]
+
+
+def group_keys(request, slug):
+    return [versions.group_key(slug), versions.USERS]
+
+
+def author_keys(request, username):
+    return [versions.author_key(username), versions.USERS]
+
+
+def profile_keys(request, username):
+    keys = [versions.author_key(username), versions.USERS]
+    if request.user.is_authenticated:
+        keys.append(versions.follows_key(request.user.pk))
+        keys.append(versions.SUGGESTIONS)
+    return keys
+
+
+def post_keys(request, post_id):
+    if sharding.enabled():
+        author_id = sharding.for_post(
+            Post.objects.filter(id=post_id), post_id
+        ).values_list('author_id', flat=True).first()
+        username = User.objects.filter(
+            id=author_id
+        ).values_list('username', flat=True).first()
+    else:
+        username = Post.objects.filter(
+            id=post_id
+        ).values_list('author__username', flat=True).first()
+    if username is None:
+        return None
+    return [
+        versions.post_key(post_id),
+        versions.author_key(username),
+        versions.USERS,
+    ]
+
+
+def post_tags(posts):
+    """Теги страницы с постами: сами посты, их авторы и группы."""
+    tags = set()
+    for post in posts:
+        tags.add(versions.post_key(post.id))
+        tags.add(versions.author_key(post.author.username))
+        if post.group:
+            tags.add(versions.group_key(post.group.slug))
+    return tags
+
+
+def comments_keys(request, post_id):
+    return [versions.post_key(post_id), versions.USERS]
 
 
 @cache_page(20, key_prefix='index_page')
 def index(request):
-    post_list = Post.objects.select_related('group').all()
-    paginator = Paginator(post_list, settings.PAGE_COUNT)
+    post_list = feed_cache.CachedFeed(counts.INDEX, sharding.feed(
+        Post.objects.select_related('author', 'group').all()
+    ))
+    paginator = CountedPaginator(
+        post_list, settings.PAGE_COUNT, counts.INDEX
+    )
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    page_obj.object_list = attach_comment_previews(page_obj.object_list)
     template = 'posts/index.html'
     context = {
         'title': 'Последние обновления на сайте',
         'page_obj': page_obj,
         'index': True,
     }
-    return render(request, template, context)
+    return page_cache.tagged(
+        render(request, template, context),
+        {versions.INDEX, *post_tags(page_obj)},
+    )
 
 
+def trending_posts(request):
+    paginator = Paginator(trending.top_post_ids(), settings.PAGE_COUNT)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    posts = sharding.in_bulk(
+        Post.objects.select_related('author', 'group'), page_obj.object_list
+    )
+    page_obj.object_list = attach_comment_previews(
+        posts[post_id] for post_id in page_obj.object_list
+        if post_id in posts
+    )
+    context = {
+        'title': 'Популярное сейчас',
+        'page_obj': page_obj,
+        'trending': True,
+    }
+    return render(request, 'posts/index.html', context)
+
+
+@versions.conditional(group_keys, personal=True)
+@page_cache.cached
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    paginator = Paginator(post_list, settings.PAGE_COUNT)
+    feed = counts.group_key(group.id)
+    post_list = feed_cache.CachedFeed(feed, sharding.feed(
+        group.posts.select_related('author', 'group')
+    ))
+    paginator = CountedPaginator(post_list, settings.PAGE_COUNT, feed)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    page_obj.object_list = attach_comment_previews(page_obj.object_list)
     context = {
         'title': group.title,
         'group': group,
         'page_obj': page_obj,
     }
-    return render(request, 'posts/group_list.html', context)
+    return page_cache.tagged(
+        render(request, 'posts/group_list.html', context),
+        {versions.group_key(slug), *post_tags(page_obj)},
+    )
 
 
+@versions.conditional(profile_keys, personal=True)
+@page_cache.cached
 def profile(request, username):
     user = get_object_or_404(User, username=username)
     name = f'{user.first_name} {user.last_name}'
-    post_count = user.posts.count()
-    post_list = user.posts.all()
-    paginator = Paginator(post_list, settings.PAGE_COUNT)
+    feed = counts.author_key(user.id)
+    post_list = feed_cache.CachedFeed(feed, sharding.feed(
+        user.posts.select_related('author', 'group'),
+        [sharding.shard_for_author(user.id)],
+    ))
+    paginator = CountedPaginator(post_list, settings.PAGE_COUNT, feed)
+    post_count = paginator.count
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
-    following = False
-    if request.user.is_authenticated and Follow.objects.filter(
-        user=request.user, author=user
-    ).exists():
-        following = True
-    self_page = False
-    if user == request.user:
-        self_page = True
+    page_obj.object_list = attach_comment_previews(page_obj.object_list)
     context = {
         'title': f'Все посты пользователя {name}',
         'author': user,
         'post_count': post_count,
         'page_obj': page_obj,
-        'following': following,
-        'self_page': self_page,
     }
-    return render(request, 'posts/profile.html', context)
+    return page_cache.tagged(
+        render(request, 'posts/profile.html', context),
+        {versions.author_key(user.username), *post_tags(page_obj)},
+    )
 
 
+@versions.conditional(post_keys, personal=True)
+@page_cache.cached
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    comments = post.comments.all()
-    form = CommentForm(request.POST or None)
+    post = get_object_or_404(
+        sharding.for_post(
+            Post.objects.select_related('author', 'group'), post_id
+        ),
+        id=post_id,
+    )
+    comments, comments_cursor = comments_page(post.id)
     author = post.author
-    post_count = author.posts.count()
+    post_count = counts.feed_count(
+        counts.author_key(author.id), author.posts.all()
+    )
     context = {
         'title': f'Пост {post.text[:30]}',
         'post': post,
         'post_count': post_count,
-        'form': form,
         'comments': comments,
+        'comments_cursor': comments_cursor,
     }
-    return render(request, 'posts/post_detail.html', context)
+    return page_cache.tagged(
+        render(request, 'posts/post_detail.html', context), post_tags([post])
+    )
+
+
+def comments_page(post_id, cursor=None):
+    comments, next_cursor = keyset_page(
+        sharding.for_post(
+            Comment.objects.filter(post_id=post_id).select_related('author'),
+            post_id,
+        ),
+        cursor,
+        settings.COMMENTS_PAGE_COUNT,
+    )
+    return sharding.hydrate(comments, 'author'), next_cursor
+
+
+@versions.conditional(comments_keys)
+def post_comments(request, post_id):
+    try:
+        comments, comments_cursor = comments_page(
+            post_id, request.GET.get('cursor')
+        )
+    except ValueError:
+        return HttpResponseBadRequest()
+    context = {
+        'post_id': post_id,
+        'comments': comments,
+        'comments_cursor': comments_cursor,
+    }
+    return render(request, 'posts/includes/comments.html', context)
 
 
 @login_required
@@ -100,7 +239,9 @@ def post_create(request):
 
 @login_required
 def post_edit(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        sharding.for_post(Post.objects.all(), post_id), id=post_id
+    )
     if post.author != request.user:
         return redirect('posts:post_detail', post.id)
     form = PostForm(
@@ -122,34 +263,129 @@ def post_edit(request, post_id):
 @login_required
 def add_comment(request, post_id):
     form = CommentForm(request.POST or None)
-    post = Post.objects.get(id=post_id)
+    post = sharding.for_post(Post.objects.all(), post_id).get(id=post_id)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        writer.run(
+            comment.save,
+            using=router.db_for_write(Comment, instance=comment),
+        )
     return redirect('posts:post_detail', post_id=post_id)
 
 
+def follow_post_list(user):
+    if sharding.enabled():
+        return sharding.authors_feed(
+            Post.objects.all(),
+            user.follower.values_list('author_id', flat=True),
+        )
+    return Post.objects.filter(
+        author__following__user=user
+    ).select_related('author', 'group')
+
+
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, settings.PAGE_COUNT)
+    post_list = follow_post_list(request.user)
+    unread.mark_seen(request.user)
+    ranked = request.GET.get('mode') == 'ranked'
     page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    if ranked:
+        paginator = Paginator(
+            ranking.ranked_post_ids(request.user, post_list),
+            settings.PAGE_COUNT,
+        )
+        page_obj = paginator.get_page(page_number)
+        posts = sharding.in_bulk(
+            Post.objects.select_related('author', 'group'),
+            page_obj.object_list,
+        )
+        page_obj.object_list = [
+            posts[post_id] for post_id in page_obj.object_list
+            if post_id in posts
+        ]
+    else:
+        paginator = CountedPaginator(
+            post_list, settings.PAGE_COUNT, counts.follow_key(request.user.id)
+        )
+        page_obj = paginator.get_page(page_number)
+    page_obj.object_list = attach_comment_previews(page_obj.object_list)
     template = 'posts/index.html'
     context = {
         'title': 'Посты избранных авторов',
         'page_obj': page_obj,
+        'follow': True,
+        'ranked': ranked,
     }
     return render(request, template, context)
 
 
+def feed_fragment(request, post_list, tags=(), **context):
+    """Карточки постов после курсора - догрузка ленты без base.html."""
+    try:
+        posts, next_cursor = keyset_page(
+            post_list, request.GET.get('cursor'), settings.PAGE_COUNT
+        )
+    except ValueError:
+        return HttpResponseBadRequest()
+    context.update({
+        'posts': attach_comment_previews(posts),
+        'next_cursor': next_cursor,
+        'more_url': request.path,
+        'separated': bool(request.GET.get('cursor')),
+    })
+    response = render(request, 'posts/includes/feed.html', context)
+    if tags:
+        page_cache.tagged(response, {*tags, *post_tags(posts)})
+    return response
+
+
+@versions.conditional(index_keys)
+def index_feed(request):
+    return feed_fragment(
+        request,
+        sharding.feed(Post.objects.select_related('author', 'group').all()),
+        tags=[versions.INDEX],
+    )
+
+
+@versions.conditional(group_keys)
+def group_feed(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return feed_fragment(
+        request,
+        sharding.feed(group.posts.select_related('author', 'group')),
+        tags=[versions.group_key(slug)],
+        group=group,
+    )
+
+
+@versions.conditional(author_keys)
+def profile_feed(request, username):
+    user = get_object_or_404(User, username=username)
+    return feed_fragment(
+        request,
+        sharding.feed(
+            user.posts.select_related('author', 'group'),
+            [sharding.shard_for_author(user.id)],
+        ),
+        tags=[versions.author_key(username)],
+    )
+
+
+@login_required
+def follow_feed(request):
+    return feed_fragment(request, follow_post_list(request.user))
+
+
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user != author:
-        Follow.objects.get_or_create(
+        writer.run(
+            Follow.objects.get_or_create,
             user=request.user,
             author=author
         )
@@ -163,5 +399,5 @@ def profile_unfollow(request, username):
         user=request.user,
         author=author
     )
-    follow.delete()
+    writer.run(follow.delete)
     return redirect('posts:profile', username=username)
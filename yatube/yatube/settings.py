@@ -35,10 +35,16 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ServerTimingMiddleware',
+    'core.slow_queries.SlowQueryMiddleware',
+    'core.purge.PurgeBatchMiddleware',
+    'core.routers.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -46,6 +52,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.esi.EsiMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -53,7 +60,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -63,6 +70,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.unread.unread',
             ],
         },
     },
@@ -74,13 +82,77 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# core.db.backends.sqlite3 applies WAL and other pragmas on connect
+# (core/db/backends/sqlite3/base.py: PRAGMAS), starts transactions with
+# BEGIN IMMEDIATE and retries "database is locked" with backoff.
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {
+            'timeout': 5,
+        },
     }
 }
 
+# Read replicas. Reads from views go to a random alias listed here, writes
+# and everything after a write (for REPLICA_PIN_SECONDS) go to default.
+# For local testing add a copy of the SQLite file refreshed by
+# `manage.py refresh_replica --interval 5`:
+#
+# DATABASES['replica'] = {
+#     'ENGINE': 'core.db.backends.sqlite3',
+#     'NAME': os.path.join(BASE_DIR, 'db.replica.sqlite3'),
+#     'TEST': {'MIRROR': 'default'},
+# }
+# DATABASE_REPLICAS = ['replica']
+
+DATABASE_REPLICAS = []
+
+DATABASE_ROUTERS = [
+    'posts.sharding.ShardRouter',
+    'core.routers.ReplicaRouter',
+]
+
+REPLICA_PIN_SECONDS = 5
+
+REPLICA_PIN_COOKIE = 'db_primary'
+
+# Post sharding (posts.sharding). Posts and comments live on the aliases
+# listed here, picked by author_id % len(POST_SHARDS); users, groups and
+# follows stay on default. Ids come from IdSequence on default in blocks
+# of POST_SHARD_ID_BLOCK. Empty list keeps everything on default. Example:
+#
+# for number in range(2):
+#     DATABASES[f'shard_{number}'] = {
+#         'ENGINE': 'core.db.backends.sqlite3',
+#         'NAME': os.path.join(BASE_DIR, f'db.shard_{number}.sqlite3'),
+#     }
+# POST_SHARDS = ['shard_0', 'shard_1']
+#
+# and `manage.py migrate --database shard_N` for every shard. Post and
+# comment references to users and groups never have database constraints
+# (the schema does not depend on this setting); user and group deletes
+# reach every shard through posts.signals (posts.models).
+
+POST_SHARDS = []
+
+POST_SHARD_ID_BLOCK = 100
+
+# Single writer queue (core.db.writer). Comments and follows are committed
+# by one thread per process in group commits; disabled runs them inline.
+# WRITE_QUEUE_WAIT_MS > 0 trades latency for bigger batches.
+
+WRITE_QUEUE_ENABLED = False
+
+WRITE_QUEUE_BATCH_SIZE = 32
+
+WRITE_QUEUE_WAIT_MS = 0
+
+WRITE_QUEUE_TIMEOUT = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -144,10 +216,155 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 PAGE_COUNT = 10
 
+COMMENTS_PAGE_COUNT = 20
+
+COMMENT_PREVIEW_COUNT = 3
+
+# Счетчики постов для пагинации: до COUNT_EXACT_LIMIT считаются точно,
+# дальше оцениваются; в кэше живут COUNT_CACHE_TIMEOUT секунд.
+COUNT_EXACT_LIMIT = 10000
+
+COUNT_CACHE_TIMEOUT = 60 * 10
+
+# "Популярное": комментарии в часовых корзинах за окно TRENDING_WINDOW,
+# вклад корзины убывает вдвое за TRENDING_HALF_LIFE секунд.
+TRENDING_SIZE = 50
+
+TRENDING_WINDOW = 60 * 60 * 48
+
+TRENDING_BUCKET_SECONDS = 60 * 60
+
+TRENDING_HALF_LIFE = 60 * 60 * 6
+
+# The cached top is rebuilt from the buckets once it expires.
+TRENDING_CACHE_TIMEOUT = 60 * 60
+
+FOLLOW_SUGGESTIONS_COUNT = 5
+
+# Ranked follow feed (/follow/?mode=ranked): the newest
+# RANKED_FEED_CANDIDATES posts are scored on recency (halves every
+# RANKED_FEED_HALF_LIFE seconds), the reader's comments on the author and
+# the post's comment count.
+
+RANKED_FEED_CANDIDATES = 300
+
+RANKED_FEED_HALF_LIFE = 60 * 60 * 24
+
+RANKED_FEED_WEIGHTS = {
+    'recency': 1.0,
+    'affinity': 0.5,
+    'engagement': 0.3,
+}
+
+# Unread badge of the follow feed: per-reader counters in the cache,
+# rebuilt from FeedWatermark when evicted or older than the timeout.
+UNREAD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Live polling (/api/v1/changes/): how many new post ids a feed journal
+# keeps; clients further behind get reset and reload the feed.
+LIVE_FEED_BACKLOG = 100
+
+# A journal without new posts for LIVE_FEED_TIMEOUT seconds expires;
+# its pollers get reset once.
+LIVE_FEED_TIMEOUT = 60 * 60 * 24
+
+# Page cache of group, profile and post pages (core.page_cache). Entries
+# are purged by tag on changes; the timeout only bounds stale leftovers.
+PAGE_CACHE_TIMEOUT = 60 * 5
+
+# Reverse-proxy purging (core.purge). Posts pages carry Surrogate-Key and
+# Cache-Tag headers; changes send the same keys to PURGE_URL, deduplicated
+# per request and PURGE_BATCH_SIZE keys per PURGE. None disables it.
+PURGE_BACKEND = None
+
+PURGE_URL = None
+
+PURGE_TIMEOUT = 2
+
+PURGE_BATCH_SIZE = 256
+
+# Feed id cache (posts.feed_cache): index, group and author feeds keep
+# up to FEED_CACHE_MAX_IDS newest post ids as int64 arrays split into
+# FEED_CACHE_CHUNK-sized entries; posts themselves are cached one per key
+# for POST_CACHE_TIMEOUT seconds.
+FEED_CACHE_MAX_IDS = 1000
+
+FEED_CACHE_CHUNK = 100
+
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+
+POST_CACHE_TIMEOUT = 60 * 60
+
+API_PAGE_MAX = 100
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# Cache. Version marks (posts.versions), feed counters, unread badges,
+# live journals, the page cache tag index and the feed id cache all live
+# here. LocMemCache is per process: with it they are only consistent
+# when the site runs as a single process. Set CACHE_MEMCACHED to
+# 'host:port' (needs python-memcached) to share them between workers:
+# incr and add are atomic there, and read-modify-write updates take
+# core.cache.lock, held for at most CACHE_LOCK_TIMEOUT seconds.
+CACHE_MEMCACHED = None
+
+CACHE_LOCK_TIMEOUT = 5
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.MemcachedCache',
+        'LOCATION': CACHE_MEMCACHED,
+    } if CACHE_MEMCACHED else {
+        'BACKEND': 'core.cache.LocMemCache',
     }
 }
+
+# ETag version marks are re-created (as "changed now") after this.
+VERSION_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+THUMBNAIL_BACKEND = 'core.thumbnails.TimedThumbnailBackend'
+
+# Request timing (Server-Timing header and structured log line)
+
+SERVER_TIMING_SAMPLE_RATE = 0.1
+
+SERVER_TIMING_HEADER = True
+
+SERVER_TIMING_LOG = True
+
+# Prometheus metrics. Each worker flushes its counters into METRICS_DIR,
+# /metrics sums the files of live workers. None keeps metrics in-process.
+# Files of exited workers are removed at exit and when /metrics sees their
+# pid gone; with gunicorn also call core.metrics.mark_process_dead(
+# worker.pid) from the child_exit hook.
+
+METRICS_DIR = None
+
+METRICS_FLUSH_INTERVAL = 5
+
+METRICS_ALLOWED_IPS = ['127.0.0.1']
+
+# Slow query log. Queries slower than the threshold are logged together
+# with the issuing view and EXPLAIN output; None disables the check.
+
+SLOW_QUERY_THRESHOLD_MS = 100
+
+SLOW_QUERY_EXPLAIN = True
+
+SLOW_QUERY_LOG_FILE = os.path.join(BASE_DIR, 'slow_queries.log')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
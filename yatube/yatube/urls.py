@@ -18,6 +18,8 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from core.views import fragment, metrics
+
 urlpatterns = [
     # Главная страница
     path('', include('posts.urls', namespace='posts')),
@@ -25,6 +27,9 @@ urlpatterns = [
     path('auth/', include(('users.urls', 'users'), namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include(('about.urls', 'users'), namespace='about')),
+    path('api/v1/', include('api.urls', namespace='api')),
+    path('metrics', metrics, name='metrics'),
+    path('fragments/<slug:name>/', fragment, name='fragment'),
 ]
 
 handler404 = 'core.views.page_not_found'